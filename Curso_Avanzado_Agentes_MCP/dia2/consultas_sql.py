@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Registro de sentencias SQL - Día 2
+Clase Consulta compartida por el servidor básico (día 2) y el avanzado
+(día 3): cada sentencia se declara una vez con su lista fija de columnas.
+"""
+
+import sqlite3
+from typing import Dict, List, Any, Iterator, Optional, Sequence, Tuple
+
+# Máximo de parámetros por consulta WHERE ... IN (...)
+TAMANO_BLOQUE_IN = 500
+
+class Consulta:
+    """
+    Sentencia SQL declarada una sola vez, con su lista fija de columnas.
+    
+    sqlite3 guarda en cada conexión una cache de sentencias preparadas cuya
+    clave es el texto SQL: al ejecutar siempre el mismo texto, la sentencia se
+    compila la primera vez y después solo se vuelve a enlazar. Las filas se
+    convierten en diccionarios emparejando la tupla con las columnas
+    declaradas. Los métodos reciben el cursor de la herramienta, que se
+    reutiliza entre sentencias en lugar de crear uno por llamada (o la
+    conexión, para una sentencia suelta).
+    
+    Si el SQL contiene {marcadores} es una consulta WHERE ... IN (...): los
+    valores se parten en bloques de TAMANO_BLOQUE_IN y cada bloque se rellena
+    con NULL hasta la siguiente potencia de dos, así que solo hay unas pocas
+    variantes del texto y todas se quedan preparadas.
+    """
+    
+    __slots__ = ("sql", "columnas", "_variantes_in")
+    
+    def __init__(self, sql: str, columnas: Tuple[str, ...] = ()):
+        self.sql = " ".join(sql.split())
+        self.columnas = columnas
+        self._variantes_in: Dict[int, str] = {}
+    
+    def a_dict(self, fila: Sequence[Any]) -> Dict[str, Any]:
+        return dict(zip(self.columnas, fila))
+    
+    def ejecutar(self, cursor, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        return cursor.execute(self.sql, params)
+    
+    def ejecutar_lote(self, cursor, filas: Sequence[Sequence[Any]]) -> sqlite3.Cursor:
+        return cursor.executemany(self.sql, filas)
+    
+    def filas(self, cursor, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        return list(map(self.a_dict, cursor.execute(self.sql, params).fetchall()))
+    
+    def fila(self, cursor, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        fila = cursor.execute(self.sql, params).fetchone()
+        return None if fila is None else self.a_dict(fila)
+    
+    def valor(self, cursor, params: Sequence[Any] = ()) -> Any:
+        """Primera columna de la primera fila (consultas COUNT, AVG...)"""
+        fila = cursor.execute(self.sql, params).fetchone()
+        return None if fila is None else fila[0]
+    
+    def filas_in(self, cursor, valores: Sequence[Any]) -> Iterator[Dict[str, Any]]:
+        """Ejecuta la consulta IN por bloques de valores"""
+        for i in range(0, len(valores), TAMANO_BLOQUE_IN):
+            bloque = list(valores[i:i + TAMANO_BLOQUE_IN])
+            tamano = 1 << (len(bloque) - 1).bit_length()
+            bloque.extend([None] * (tamano - len(bloque)))
+            sql = self._variantes_in.get(tamano)
+            if sql is None:
+                sql = self._variantes_in[tamano] = self.sql.format(marcadores=", ".join("?" * tamano))
+            yield from map(self.a_dict, cursor.execute(sql, bloque).fetchall())
@@ -6,11 +6,90 @@ Este servidor implementa herramientas simples para gestión universitaria
 
 import json
 import sys
+import random
 from typing import Dict, List, Any
 import sqlite3
 import os
+import re
 from datetime import datetime
 
+from consultas_sql import Consulta
+
+# Migraciones de esquema versionadas: (versión, descripción, sentencias).
+# La versión aplicada se guarda en PRAGMA user_version.
+MIGRACIONES = [
+    (1, "Índices para las consultas de las herramientas", [
+        "CREATE INDEX IF NOT EXISTS idx_matriculas_estudiante ON matriculas (estudiante_id, curso_codigo)",
+        "CREATE INDEX IF NOT EXISTS idx_matriculas_curso ON matriculas (curso_codigo)",
+        "CREATE INDEX IF NOT EXISTS idx_estudiantes_activo_carrera ON estudiantes (activo, carrera)",
+    ]),
+]
+
+# Tablas que pueden crecer sin límite: sus consultas no deben recorrerlas enteras
+TABLAS_GRANDES = ("estudiantes", "matriculas")
+
+# Recorridos completos aceptados a sabiendas: (patrón sobre la consulta, motivo).
+# Cualquier otro SCAN de una tabla grande, con índice o sin él, es un fallo
+SCAN_PERMITIDO = (
+    (r"WHERE nombre LIKE ",
+     "búsqueda por subcadena del nombre (LIKE '%...%'): ningún índice B-tree la acota"),
+    (r"^SELECT COUNT\(\*\) FROM matriculas$",
+     "total de matrículas de generar_reporte: un agregado global necesita todas las filas"),
+)
+
+# Herramientas que no modifican datos: dentro de un lote comparten una transacción de lectura
+HERRAMIENTAS_SOLO_LECTURA = ("consultar_estudiante", "listar_cursos", "generar_reporte")
+
+COLUMNAS_ESTUDIANTE = ("id", "nombre", "email", "carrera", "año", "activo")
+COLUMNAS_CURSO = ("codigo", "nombre", "profesor", "creditos", "max_estudiantes")
+_SELECT_ESTUDIANTE = f"SELECT {', '.join(COLUMNAS_ESTUDIANTE)} FROM estudiantes"
+
+# Todas las sentencias de las herramientas, con sus columnas de resultado
+CONSULTAS = {
+    "estudiante_por_id": Consulta(f"{_SELECT_ESTUDIANTE} WHERE id = ?", COLUMNAS_ESTUDIANTE),
+    "estudiante_por_nombre": Consulta(f"{_SELECT_ESTUDIANTE} WHERE nombre LIKE ?", COLUMNAS_ESTUDIANTE),
+    "estudiantes_por_ids": Consulta(f"{_SELECT_ESTUDIANTE} WHERE id IN ({{marcadores}})", COLUMNAS_ESTUDIANTE),
+    "cursos_de_estudiante": Consulta("""
+        SELECT c.codigo, c.nombre, c.creditos
+        FROM cursos c
+        JOIN matriculas m ON c.codigo = m.curso_codigo
+        WHERE m.estudiante_id = ?
+    """, ("codigo", "nombre", "creditos")),
+    "cursos_de_estudiantes": Consulta("""
+        SELECT m.estudiante_id, c.codigo, c.nombre, c.creditos
+        FROM cursos c
+        JOIN matriculas m ON c.codigo = m.curso_codigo
+        WHERE m.estudiante_id IN ({marcadores})
+    """, ("estudiante_id", "codigo", "nombre", "creditos")),
+    "cursos": Consulta(f"SELECT {', '.join(COLUMNAS_CURSO)} FROM cursos", COLUMNAS_CURSO),
+    "curso_por_codigo": Consulta("SELECT codigo, max_estudiantes FROM cursos WHERE codigo = ?",
+                                 ("codigo", "max_estudiantes")),
+    "existe_estudiante": Consulta("SELECT id FROM estudiantes WHERE id = ?", ("id",)),
+    "matricula_existente": Consulta(
+        "SELECT id FROM matriculas WHERE estudiante_id = ? AND curso_codigo = ?", ("id",)),
+    "matriculados_en_curso": Consulta("SELECT COUNT(*) FROM matriculas WHERE curso_codigo = ?"),
+    "insertar_matricula": Consulta(
+        "INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula) VALUES (?, ?, ?)"),
+    "total_estudiantes_activos": Consulta("SELECT COUNT(*) FROM estudiantes WHERE activo = 1"),
+    "total_cursos": Consulta("SELECT COUNT(*) FROM cursos"),
+    "total_matriculas": Consulta("SELECT COUNT(*) FROM matriculas"),
+    "cursos_populares": Consulta("""
+        SELECT c.codigo, c.nombre, COUNT(m.id) as matriculas
+        FROM cursos c
+        LEFT JOIN matriculas m ON c.codigo = m.curso_codigo
+        GROUP BY c.codigo, c.nombre
+        ORDER BY matriculas DESC
+        LIMIT 3
+    """, ("codigo", "nombre", "matriculas")),
+    "estudiantes_por_carrera": Consulta("""
+        SELECT carrera, COUNT(*) as cantidad
+        FROM estudiantes
+        WHERE activo = 1
+        GROUP BY carrera
+        ORDER BY cantidad DESC
+    """, ("carrera", "cantidad")),
+}
+
 class UniversidadMCPServer:
     """
     Servidor MCP básico para gestión universitaria
@@ -64,6 +143,8 @@ class UniversidadMCPServer:
             )
         ''')
         
+        self._aplicar_migraciones()
+        
         # Insertar datos de ejemplo
         estudiantes = [
             ("20240001", "Ana García López", "ana.garcia@universidad.edu", "Informática", 3, True),
@@ -95,6 +176,17 @@ class UniversidadMCPServer:
         cursor.executemany("INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula) VALUES (?, ?, ?)", matriculas)
         self.conn.commit()
     
+    def _aplicar_migraciones(self):
+        """Aplica en orden las migraciones con versión mayor que PRAGMA user_version"""
+        version_actual = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version <= version_actual:
+                continue
+            with self.conn:
+                for sentencia in sentencias:
+                    self.conn.execute(sentencia)
+                self.conn.execute(f"PRAGMA user_version = {version}")
+    
     def consultar_estudiante(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Consulta información de un estudiante por ID o nombre"""
         try:
@@ -102,34 +194,17 @@ class UniversidadMCPServer:
             cursor = self.conn.cursor()
             
             if query.startswith("2024"):  # Parece un ID
-                cursor.execute("SELECT * FROM estudiantes WHERE id = ?", (query,))
+                estudiante = CONSULTAS["estudiante_por_id"].fila(cursor, (query,))
             else:  # Buscar por nombre
-                cursor.execute("SELECT * FROM estudiantes WHERE nombre LIKE ?", (f"%{query}%",))
+                estudiante = CONSULTAS["estudiante_por_nombre"].fila(cursor, (f"%{query}%",))
             
-            resultado = cursor.fetchone()
-            
-            if resultado:
-                estudiante = {
-                    "id": resultado[0],
-                    "nombre": resultado[1],
-                    "email": resultado[2],
-                    "carrera": resultado[3],
-                    "año": resultado[4],
-                    "activo": bool(resultado[5])
-                }
+            if estudiante:
+                estudiante["activo"] = bool(estudiante["activo"])
                 
                 # Obtener cursos matriculados
-                cursor.execute("""
-                    SELECT c.codigo, c.nombre, c.creditos 
-                    FROM cursos c 
-                    JOIN matriculas m ON c.codigo = m.curso_codigo 
-                    WHERE m.estudiante_id = ?
-                """, (estudiante["id"],))
-                
-                cursos = cursor.fetchall()
-                estudiante["cursos_matriculados"] = [
-                    {"codigo": c[0], "nombre": c[1], "creditos": c[2]} for c in cursos
-                ]
+                estudiante["cursos_matriculados"] = CONSULTAS["cursos_de_estudiante"].filas(
+                    cursor, (estudiante["id"],)
+                )
                 
                 return {"success": True, "data": estudiante}
             else:
@@ -138,28 +213,39 @@ class UniversidadMCPServer:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _consultar_estudiantes_por_id(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Versión agrupada de consultar_estudiante por ID: resuelve todos los IDs
+        con una consulta WHERE id IN (...) para los estudiantes y otra para sus
+        cursos, y devuelve el mismo resultado que daría cada llamada individual.
+        """
+        cursor = self.conn.cursor()
+        estudiantes = {}
+        unicos = list(dict.fromkeys(ids))
+        for estudiante in CONSULTAS["estudiantes_por_ids"].filas_in(cursor, unicos):
+            estudiante["activo"] = bool(estudiante["activo"])
+            estudiante["cursos_matriculados"] = []
+            estudiantes[estudiante["id"]] = estudiante
+        for curso in CONSULTAS["cursos_de_estudiantes"].filas_in(cursor, unicos):
+            estudiantes[curso.pop("estudiante_id")]["cursos_matriculados"].append(curso)
+        
+        return {
+            estudiante_id: {"success": True, "data": estudiantes[estudiante_id]}
+            if estudiante_id in estudiantes else {"success": False, "error": "Estudiante no encontrado"}
+            for estudiante_id in unicos
+        }
+    
     def listar_cursos(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Lista todos los cursos disponibles"""
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM cursos")
-            cursos = cursor.fetchall()
-            
-            lista_cursos = []
-            for curso in cursos:
+            lista_cursos = CONSULTAS["cursos"].filas(cursor)
+            matriculados_en_curso = CONSULTAS["matriculados_en_curso"]
+            for curso in lista_cursos:
                 # Contar estudiantes matriculados
-                cursor.execute("SELECT COUNT(*) FROM matriculas WHERE curso_codigo = ?", (curso[0],))
-                matriculados = cursor.fetchone()[0]
-                
-                lista_cursos.append({
-                    "codigo": curso[0],
-                    "nombre": curso[1],
-                    "profesor": curso[2],
-                    "creditos": curso[3],
-                    "max_estudiantes": curso[4],
-                    "estudiantes_matriculados": matriculados,
-                    "plazas_disponibles": curso[4] - matriculados
-                })
+                matriculados = matriculados_en_curso.valor(cursor, (curso["codigo"],))
+                curso["estudiantes_matriculados"] = matriculados
+                curso["plazas_disponibles"] = curso["max_estudiantes"] - matriculados
             
             return {"success": True, "data": lista_cursos}
             
@@ -178,32 +264,26 @@ class UniversidadMCPServer:
             cursor = self.conn.cursor()
             
             # Verificar que el estudiante existe
-            cursor.execute("SELECT id FROM estudiantes WHERE id = ?", (estudiante_id,))
-            if not cursor.fetchone():
+            if not CONSULTAS["existe_estudiante"].fila(cursor, (estudiante_id,)):
                 return {"success": False, "error": "Estudiante no encontrado"}
             
             # Verificar que el curso existe
-            cursor.execute("SELECT codigo, max_estudiantes FROM cursos WHERE codigo = ?", (curso_codigo,))
-            curso = cursor.fetchone()
+            curso = CONSULTAS["curso_por_codigo"].fila(cursor, (curso_codigo,))
             if not curso:
                 return {"success": False, "error": "Curso no encontrado"}
             
             # Verificar si ya está matriculado
-            cursor.execute("SELECT id FROM matriculas WHERE estudiante_id = ? AND curso_codigo = ?", 
-                         (estudiante_id, curso_codigo))
-            if cursor.fetchone():
+            if CONSULTAS["matricula_existente"].fila(cursor, (estudiante_id, curso_codigo)):
                 return {"success": False, "error": "El estudiante ya está matriculado en este curso"}
             
             # Verificar plazas disponibles
-            cursor.execute("SELECT COUNT(*) FROM matriculas WHERE curso_codigo = ?", (curso_codigo,))
-            matriculados = cursor.fetchone()[0]
-            if matriculados >= curso[1]:
+            matriculados = CONSULTAS["matriculados_en_curso"].valor(cursor, (curso_codigo,))
+            if matriculados >= curso["max_estudiantes"]:
                 return {"success": False, "error": "No hay plazas disponibles en este curso"}
             
             # Realizar la matrícula
             fecha_actual = datetime.now().strftime("%Y-%m-%d")
-            cursor.execute("INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula) VALUES (?, ?, ?)",
-                         (estudiante_id, curso_codigo, fecha_actual))
+            CONSULTAS["insertar_matricula"].ejecutar(cursor, (estudiante_id, curso_codigo, fecha_actual))
             self.conn.commit()
             
             return {"success": True, "message": f"Estudiante {estudiante_id} matriculado en {curso_codigo}"}
@@ -217,35 +297,9 @@ class UniversidadMCPServer:
             cursor = self.conn.cursor()
             
             # Estadísticas generales
-            cursor.execute("SELECT COUNT(*) FROM estudiantes WHERE activo = 1")
-            estudiantes_activos = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM cursos")
-            total_cursos = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM matriculas")
-            total_matriculas = cursor.fetchone()[0]
-            
-            # Cursos más populares
-            cursor.execute("""
-                SELECT c.codigo, c.nombre, COUNT(m.id) as matriculas
-                FROM cursos c
-                LEFT JOIN matriculas m ON c.codigo = m.curso_codigo
-                GROUP BY c.codigo, c.nombre
-                ORDER BY matriculas DESC
-                LIMIT 3
-            """)
-            cursos_populares = cursor.fetchall()
-            
-            # Estudiantes por carrera
-            cursor.execute("""
-                SELECT carrera, COUNT(*) as cantidad
-                FROM estudiantes
-                WHERE activo = 1
-                GROUP BY carrera
-                ORDER BY cantidad DESC
-            """)
-            estudiantes_por_carrera = cursor.fetchall()
+            estudiantes_activos = CONSULTAS["total_estudiantes_activos"].valor(cursor)
+            total_cursos = CONSULTAS["total_cursos"].valor(cursor)
+            total_matriculas = CONSULTAS["total_matriculas"].valor(cursor)
             
             reporte = {
                 "fecha_generacion": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -255,12 +309,8 @@ class UniversidadMCPServer:
                     "total_matriculas": total_matriculas,
                     "promedio_matriculas_por_curso": round(total_matriculas / total_cursos, 2) if total_cursos > 0 else 0
                 },
-                "cursos_mas_populares": [
-                    {"codigo": c[0], "nombre": c[1], "matriculas": c[2]} for c in cursos_populares
-                ],
-                "estudiantes_por_carrera": [
-                    {"carrera": c[0], "cantidad": c[1]} for c in estudiantes_por_carrera
-                ]
+                "cursos_mas_populares": CONSULTAS["cursos_populares"].filas(cursor),
+                "estudiantes_por_carrera": CONSULTAS["estudiantes_por_carrera"].filas(cursor)
             }
             
             return {"success": True, "data": reporte}
@@ -313,6 +363,8 @@ class UniversidadMCPServer:
                 }
             
             elif method == "tools/call":
+                if not isinstance(request.get("params", {}), dict):
+                    return {"error": "Parámetros inválidos: params debe ser un objeto"}
                 tool_name = request.get("params", {}).get("name")
                 arguments = request.get("params", {}).get("arguments", {})
                 
@@ -328,6 +380,150 @@ class UniversidadMCPServer:
         except Exception as e:
             return {"error": str(e)}
 
+    def handle_batch(self, requests: List[Any]) -> Any:
+        """
+        Maneja un lote JSON-RPC 2.0 (array de peticiones) y devuelve un array
+        de respuestas en el mismo orden, cada una con el id de su petición. Las
+        notificaciones (peticiones sin id) se ejecutan pero no tienen respuesta;
+        si todo el lote son notificaciones devuelve None y no se responde nada.
+        
+        Las llamadas de solo lectura consecutivas se ejecutan dentro de una
+        única transacción, así que ven la misma instantánea de los datos; las
+        matrículas cortan el tramo y se ejecutan entre medias. Dentro de un
+        tramo, todas las consultas de estudiante por ID se resuelven juntas
+        con una sola consulta WHERE id IN (...).
+        """
+        if not requests:
+            return {"jsonrpc": "2.0", "id": None,
+                    "error": {"code": -32600, "message": "Petición inválida: lote vacío"}}
+        
+        respuestas: List[Any] = [None] * len(requests)
+        tramo: List[int] = []
+        
+        def es_lectura(request: Any) -> bool:
+            # Unos params que no son un objeto no entran en el tramo: los
+            # rechaza handle_request solo para esa entrada
+            if not isinstance(request, dict) or request.get("method") != "tools/call":
+                return False
+            params = request.get("params", {})
+            return isinstance(params, dict) and params.get("name") in HERRAMIENTAS_SOLO_LECTURA
+        
+        def cerrar_tramo():
+            if tramo:
+                self._ejecutar_tramo_lectura(requests, tramo, respuestas)
+                tramo.clear()
+        
+        for i, request in enumerate(requests):
+            if es_lectura(request):
+                tramo.append(i)
+                continue
+            cerrar_tramo()
+            if isinstance(request, dict):
+                respuestas[i] = self.handle_request(request)
+            else:
+                respuestas[i] = {"error": "Petición inválida: se esperaba un objeto"}
+        cerrar_tramo()
+        
+        enviadas = []
+        for request, respuesta in zip(requests, respuestas):
+            if not isinstance(request, dict):
+                enviadas.append(respuesta)
+            elif "id" in request:
+                respuesta["id"] = request["id"]
+                enviadas.append(respuesta)
+        return enviadas or None
+    
+    def _ejecutar_tramo_lectura(self, requests: List[Any], indices: List[int], respuestas: List[Any]):
+        """Ejecuta un tramo de llamadas de solo lectura en una transacción compartida"""
+        por_id = {}
+        for i in indices:
+            params = requests[i]["params"]
+            argumentos = params.get("arguments", {})
+            query = argumentos.get("query") if isinstance(argumentos, dict) else None
+            if params.get("name") == "consultar_estudiante" and isinstance(query, str) and query.startswith("2024"):
+                por_id[i] = query
+        
+        # Si la conexión ya está dentro de una transacción, el tramo la comparte
+        propia = not self.conn.in_transaction
+        if propia:
+            self.conn.execute("BEGIN")
+        try:
+            if por_id:
+                try:
+                    resultados = self._consultar_estudiantes_por_id(list(por_id.values()))
+                except Exception as e:
+                    resultados = {query: {"success": False, "error": str(e)} for query in por_id.values()}
+                for i, query in por_id.items():
+                    respuestas[i] = {"content": [{"type": "text", "text": json.dumps(resultados[query], indent=2)}]}
+            for i in indices:
+                if i not in por_id:
+                    respuestas[i] = self.handle_request(requests[i])
+        finally:
+            if propia:
+                self.conn.commit()
+
+def verificar_planes_consulta(estudiantes: int = 20000) -> Dict[str, Any]:
+    """
+    Regresión de planes de consulta: carga 'estudiantes' estudiantes sintéticos
+    (con sus matrículas) y ANALYZE, para que el planificador elija como con
+    datos reales, ejecuta cada herramienta con una traza de SQL activa y
+    comprueba con EXPLAIN QUERY PLAN que ninguna consulta recorre entera una
+    tabla grande (cualquier SCAN, también sobre un índice) salvo las de
+    SCAN_PERMITIDO, que se informan con su motivo.
+    """
+    server = UniversidadMCPServer()
+    rng = random.Random(1)
+    cursos = [fila[0] for fila in server.conn.execute("SELECT codigo FROM cursos")]
+    server.conn.executemany("INSERT INTO estudiantes VALUES (?, ?, ?, ?, ?, ?)", [
+        (f"P{i:07d}", f"Estudiante {i}", f"p{i}@universidad.edu",
+         rng.choice(("Informática", "Matemáticas", "Física")), rng.randint(1, 5), rng.random() < 0.9)
+        for i in range(estudiantes)
+    ])
+    server.conn.executemany(
+        "INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula) VALUES (?, ?, '2024-01-15')",
+        [(f"P{i:07d}", curso) for i in range(estudiantes) for curso in rng.sample(cursos, 2)]
+    )
+    server.conn.commit()
+    server.conn.execute("ANALYZE")
+    capturadas = []
+    server.conn.set_trace_callback(capturadas.append)
+    
+    server.consultar_estudiante({"query": "20240001"})
+    server.consultar_estudiante({"query": "Ana"})
+    server.handle_batch([
+        {"method": "tools/call", "params": {"name": "consultar_estudiante", "arguments": {"query": q}}}
+        for q in ("20240001", "20240002")
+    ])
+    server.listar_cursos({})
+    server.matricular_estudiante({"estudiante_id": "20240003", "curso_codigo": "FIS101"})
+    server.generar_reporte({})
+    server.conn.set_trace_callback(None)
+    
+    resultados = {"consultas_analizadas": 0, "fallos": [], "permitidas": []}
+    for sql in dict.fromkeys(capturadas):
+        if not sql.lstrip().upper().startswith("SELECT"):
+            continue
+        resultados["consultas_analizadas"] += 1
+        consulta = " ".join(sql.split())
+        
+        alias = {}
+        for tabla, nombre in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(\w+))?", sql, re.IGNORECASE):
+            alias[tabla] = tabla
+            if nombre and nombre.upper() not in ("WHERE", "JOIN", "LEFT", "ON", "GROUP", "ORDER"):
+                alias[nombre] = tabla
+        
+        for _, _, _, detalle in server.conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+            coincidencia = re.match(r"SCAN (\w+)", detalle)
+            if not coincidencia or alias.get(coincidencia.group(1), coincidencia.group(1)) not in TABLAS_GRANDES:
+                continue
+            motivo = next((m for patron, m in SCAN_PERMITIDO if re.search(patron, consulta)), None)
+            if motivo:
+                resultados["permitidas"].append({"consulta": consulta, "plan": detalle, "motivo": motivo})
+            else:
+                resultados["fallos"].append({"consulta": consulta, "plan": detalle})
+    
+    return resultados
+
 def main():
     """Función principal para ejecutar el servidor MCP"""
     print("🚀 Servidor MCP Universitario - Día 2 Curso Avanzado", file=sys.stderr)
@@ -341,6 +537,11 @@ def main():
     
     server = UniversidadMCPServer()
     
+    if len(sys.argv) > 1 and sys.argv[1] == "--verificar-planes":
+        resultado = verificar_planes_consulta()
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        sys.exit(1 if resultado["fallos"] else 0)
+    
     # Modo interactivo para testing
     if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
         print("\n🔧 Modo interactivo activado")
@@ -396,7 +597,14 @@ def main():
         for line in sys.stdin:
             try:
                 request = json.loads(line)
-                response = server.handle_request(request)
+                if isinstance(request, list):
+                    # Lote JSON-RPC: una sola línea de respuesta con todos los resultados
+                    response = server.handle_batch(request)
+                    if response is None:
+                        # Lote solo de notificaciones: no hay nada que responder
+                        continue
+                else:
+                    response = server.handle_request(request)
                 print(json.dumps(response))
                 sys.stdout.flush()
             except json.JSONDecodeError as e:
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Banco de pruebas de rendimiento para los servidores MCP - Día 3
+Carga una universidad sintética en el servidor básico (día 2) y en el
+avanzado (día 3), ejecuta todas sus herramientas y guarda un informe JSON
+con percentiles de latencia y throughput, comparable entre commits
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+
+DIRECTORIO_CURSO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(DIRECTORIO_CURSO / "dia2"))
+sys.path.insert(0, str(DIRECTORIO_CURSO / "dia3"))
+
+from generador_datos_sinteticos import cargar_universidad
+from servidor_mcp_basico import UniversidadMCPServer
+from servidor_universitario_avanzado import UniversidadMCPAvanzado, np
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por interpolación lineal sobre una lista ordenada"""
+    if not valores:
+        return 0.0
+    k = (len(valores) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (k - inferior)
+
+def medir(funcion: Callable[[], Any], repeticiones: int, antes: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Ejecuta una operación varias veces y resume sus latencias en milisegundos"""
+    latencias = []
+    errores = 0
+    inicio_total = time.perf_counter()
+    for _ in range(repeticiones):
+        if antes:
+            antes()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if isinstance(resultado, dict) and resultado.get("success") is False:
+            errores += 1
+    total = time.perf_counter() - inicio_total
+    latencias.sort()
+    return {
+        "repeticiones": repeticiones,
+        "errores": errores,
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p90_ms": round(percentil(latencias, 90), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "max_ms": round(latencias[-1], 3),
+        "media_ms": round(sum(latencias) / len(latencias), 3),
+        "operaciones_por_segundo": round(repeticiones / total, 1) if total > 0 else None
+    }
+
+def benchmark_basico(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Mide las herramientas de UniversidadMCPServer (día 2) sobre datos sintéticos"""
+    rng = random.Random(parametros["semilla"])
+    servidor = UniversidadMCPServer()
+    carga = cargar_universidad(servidor.conn, parametros["estudiantes"], parametros["cursos"],
+                               semilla=parametros["semilla"], esquema="basico")
+    ids = [fila[0] for fila in servidor.conn.execute("SELECT id FROM estudiantes").fetchall()]
+    cursos = [fila[0] for fila in servidor.conn.execute("SELECT codigo FROM cursos").fetchall()]
+    # consultar_estudiante solo reconoce como ID los que empiezan por "2024"
+    ids_consulta = [i for i in ids if i.startswith("2024")] or ids
+    r = parametros["repeticiones"]
+    
+    def lote_consultas() -> List[Dict[str, Any]]:
+        return [{"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                 "params": {"name": "consultar_estudiante", "arguments": {"query": rng.choice(ids_consulta)}}}
+                for i in range(10)]
+    
+    herramientas = {
+        "consultar_estudiante (id)": (lambda: servidor.consultar_estudiante({"query": rng.choice(ids_consulta)}), r),
+        "consultar_estudiante (nombre)": (lambda: servidor.consultar_estudiante({"query": "García"}), r),
+        "consultar_estudiante (10 peticiones sueltas)": (lambda: [
+            servidor.handle_request(peticion) for peticion in lote_consultas()], r),
+        "consultar_estudiante (lote de 10)": (lambda: servidor.handle_batch(lote_consultas()), r),
+        "listar_cursos": (lambda: servidor.listar_cursos({}), max(1, r // 10)),
+        "matricular_estudiante": (lambda: servidor.matricular_estudiante({
+            "estudiante_id": rng.choice(ids), "curso_codigo": rng.choice(cursos)}), r),
+        "generar_reporte": (lambda: servidor.generar_reporte({}), max(1, r // 5)),
+    }
+    return {
+        "carga_datos": carga,
+        "herramientas": {nombre: medir(funcion, n) for nombre, (funcion, n) in herramientas.items()}
+    }
+
+def benchmark_avanzado(parametros: Dict[str, Any], directorio: str) -> Dict[str, Any]:
+    """Mide las herramientas de UniversidadMCPAvanzado (día 3) sobre datos sintéticos"""
+    rng = random.Random(parametros["semilla"])
+    servidor = UniversidadMCPAvanzado(os.path.join(directorio, "benchmark.db"))
+    conn = sqlite3.connect(servidor.db_path)
+    carga = cargar_universidad(conn, parametros["estudiantes"], parametros["cursos"],
+                               semilla=parametros["semilla"])
+    ids = [fila[0] for fila in conn.execute("SELECT id FROM estudiantes").fetchall()]
+    cursos = [fila[0] for fila in conn.execute("SELECT codigo FROM cursos").fetchall()]
+    carreras = [fila[0] for fila in conn.execute("SELECT DISTINCT carrera FROM estudiantes").fetchall()]
+    conn.close()
+    servidor._cargar_grafo_prerequisitos()
+    servidor.invalidar_aprobados()
+    
+    r = parametros["repeticiones"]
+    # Sin cache se mide el coste real de cada consulta; con --con-cache, el del servidor tal cual
+    antes = None if parametros["con_cache"] else servidor.cache.clear
+    # Relativa al directorio de exportaciones del servidor (junto a benchmark.db)
+    destino_exportacion = "exportacion.csv"
+    paginas: Dict[str, Any] = {"cursor": None}
+    
+    def buscar_paginando():
+        resultado = servidor.buscar_estudiantes({"orden": "-promedio_general", "limite": 50,
+                                                 "cursor": paginas["cursor"], "conteo": "ninguno"})
+        paginas["cursor"] = resultado["data"]["siguiente_cursor"]
+        return resultado
+    
+    herramientas = {
+        "buscar_estudiantes (filtros)": (lambda: servidor.buscar_estudiantes({
+            "filtros": {"carrera": rng.choice(carreras), "año": rng.randint(1, 5)}}), r),
+        "buscar_estudiantes (paginación)": (buscar_paginando, r),
+        "gestionar_curso (leer)": (lambda: servidor.gestionar_curso({
+            "accion": "leer", "datos": {"codigo": rng.choice(cursos)}}), r),
+        "gestionar_curso (listar)": (lambda: servidor.gestionar_curso({"accion": "leer", "datos": {}}),
+                                     max(1, r // 10)),
+        "procesar_matricula": (lambda: servidor.procesar_matricula({
+            "estudiante_id": rng.choice(ids), "curso_codigo": rng.choice(cursos)}), r),
+        "analizar_rendimiento (general)": (lambda: servidor.analizar_rendimiento({"tipo": "general"}),
+                                           max(1, r // 5)),
+        "analizar_rendimiento (por_carrera)": (lambda: servidor.analizar_rendimiento({"tipo": "por_carrera"}),
+                                               max(1, r // 5)),
+        "generar_dashboard": (lambda: servidor.generar_dashboard({}), max(1, r // 5)),
+        "exportar_datos (cursos)": (lambda: servidor.exportar_datos({
+            "tabla": "cursos", "formato": "csv", "destino": destino_exportacion}), max(1, r // 10)),
+        "validar_prerequisitos (estudiante)": (lambda: servidor.validar_prerequisitos({
+            "curso_codigo": rng.choice(cursos), "estudiante_id": rng.choice(ids)}), r),
+        "validar_prerequisitos (cohorte)": (lambda: servidor.validar_prerequisitos({
+            "curso_codigo": rng.choice(cursos), "cohorte": {"carrera": rng.choice(carreras), "año": 2}}),
+            max(1, r // 10)),
+    }
+    if np is not None:
+        herramientas["simular_carga_academica"] = (lambda: servidor.simular_carga_academica({
+            "planes": [rng.sample(cursos, 5) for _ in range(3)], "escenarios": 20, "procesos": 1,
+            "semilla": 1}), max(1, r // 10))
+    
+    resultados = {nombre: medir(funcion, n, antes) for nombre, (funcion, n) in herramientas.items()}
+    servidor.cerrar()
+    return {"carga_datos": carga, "herramientas": resultados}
+
+def ejecutar_benchmark(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta el banco de pruebas completo y devuelve el informe"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIRECTORIO_CURSO,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    
+    informe = {
+        "metadatos": {
+            "fecha": datetime.now().isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "parametros": parametros
+        },
+        "servidores": {}
+    }
+    informe["servidores"]["dia2_basico"] = benchmark_basico(parametros)
+    with tempfile.TemporaryDirectory() as directorio:
+        informe["servidores"]["dia3_avanzado"] = benchmark_avanzado(parametros, directorio)
+    return informe
+
+def comparar_informes(base: Dict[str, Any], actual: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Compara dos informes herramienta a herramienta (variación porcentual de p50, p95 y throughput)"""
+    def variacion(antes, despues):
+        return round((despues - antes) / antes * 100, 1) if antes and despues is not None else None
+    
+    filas = []
+    for servidor, datos in actual["servidores"].items():
+        base_servidor = base.get("servidores", {}).get(servidor, {}).get("herramientas", {})
+        for herramienta, medida in datos["herramientas"].items():
+            anterior = base_servidor.get(herramienta)
+            if not anterior:
+                continue
+            filas.append({
+                "servidor": servidor,
+                "herramienta": herramienta,
+                "p50_%": variacion(anterior["p50_ms"], medida["p50_ms"]),
+                "p95_%": variacion(anterior["p95_ms"], medida["p95_ms"]),
+                "throughput_%": variacion(anterior["operaciones_por_segundo"], medida["operaciones_por_segundo"])
+            })
+    return filas
+
+def formatear(valor: Optional[float], formato: str, sufijo: str = "") -> str:
+    """Aplica el formato numérico y el sufijo, o escribe n/a (sin medida o sin base) con el mismo ancho"""
+    if valor is not None:
+        return format(valor, formato) + sufijo
+    return "n/a".rjust(len(format(0, formato) + sufijo))
+
+def main():
+    """Punto de entrada del banco de pruebas"""
+    parser = argparse.ArgumentParser(description="Benchmark de los servidores MCP universitarios")
+    parser.add_argument("--estudiantes", type=int, default=10000)
+    parser.add_argument("--cursos", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--con-cache", action="store_true", help="No vaciar la cache entre llamadas")
+    parser.add_argument("--salida", default="informe_benchmark.json")
+    parser.add_argument("--comparar", help="Informe anterior con el que comparar")
+    args = parser.parse_args()
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    parametros = {
+        "estudiantes": args.estudiantes, "cursos": args.cursos, "repeticiones": args.repeticiones,
+        "semilla": args.semilla, "con_cache": args.con_cache
+    }
+    
+    print(f"🏁 Benchmark: {args.estudiantes} estudiantes, {args.cursos} cursos", file=sys.stderr)
+    informe = ejecutar_benchmark(parametros)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"📄 Informe guardado en {args.salida}", file=sys.stderr)
+    
+    for servidor, datos in informe["servidores"].items():
+        print(f"\n{servidor}")
+        for herramienta, medida in datos["herramientas"].items():
+            print(f"  {herramienta:<40} p50={medida['p50_ms']:>9.3f}ms  p95={medida['p95_ms']:>9.3f}ms  "
+                  f"{formatear(medida['operaciones_por_segundo'], '>9', ' op/s')}")
+    
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        print(f"\n📊 Comparación con {args.comparar} (negativo = más rápido)")
+        for fila in comparar_informes(base, informe):
+            p50, p95, throughput = (formatear(fila[clave], ">+7", "%") for clave in ("p50_%", "p95_%", "throughput_%"))
+            print(f"  {fila['servidor']:<14} {fila['herramienta']:<40} p50 {p50}  "
+                  f"p95 {p95}  throughput {throughput}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos a gran escala - Día 3
+Crea universidades realistas y reproducibles (misma semilla, mismos datos)
+para medir cómo escalan las herramientas de los servidores MCP
+"""
+
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+from typing import Dict, List, Any, Iterator, Tuple
+
+# Carreras con su peso relativo en la matrícula y el prefijo de sus asignaturas
+CARRERAS = [
+    ("Ingeniería Informática", "INF", 0.22),
+    ("Matemáticas", "MAT", 0.10),
+    ("Física", "FIS", 0.08),
+    ("Química", "QUI", 0.08),
+    ("Biología", "BIO", 0.10),
+    ("Economía", "ECO", 0.14),
+    ("Derecho", "DER", 0.16),
+    ("Historia", "HIS", 0.06),
+    ("Psicología", "PSI", 0.06),
+]
+
+NOMBRES = [
+    "Ana", "Carlos", "María", "David", "Elena", "Javier", "Lucía", "Pablo", "Sara", "Miguel",
+    "Laura", "Alejandro", "Paula", "Daniel", "Marta", "Jorge", "Carmen", "Adrián", "Irene", "Sergio",
+]
+
+APELLIDOS = [
+    "García", "Martín", "Rodríguez", "López", "Fernández", "González", "Sánchez", "Pérez",
+    "Gómez", "Ruiz", "Díaz", "Moreno", "Álvarez", "Romero", "Navarro", "Torres", "Gil", "Sanz",
+]
+
+PROFESORES = [f"Dr{'a' if i % 2 else ''}. {NOMBRES[i % len(NOMBRES)]} {APELLIDOS[i % len(APELLIDOS)]}"
+              for i in range(40)]
+
+NIVELES = 4
+TAMANO_LOTE_CARGA = 50000
+
+def _lotes(filas: Iterator[tuple], tamano: int = TAMANO_LOTE_CARGA) -> Iterator[List[tuple]]:
+    """Agrupa un iterador de filas en listas de tamaño fijo para executemany"""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def generar_cursos(rng: random.Random, total: int) -> List[Dict[str, Any]]:
+    """
+    Genera el catálogo de cursos repartido por carreras y niveles. Los
+    prerequisitos de un curso solo apuntan a cursos de niveles inferiores de
+    la misma carrera, así que el grafo resultante es siempre un DAG.
+    """
+    cursos = []
+    por_carrera = max(NIVELES, total // len(CARRERAS))
+    for carrera, prefijo, _ in CARRERAS:
+        anteriores: List[str] = []
+        for n in range(por_carrera):
+            if len(cursos) >= total:
+                break
+            nivel = 1 + n * NIVELES // por_carrera
+            codigo = f"{prefijo}{nivel}{n:03d}"
+            candidatos = [c for c in anteriores if int(c[len(prefijo)]) < nivel]
+            prerequisitos = rng.sample(candidatos, min(len(candidatos), rng.choice((0, 1, 1, 2))))
+            cursos.append({
+                "codigo": codigo,
+                "nombre": f"{carrera} {nivel}.{n}",
+                "profesor": rng.choice(PROFESORES),
+                "creditos": rng.choice((3, 4, 4, 6, 6, 6)),
+                "max_estudiantes": rng.choice((30, 40, 60, 80, 120, 200)),
+                "prerequisitos": prerequisitos,
+                "semestre": f"2024S{1 + n % 2}",
+                "carrera": carrera,
+                "nivel": nivel,
+            })
+            anteriores.append(codigo)
+    return cursos
+
+def generar_estudiantes(rng: random.Random, total: int) -> Iterator[Tuple[Any, ...]]:
+    """
+    Genera estudiantes como (id, nombre, email, carrera, año, activo,
+    fecha_ingreso, habilidad). La habilidad es la nota media esperada.
+    """
+    carreras = [c[0] for c in CARRERAS]
+    pesos = [c[2] for c in CARRERAS]
+    for i in range(total):
+        año = rng.choices((1, 2, 3, 4, 5), weights=(30, 25, 20, 17, 8))[0]
+        ingreso = 2024 - año + 1
+        nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+        yield (
+            f"{ingreso}{i:07d}",
+            nombre,
+            f"{nombre.split()[0].lower()}.{i}@univ.edu",
+            rng.choices(carreras, weights=pesos)[0],
+            año,
+            rng.random() < 0.93,
+            f"{ingreso}-09-01",
+            min(9.8, max(3.5, rng.gauss(6.9, 1.1))),
+        )
+
+def generar_matriculas(rng: random.Random, estudiante: Tuple[Any, ...],
+                       cursos_por_carrera: Dict[str, Dict[int, List[Dict[str, Any]]]],
+                       cursos_por_año: int) -> Tuple[List[Tuple[Any, ...]], int, float]:
+    """
+    Genera el expediente de un estudiante: cursos de años anteriores con nota
+    (aprobados o suspensos, con un segundo intento en algunos suspensos) y
+    cursos del año actual en estado Matriculado. Devuelve (filas, créditos
+    aprobados, promedio).
+    """
+    estudiante_id, _, _, carrera, año, _, fecha_ingreso, habilidad = estudiante
+    ingreso = int(fecha_ingreso[:4])
+    filas = []
+    creditos = 0
+    notas = []
+    cursados = set()
+    
+    for curso_año in range(1, año + 1):
+        # A partir del último nivel se eligen cursos de ese nivel no cursados todavía
+        nivel = min(curso_año, NIVELES)
+        disponibles = [c for c in cursos_por_carrera[carrera].get(nivel, []) if c["codigo"] not in cursados]
+        for curso in rng.sample(disponibles, min(cursos_por_año, len(disponibles))):
+            cursados.add(curso["codigo"])
+            fecha = f"{ingreso + curso_año - 1}-09-15"
+            if curso_año == año:
+                filas.append((estudiante_id, curso["codigo"], fecha, None, "Matriculado", 1))
+                continue
+            nota = round(min(10.0, max(0.0, rng.gauss(habilidad, 1.6))), 1)
+            estado = "Aprobado" if nota >= 5 else "Reprobado"
+            filas.append((estudiante_id, curso["codigo"], fecha, nota, estado, 1))
+            if estado == "Reprobado" and rng.random() < 0.6:
+                nota = round(min(10.0, max(5.0, rng.gauss(habilidad + 0.5, 1.0))), 1)
+                estado = "Aprobado"
+                filas.append((estudiante_id, curso["codigo"], f"{ingreso + curso_año}-02-01", nota, estado, 2))
+            if estado == "Aprobado":
+                creditos += curso["creditos"]
+                notas.append(nota)
+    
+    promedio = round(sum(notas) / len(notas), 2) if notas else 0.0
+    return filas, creditos, promedio
+
+def cargar_universidad(conn: sqlite3.Connection, estudiantes: int = 10000, cursos: int = 1000,
+                       cursos_por_año: int = 5, semilla: int = 42,
+                       esquema: str = "avanzado") -> Dict[str, Any]:
+    """
+    Genera y carga una universidad completa en la conexión dada.
+    
+    esquema: 'avanzado' (tablas de servidor_universitario_avanzado.py) o
+    'basico' (tablas de servidor_mcp_basico.py). La carga se hace en una sola
+    transacción con executemany por lotes y sincronización relajada.
+    """
+    rng = random.Random(semilla)
+    inicio = time.perf_counter()
+    
+    catalogo = generar_cursos(rng, cursos)
+    cursos_por_carrera: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+    for curso in catalogo:
+        cursos_por_carrera.setdefault(curso["carrera"], {}).setdefault(curso["nivel"], []).append(curso)
+    
+    conn.execute("PRAGMA synchronous = OFF")
+    totales = {"estudiantes": 0, "cursos": len(catalogo), "matriculas": 0}
+    
+    with conn:
+        if esquema == "avanzado":
+            conn.executemany('''
+                INSERT INTO cursos (codigo, nombre, profesor, creditos, max_estudiantes,
+                                    prerequisitos, activo, semestre, descripcion)
+                VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+            ''', [(c["codigo"], c["nombre"], c["profesor"], c["creditos"], c["max_estudiantes"],
+                   json.dumps(c["prerequisitos"]), c["semestre"], f"Nivel {c['nivel']}")
+                  for c in catalogo])
+        else:
+            conn.executemany(
+                "INSERT INTO cursos VALUES (?, ?, ?, ?, ?)",
+                [(c["codigo"], c["nombre"], c["profesor"], c["creditos"], c["max_estudiantes"])
+                 for c in catalogo]
+            )
+        
+        matriculas_pendientes: List[tuple] = []
+        for lote in _lotes(generar_estudiantes(rng, estudiantes)):
+            filas_estudiantes = []
+            for estudiante in lote:
+                filas, creditos, promedio = generar_matriculas(
+                    rng, estudiante, cursos_por_carrera, cursos_por_año
+                )
+                if esquema == "avanzado":
+                    filas_estudiantes.append(estudiante[:7] + (creditos, promedio))
+                    matriculas_pendientes.extend(filas)
+                else:
+                    filas_estudiantes.append(estudiante[:6])
+                    matriculas_pendientes.extend(f[:3] for f in filas if f[5] == 1)
+            
+            if esquema == "avanzado":
+                conn.executemany('''
+                    INSERT INTO estudiantes (id, nombre, email, carrera, año, activo, fecha_ingreso,
+                                             creditos_completados, promedio_general)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', filas_estudiantes)
+                conn.executemany('''
+                    INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula,
+                                            calificacion, estado, intentos)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', matriculas_pendientes)
+            else:
+                conn.executemany("INSERT INTO estudiantes VALUES (?, ?, ?, ?, ?, ?)", filas_estudiantes)
+                conn.executemany(
+                    "INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula) VALUES (?, ?, ?)",
+                    matriculas_pendientes
+                )
+            totales["estudiantes"] += len(filas_estudiantes)
+            totales["matriculas"] += len(matriculas_pendientes)
+            matriculas_pendientes = []
+    
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA synchronous = FULL")
+    duracion = time.perf_counter() - inicio
+    totales.update({
+        "semilla": semilla,
+        "esquema": esquema,
+        "duracion_segundos": round(duracion, 2),
+        "filas_por_segundo": round(sum((totales["estudiantes"], totales["cursos"], totales["matriculas"]))
+                                   / duracion, 1)
+    })
+    return totales
+
+def main():
+    """Genera una base de datos sintética con el esquema del servidor avanzado"""
+    parser = argparse.ArgumentParser(description="Generador de universidades sintéticas")
+    parser.add_argument("--db", default="universidad_sintetica.db", help="Ruta de la base de datos")
+    parser.add_argument("--estudiantes", type=int, default=10000)
+    parser.add_argument("--cursos", type=int, default=1000)
+    parser.add_argument("--cursos-por-año", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    
+    from servidor_universitario_avanzado import UniversidadMCPAvanzado
+    
+    # El servidor crea el esquema y las migraciones; luego se sustituyen los datos de ejemplo
+    servidor = UniversidadMCPAvanzado(args.db)
+    servidor.cerrar()
+    conn = sqlite3.connect(args.db)
+    with conn:
+        for tabla in ("matriculas", "cursos", "estudiantes"):
+            conn.execute(f"DELETE FROM {tabla}")
+    resumen = cargar_universidad(conn, args.estudiantes, args.cursos, args.cursos_por_año, args.semilla)
+    conn.close()
+    
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Instantánea columnar en memoria - Día 3
+Guarda estudiantes, cursos y matrículas como columnas NumPy (las de texto
+codificadas con diccionario) para que las herramientas analíticas agreguen
+con operaciones vectoriales en lugar de recorrer tuplas de SQLite. Se
+refresca de forma incremental con el registro de cambios (log_actividad) y
+se puede volcar a un fichero que los procesos trabajadores abren con mmap,
+compartiendo las mismas páginas sin copiarlas.
+"""
+
+import os
+import re
+import json
+import mmap
+import struct
+import threading
+import logging
+from typing import Dict, List, Any, Optional, Callable, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy las herramientas siguen consultando SQLite
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Columnas de cada tabla: (nombre, dtype, diccionario). Las columnas con
+# diccionario guardan el código entero del valor; las que comparten
+# diccionario (estudiante_id, curso_codigo) usan los mismos códigos en todas
+# las tablas. La primera columna es la clave y se mantiene ordenada.
+ESQUEMA_COLUMNAR = {
+    "estudiantes": (
+        ("id", "<i4", "estudiante_id"),
+        ("nombre", "<i4", "nombre_estudiante"),
+        ("carrera", "<i4", "carrera"),
+        ("año", "<i2", None),
+        ("activo", "?", None),
+        ("creditos_completados", "<i4", None),
+        ("promedio_general", "<f8", None),
+    ),
+    "cursos": (
+        ("codigo", "<i4", "curso_codigo"),
+        ("nombre", "<i4", "nombre_curso"),
+        ("creditos", "<i4", None),
+        ("max_estudiantes", "<i4", None),
+        ("activo", "?", None),
+    ),
+    "matriculas": (
+        ("id", "<i8", None),
+        ("estudiante_id", "<i4", "estudiante_id"),
+        ("curso_codigo", "<i4", "curso_codigo"),
+        ("calificacion", "<f8", None),
+        ("estado", "<i4", "estado"),
+    ),
+}
+
+MAGIA_FICHERO = b"MCPCOL1\n"
+ALINEACION_COLUMNAS = 64
+FILAS_POR_BLOQUE_CARGA = 50000
+CAMBIOS_POR_LECTURA = 1000
+CLAVES_POR_CONSULTA = 500
+
+# LIKE de SQLite solo ignora mayúsculas en ASCII ('Á' no equivale a 'á')
+_MINUSCULAS_ASCII = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def _like_a_regex(patron: str) -> "re.Pattern":
+    """Traduce un patrón LIKE (% y _) a una expresión regular equivalente"""
+    partes = []
+    for caracter in patron.translate(_MINUSCULAS_ASCII):
+        if caracter == "%":
+            partes.append(".*")
+        elif caracter == "_":
+            partes.append(".")
+        else:
+            partes.append(re.escape(caracter))
+    return re.compile("".join(partes), re.DOTALL)
+
+def _alinear(posicion: int) -> int:
+    return -(-posicion // ALINEACION_COLUMNAS) * ALINEACION_COLUMNAS
+
+class Diccionario:
+    """Codificación de una columna de texto: cada valor distinto recibe un entero"""
+    
+    __slots__ = ("valores", "_codigos")
+    
+    def __init__(self, valores: Optional[List[Any]] = None):
+        self.valores = list(valores or [])
+        # El índice inverso se construye en el primer uso: un trabajador que
+        # solo lee la instantánea mapeada casi nunca lo necesita
+        self._codigos: Optional[Dict[Any, int]] = None
+    
+    def _indice(self) -> Dict[Any, int]:
+        if self._codigos is None:
+            self._codigos = {valor: codigo for codigo, valor in enumerate(self.valores)}
+        return self._codigos
+    
+    def codificar(self, valor: Any) -> int:
+        """Código del valor, asignándole uno nuevo si no existía"""
+        codigos = self._indice()
+        codigo = codigos.get(valor)
+        if codigo is None:
+            codigo = codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+    
+    def codigo(self, valor: Any) -> int:
+        """Código del valor o -1 si no aparece en la columna"""
+        return self._indice().get(valor, -1)
+    
+    def __len__(self) -> int:
+        return len(self.valores)
+
+class TablaColumnar:
+    """
+    Columnas de una tabla en arrays NumPy con capacidad sobrante para crecer.
+    
+    Las filas se mantienen ordenadas por la clave (primera columna), así que
+    localizar una fila es una búsqueda binaria y las altas nuevas, que casi
+    siempre traen la clave mayor, son un simple añadido al final.
+    """
+    
+    def __init__(self, nombre: str, columnas: Sequence[Tuple[str, str, Optional[str]]],
+                 capacidad: int = 1024):
+        self.nombre = nombre
+        self.columnas = columnas
+        self.clave = columnas[0][0]
+        self.filas = 0
+        self.datos: Dict[str, "np.ndarray"] = {
+            columna: np.empty(capacidad, dtype=dtype) for columna, dtype, _ in columnas
+        }
+    
+    def __getitem__(self, columna: str) -> "np.ndarray":
+        """Vista (sin copia) de las filas ocupadas de una columna"""
+        return self.datos[columna][:self.filas]
+    
+    def _reservar(self, total: int):
+        capacidad = len(self.datos[self.clave])
+        if total <= capacidad:
+            return
+        capacidad = max(total, capacidad * 2)
+        for columna, actual in self.datos.items():
+            nueva = np.empty(capacidad, dtype=actual.dtype)
+            nueva[:self.filas] = actual[:self.filas]
+            self.datos[columna] = nueva
+    
+    def anexar(self, bloque: List[tuple]):
+        """Añade al final un bloque de filas ya codificadas (carga completa)"""
+        if not bloque:
+            return
+        self._reservar(self.filas + len(bloque))
+        fin = self.filas + len(bloque)
+        for j, (columna, _, _) in enumerate(self.columnas):
+            self.datos[columna][self.filas:fin] = [fila[j] for fila in bloque]
+        self.filas = fin
+    
+    def ordenar(self):
+        """Reordena por clave si una carga no llegó ordenada"""
+        claves = self[self.clave]
+        if self.filas > 1 and (claves[1:] < claves[:-1]).any():
+            orden = np.argsort(claves, kind="stable")
+            for columna, datos in self.datos.items():
+                datos[:self.filas] = datos[:self.filas][orden]
+    
+    def posicion(self, clave) -> Tuple[int, bool]:
+        """(posición, existe) de una clave en la columna ordenada"""
+        claves = self[self.clave]
+        pos = int(np.searchsorted(claves, clave))
+        return pos, pos < self.filas and claves[pos] == clave
+    
+    def escribir(self, fila: tuple):
+        """Inserta o actualiza una fila codificada manteniendo el orden por clave"""
+        pos, existe = self.posicion(fila[0])
+        if not existe:
+            self._reservar(self.filas + 1)
+            if pos < self.filas:
+                for datos in self.datos.values():
+                    datos[pos + 1:self.filas + 1] = datos[pos:self.filas]
+            self.filas += 1
+        for (columna, _, _), valor in zip(self.columnas, fila):
+            self.datos[columna][pos] = valor
+    
+    def eliminar(self, clave):
+        pos, existe = self.posicion(clave)
+        if existe:
+            for datos in self.datos.values():
+                datos[pos:self.filas - 1] = datos[pos + 1:self.filas]
+            self.filas -= 1
+    
+    def nbytes(self) -> int:
+        return sum(self[columna].nbytes for columna in self.datos)
+
+class InstantaneaColumnar:
+    """
+    Copia columnar de estudiantes, cursos y matrículas.
+    
+    La instantánea propietaria se carga de SQLite y se mantiene al día con
+    refrescar(), que lee de log_actividad los cambios posteriores al último
+    aplicado y relee solo esas filas. persistir() la vuelca a un fichero;
+    abrir() lo mapea en solo lectura (los arrays son vistas del mmap, sin
+    copia) y refrescar() en ese caso vuelve a mapearlo si se ha renovado.
+    Todas las consultas devuelven tipos de Python, listos para JSON.
+    """
+    
+    def __init__(self, conectar: Optional[Callable[[], Any]] = None,
+                 leer_cambios: Optional[Callable[[int, int], List[Dict[str, Any]]]] = None):
+        if np is None:
+            raise RuntimeError("La instantánea columnar requiere NumPy (pip install numpy)")
+        self._conectar = conectar
+        self._leer_cambios = leer_cambios
+        self._lock = threading.RLock()
+        self.tablas: Dict[str, TablaColumnar] = {}
+        self.diccionarios: Dict[str, Diccionario] = {}
+        self.ultimo_cambio = 0
+        self.version = 0
+        self.ruta: Optional[str] = None
+        self._mapa: Optional[mmap.mmap] = None
+        self._firma: Optional[Tuple[int, int]] = None
+        self.estadisticas = {"cargas": 0, "cambios_aplicados": 0, "persistencias": 0, "remapeos": 0}
+        self._vaciar()
+    
+    def _vaciar(self):
+        self.tablas = {nombre: TablaColumnar(nombre, columnas) for nombre, columnas in ESQUEMA_COLUMNAR.items()}
+        self.diccionarios = {
+            diccionario: Diccionario()
+            for columnas in ESQUEMA_COLUMNAR.values() for _, _, diccionario in columnas if diccionario
+        }
+    
+    @property
+    def solo_lectura(self) -> bool:
+        return self._mapa is not None
+    
+    def _codificar(self, tabla: str, fila: Sequence[Any]) -> tuple:
+        """Convierte una fila de SQLite a los valores que guardan las columnas"""
+        codificada = []
+        for (_, dtype, diccionario), valor in zip(ESQUEMA_COLUMNAR[tabla], fila):
+            if diccionario:
+                codificada.append(self.diccionarios[diccionario].codificar(valor))
+            elif dtype == "<f8":
+                codificada.append(float("nan") if valor is None else valor)
+            elif dtype == "?":
+                codificada.append(bool(valor))
+            else:
+                codificada.append(valor or 0)
+        return tuple(codificada)
+    
+    def _clave(self, tabla: str, registro_id: str):
+        """Clave codificada de un registro del log, o None si no puede estar en la tabla"""
+        _, _, diccionario = ESQUEMA_COLUMNAR[tabla][0]
+        if diccionario:
+            return self.diccionarios[diccionario].codificar(registro_id)
+        try:
+            return int(registro_id)
+        except (TypeError, ValueError):
+            return None
+    
+    def cargar(self):
+        """Carga completa desde SQLite"""
+        with self._lock:
+            conn = self._conectar()
+            try:
+                # Se anota el último cambio antes de leer: lo que se registre
+                # durante la carga se vuelve a aplicar (releer es idempotente)
+                ultimo = conn.execute("SELECT COALESCE(MAX(id), 0) FROM log_actividad").fetchone()[0]
+                self._vaciar()
+                for nombre, columnas in ESQUEMA_COLUMNAR.items():
+                    tabla = self.tablas[nombre]
+                    cursor = conn.execute(
+                        f"SELECT {', '.join(c[0] for c in columnas)} FROM {nombre} ORDER BY rowid"
+                    )
+                    while True:
+                        filas = cursor.fetchmany(FILAS_POR_BLOQUE_CARGA)
+                        if not filas:
+                            break
+                        tabla.anexar([self._codificar(nombre, fila) for fila in filas])
+                    tabla.ordenar()
+            finally:
+                conn.close()
+            self.ultimo_cambio = ultimo
+            self.version += 1
+            self.estadisticas["cargas"] += 1
+            logger.info(f"Instantánea columnar cargada: "
+                        f"{ {nombre: tabla.filas for nombre, tabla in self.tablas.items()} }")
+    
+    def refrescar(self) -> int:
+        """Aplica los cambios nuevos del registro (o renueva el mapeo). Devuelve cuántos"""
+        if self.solo_lectura:
+            return self._remapear_si_cambio()
+        
+        aplicados = 0
+        with self._lock:
+            while True:
+                cambios = self._leer_cambios(self.ultimo_cambio, CAMBIOS_POR_LECTURA)
+                if not cambios:
+                    break
+                por_tabla: Dict[str, Dict[Any, str]] = {}
+                for cambio in cambios:
+                    tabla = cambio["tabla_afectada"]
+                    if tabla in ESQUEMA_COLUMNAR:
+                        clave = self._clave(tabla, cambio["registro_id"])
+                        if clave is not None:
+                            por_tabla.setdefault(tabla, {})[clave] = cambio["registro_id"]
+                if por_tabla:
+                    conn = self._conectar()
+                    try:
+                        for tabla, claves in por_tabla.items():
+                            self._releer(conn, tabla, claves)
+                    finally:
+                        conn.close()
+                self.ultimo_cambio = cambios[-1]["id"]
+                aplicados += len(cambios)
+                if len(cambios) < CAMBIOS_POR_LECTURA:
+                    break
+            if aplicados:
+                self.version += 1
+                self.estadisticas["cambios_aplicados"] += aplicados
+        return aplicados
+    
+    def _releer(self, conn, tabla: str, claves: Dict[Any, str]):
+        """Vuelve a leer de SQLite las filas cambiadas; las que ya no existen se eliminan"""
+        columnas = ESQUEMA_COLUMNAR[tabla]
+        registro_ids = list(claves.values())
+        tipo = int if columnas[0][2] is None else str
+        vistas = set()
+        for i in range(0, len(registro_ids), CLAVES_POR_CONSULTA):
+            bloque = [tipo(r) for r in registro_ids[i:i + CLAVES_POR_CONSULTA]]
+            sql = (f"SELECT {', '.join(c[0] for c in columnas)} FROM {tabla} "
+                   f"WHERE {columnas[0][0]} IN ({', '.join('?' * len(bloque))})")
+            for fila in conn.execute(sql, bloque):
+                codificada = self._codificar(tabla, fila)
+                self.tablas[tabla].escribir(codificada)
+                vistas.add(codificada[0])
+        for clave in claves:
+            if clave not in vistas:
+                self.tablas[tabla].eliminar(clave)
+    
+    def persistir(self, ruta: str):
+        """
+        Vuelca las columnas a un fichero mapeable: cabecera JSON (filas,
+        dtypes, desplazamientos y diccionarios) y después cada columna
+        alineada a 64 bytes. Se escribe en un temporal y se renombra, así que
+        quien tenga mapeado el fichero anterior lo sigue leyendo intacto.
+        """
+        with self._lock:
+            cabecera = {"ultimo_cambio": self.ultimo_cambio, "version": self.version, "tablas": {},
+                        "diccionarios": {nombre: d.valores for nombre, d in self.diccionarios.items()}}
+            desplazamiento = 0
+            for nombre, tabla in self.tablas.items():
+                columnas = {}
+                for columna in tabla.datos:
+                    columnas[columna] = {"dtype": tabla[columna].dtype.str, "offset": desplazamiento}
+                    desplazamiento = _alinear(desplazamiento + tabla[columna].nbytes)
+                cabecera["tablas"][nombre] = {"filas": tabla.filas, "columnas": columnas}
+            texto = json.dumps(cabecera, ensure_ascii=False).encode()
+            inicio = _alinear(len(MAGIA_FICHERO) + 8 + len(texto))
+            
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(MAGIA_FICHERO + struct.pack("<Q", len(texto)) + texto)
+                for nombre, tabla in self.tablas.items():
+                    for columna, datos in cabecera["tablas"][nombre]["columnas"].items():
+                        f.seek(inicio + datos["offset"])
+                        tabla[columna].tofile(f)
+                f.truncate(inicio + desplazamiento)
+            os.replace(temporal, ruta)
+            self.estadisticas["persistencias"] += 1
+    
+    @classmethod
+    def abrir(cls, ruta: str) -> "InstantaneaColumnar":
+        """Abre en solo lectura una instantánea persistida, compartiendo sus páginas"""
+        instantanea = cls()
+        instantanea.ruta = ruta
+        instantanea._mapear()
+        return instantanea
+    
+    def _firma_fichero(self) -> Tuple[int, int]:
+        estado = os.stat(self.ruta)
+        return estado.st_ino, estado.st_mtime_ns
+    
+    def _mapear(self):
+        with open(self.ruta, "rb") as f:
+            firma = os.fstat(f.fileno())
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapa[:len(MAGIA_FICHERO)] != MAGIA_FICHERO:
+            mapa.close()
+            raise ValueError(f"{self.ruta} no es una instantánea columnar")
+        longitud = struct.unpack_from("<Q", mapa, len(MAGIA_FICHERO))[0]
+        posicion = len(MAGIA_FICHERO) + 8
+        cabecera = json.loads(bytes(mapa[posicion:posicion + longitud]))
+        inicio = _alinear(posicion + longitud)
+        
+        tablas = {}
+        for nombre, descripcion in cabecera["tablas"].items():
+            tabla = TablaColumnar(nombre, ESQUEMA_COLUMNAR[nombre], capacidad=0)
+            tabla.filas = descripcion["filas"]
+            for columna, datos in descripcion["columnas"].items():
+                tabla.datos[columna] = np.frombuffer(mapa, dtype=datos["dtype"], count=tabla.filas,
+                                                     offset=inicio + datos["offset"])
+            tablas[nombre] = tabla
+        
+        with self._lock:
+            anterior = self._mapa
+            self.tablas = tablas
+            self.diccionarios = {nombre: Diccionario(valores)
+                                 for nombre, valores in cabecera["diccionarios"].items()}
+            self.ultimo_cambio = cabecera["ultimo_cambio"]
+            self.version = cabecera["version"]
+            self._mapa = mapa
+            self._firma = (firma.st_ino, firma.st_mtime_ns)
+        if anterior is not None:
+            try:
+                anterior.close()
+            except BufferError:
+                pass  # Aún hay vistas vivas del mapeo anterior: se libera al recogerlas
+    
+    def _remapear_si_cambio(self) -> int:
+        try:
+            firma = self._firma_fichero()
+        except OSError:
+            return 0
+        if firma == self._firma:
+            return 0
+        anterior = self.ultimo_cambio
+        self._mapear()
+        self.estadisticas["remapeos"] += 1
+        return max(0, self.ultimo_cambio - anterior)
+    
+    def cerrar(self):
+        with self._lock:
+            self._vaciar()
+            if self._mapa is not None:
+                try:
+                    self._mapa.close()
+                except BufferError:
+                    pass
+                self._mapa = None
+    
+    # --- Consultas analíticas (equivalentes a las sentencias SQL de las herramientas) ---
+    
+    def _texto(self, diccionario: str, codigo) -> Any:
+        return self.diccionarios[diccionario].valores[int(codigo)]
+    
+    def _codigo_estado(self, estado: str) -> int:
+        return self.diccionarios["estado"].codigo(estado)
+    
+    @staticmethod
+    def _media(valores: "np.ndarray") -> Optional[float]:
+        """AVG de SQL: None si no hay filas"""
+        return float(valores.mean()) if len(valores) else None
+    
+    def rendimiento_general(self) -> Dict[str, Any]:
+        """total_estudiantes, promedio_sistema, total_cursos, total_matriculas y tasa_aprobacion"""
+        with self._lock:
+            e, c, m = self.tablas["estudiantes"], self.tablas["cursos"], self.tablas["matriculas"]
+            activo = e["activo"]
+            promedio = e["promedio_general"]
+            calificadas = ~np.isnan(m["calificacion"])
+            n_calificadas = int(calificadas.sum())
+            aprobadas = int((m["estado"][calificadas] == self._codigo_estado("Aprobado")).sum())
+            return {
+                "total_estudiantes": int(activo.sum()),
+                "promedio_sistema": self._media(promedio[activo & (promedio > 0)]),
+                "total_cursos": int(c["activo"].sum()),
+                "total_matriculas": m.filas,
+                "tasa_aprobacion": aprobadas * 100.0 / n_calificadas if n_calificadas else None
+            }
+    
+    def top_estudiantes(self, limite: int = 5) -> List[Dict[str, Any]]:
+        """Mejores promedios; los empates se ordenan por id descendente como el índice (promedio, id)"""
+        with self._lock:
+            e = self.tablas["estudiantes"]
+            promedio = e["promedio_general"]
+            candidatos = np.flatnonzero(promedio > 0)
+            if len(candidatos) > limite:
+                corte = np.partition(promedio[candidatos], len(candidatos) - limite)[len(candidatos) - limite]
+                candidatos = candidatos[promedio[candidatos] >= corte]
+            filas = sorted(
+                ((float(promedio[i]), self._texto("estudiante_id", e["id"][i]), i) for i in candidatos),
+                reverse=True
+            )[:limite]
+            return [
+                {"nombre": self._texto("nombre_estudiante", e["nombre"][i]),
+                 "carrera": self._texto("carrera", e["carrera"][i]), "promedio": valor}
+                for valor, _, i in filas
+            ]
+    
+    def rendimiento_por_carrera(self) -> List[Dict[str, Any]]:
+        """Estudiantes, promedio y créditos medios por carrera (activos con promedio > 0)"""
+        with self._lock:
+            e = self.tablas["estudiantes"]
+            promedio = e["promedio_general"]
+            filtro = e["activo"] & (promedio > 0)
+            carreras = e["carrera"][filtro]
+            n = len(self.diccionarios["carrera"])
+            total = np.bincount(carreras, minlength=n)
+            suma_promedio = np.bincount(carreras, weights=promedio[filtro], minlength=n)
+            suma_creditos = np.bincount(carreras, weights=e["creditos_completados"][filtro], minlength=n)
+            filas = [
+                {"carrera": self._texto("carrera", codigo), "total_estudiantes": int(total[codigo]),
+                 "promedio_carrera": float(suma_promedio[codigo] / total[codigo]),
+                 "promedio_creditos": float(suma_creditos[codigo] / total[codigo])}
+                for codigo in np.flatnonzero(total)
+            ]
+            filas.sort(key=lambda r: r["promedio_carrera"], reverse=True)
+            return filas
+    
+    def metricas_dashboard(self) -> Dict[str, Any]:
+        with self._lock:
+            e, c, m = self.tablas["estudiantes"], self.tablas["cursos"], self.tablas["matriculas"]
+            promedio = e["promedio_general"]
+            return {
+                "estudiantes_activos": int(e["activo"].sum()),
+                "cursos_activos": int(c["activo"].sum()),
+                "matriculas_activas": int((m["estado"] == self._codigo_estado("Matriculado")).sum()),
+                "promedio_general": self._media(promedio[promedio > 0])
+            }
+    
+    def distribucion_años(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            e = self.tablas["estudiantes"]
+            años = e["año"][e["activo"]].astype(np.int64)
+            if not len(años):
+                return []
+            minimo = int(años.min())
+            conteo = np.bincount(años - minimo)
+            return [{"año": int(i) + minimo, "cantidad": int(conteo[i])} for i in np.flatnonzero(conteo)]
+    
+    def cursos_mas_demandados(self, limite: int = 5) -> List[Dict[str, Any]]:
+        """Cursos activos con más matrículas en curso; los empates, por código"""
+        with self._lock:
+            c, m = self.tablas["cursos"], self.tablas["matriculas"]
+            diccionario = self.diccionarios["curso_codigo"]
+            en_curso = m["curso_codigo"][m["estado"] == self._codigo_estado("Matriculado")]
+            demanda = np.bincount(en_curso, minlength=len(diccionario))
+            activos = np.flatnonzero(c["activo"])
+            matriculados = demanda[c["codigo"][activos]]
+            codigos = [self._texto("curso_codigo", codigo) for codigo in c["codigo"][activos]]
+            orden = sorted(range(len(activos)), key=lambda i: (-matriculados[i], codigos[i]))[:limite]
+            return [
+                {"nombre": self._texto("nombre_curso", c["nombre"][activos[i]]), "codigo": codigos[i],
+                 "matriculados": int(matriculados[i]), "max_estudiantes": int(c["max_estudiantes"][activos[i]])}
+                for i in orden
+            ]
+    
+    def mascara_estudiantes(self, filtros: Dict[str, Any]) -> "np.ndarray":
+        """Filtros de buscar_estudiantes (carrera LIKE, año, activo, promedio_min) como máscara"""
+        with self._lock:
+            e = self.tablas["estudiantes"]
+            mascara = np.ones(e.filas, dtype=bool)
+            if filtros.get("carrera"):
+                patron = _like_a_regex(f"%{filtros['carrera']}%")
+                coincide = np.array([
+                    patron.fullmatch(str(valor).translate(_MINUSCULAS_ASCII)) is not None
+                    for valor in self.diccionarios["carrera"].valores
+                ], dtype=bool)
+                mascara &= coincide[e["carrera"]] if len(coincide) else False
+            if filtros.get("año"):
+                mascara &= e["año"] == float(filtros["año"])
+            if filtros.get("activo") is not None:
+                mascara &= e["activo"] == bool(filtros["activo"])
+            if filtros.get("promedio_min"):
+                mascara &= e["promedio_general"] >= float(filtros["promedio_min"])
+            return mascara
+    
+    def promedios_cohorte(self, filtros: Dict[str, Any]) -> "np.ndarray":
+        """Promedios de la cohorte ordenados (orden del índice activo, promedio), sin copiar el resto"""
+        with self._lock:
+            promedios = self.tablas["estudiantes"]["promedio_general"][self.mascara_estudiantes(filtros)]
+            return np.sort(np.nan_to_num(promedios, nan=0.0))
+    
+    def datos_cursos(self, codigos: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+        """(créditos, plazas) de los cursos pedidos que existen"""
+        with self._lock:
+            c = self.tablas["cursos"]
+            datos = {}
+            for codigo in codigos:
+                pos, existe = c.posicion(self.diccionarios["curso_codigo"].codigo(codigo))
+                if existe:
+                    datos[codigo] = (int(c["creditos"][pos]), int(c["max_estudiantes"][pos]))
+            return datos
+    
+    def historico_aprobacion(self, codigos: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+        """(calificadas, aprobadas con nota >= 5) por curso, solo cursos con alguna nota"""
+        with self._lock:
+            m = self.tablas["matriculas"]
+            n = len(self.diccionarios["curso_codigo"])
+            calificacion = m["calificacion"]
+            calificadas = ~np.isnan(calificacion)
+            cursos = m["curso_codigo"][calificadas]
+            total = np.bincount(cursos, minlength=n)
+            aprobadas = np.bincount(cursos, weights=calificacion[calificadas] >= 5, minlength=n)
+            historico = {}
+            for codigo in codigos:
+                i = self.diccionarios["curso_codigo"].codigo(codigo)
+                if i >= 0 and total[i]:
+                    historico[codigo] = (int(total[i]), int(aprobadas[i]))
+            return historico
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.estadisticas,
+                origen="mmap" if self.solo_lectura else "memoria",
+                ultimo_cambio=self.ultimo_cambio,
+                version=self.version,
+                filas={nombre: tabla.filas for nombre, tabla in self.tablas.items()},
+                bytes_columnas=sum(tabla.nbytes() for tabla in self.tablas.values()),
+                valores_diccionario={nombre: len(d) for nombre, d in self.diccionarios.items()}
+            )
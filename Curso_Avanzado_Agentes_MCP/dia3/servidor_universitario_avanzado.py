@@ -5,22 +5,52 @@ Implementa conexión real a base de datos, caching y herramientas avanzadas
 """
 
 import os
+import csv
+import gzip
 import json
 import sys
+import time
+import random
+import queue
+import atexit
+import weakref
+import threading
+import multiprocessing
 import asyncio
 import sqlite3
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from dataclasses import dataclass, asdict, fields, make_dataclass
 from pathlib import Path
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 import hashlib
+import base64
+import re
 import logging
 
+try:
+    import numpy as np
+except ImportError:  # La simulación de carga académica requiere NumPy
+    np = None
+
+from instantanea_columnar import InstantaneaColumnar
+
+# Registro de sentencias SQL compartido con el servidor del día 2
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dia2"))
+from consultas_sql import Consulta
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Los modelos se cachean por millones: con __slots__ no llevan __dict__ por
+# instancia, y los campos de pocos valores distintos se internan para que
+# todas las filas compartan la misma cadena en lugar de una copia por fila
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class Estudiante:
     """Modelo de datos para estudiante"""
     id: str
@@ -32,7 +62,11 @@ class Estudiante:
     fecha_ingreso: str
     creditos_completados: int = 0
 
-@dataclass
+    def __post_init__(self):
+        self.carrera = sys.intern(self.carrera)
+        self.fecha_ingreso = sys.intern(self.fecha_ingreso)
+
+@dataclass(**_SLOTS)
 class Curso:
     """Modelo de datos para curso"""
     codigo: str
@@ -44,7 +78,11 @@ class Curso:
     activo: bool
     semestre: str
 
-@dataclass
+    def __post_init__(self):
+        self.profesor = sys.intern(self.profesor)
+        self.semestre = sys.intern(self.semestre)
+
+@dataclass(**_SLOTS)
 class Matricula:
     """Modelo de datos para matrícula"""
     id: int
@@ -53,6 +91,343 @@ class Matricula:
     fecha_matricula: str
     calificacion: Optional[float] = None
     estado: str = "Matriculado"  # Matriculado, Aprobado, Reprobado, Retirado
+    
+    def __post_init__(self):
+        self.curso_codigo = sys.intern(self.curso_codigo)
+        self.fecha_matricula = sys.intern(self.fecha_matricula)
+        self.estado = sys.intern(self.estado)
+
+# Columnas por las que se puede ordenar buscar_estudiantes. Cada una está
+# respaldada por un índice compuesto (columna, id) para la paginación keyset.
+COLUMNAS_ORDEN_ESTUDIANTES = {
+    "nombre": "idx_estudiantes_nombre_id",
+    "año": "idx_estudiantes_año_id",
+    "fecha_ingreso": "idx_estudiantes_fecha_ingreso_id",
+    "promedio_general": "idx_estudiantes_promedio_id",
+    "creditos_completados": "idx_estudiantes_creditos_id",
+}
+
+# Columnas de orden que admiten NULL. Una comparación con NULL nunca es cierta,
+# así que el seek (columna, id) > (?, ?) perdería esas filas: se ordena y se
+# busca por COALESCE(columna, centinela), con un índice sobre esa expresión.
+# El centinela queda por debajo de cualquier valor válido, igual que NULL.
+# SQLite no usa un valor de fila sobre una expresión como rango del índice, así
+# que el seek se escribe expresion >= ? AND (expresion > ? OR id > ?): el rango
+# empieza en el último valor y solo se revisan las filas empatadas con él.
+CENTINELAS_ORDEN_ESTUDIANTES = {
+    "promedio_general": -1,
+    "creditos_completados": -1,
+}
+
+def _expresion_orden(columna: str) -> str:
+    """Expresión por la que se ordena y se busca una columna de orden"""
+    if columna in CENTINELAS_ORDEN_ESTUDIANTES:
+        return f"COALESCE({columna}, {CENTINELAS_ORDEN_ESTUDIANTES[columna]})"
+    return columna
+
+COLUMNAS_ESTUDIANTE = (
+    "id", "nombre", "email", "carrera", "año", "activo", "fecha_ingreso",
+    "creditos_completados", "promedio_general"
+)
+
+LIMITE_MAXIMO_PAGINA = 1000
+LIMITE_CONTEO_ESTIMADO = 10000
+
+# Migraciones de esquema versionadas: (versión, descripción, sentencias).
+# La versión aplicada se guarda en PRAGMA user_version.
+MIGRACIONES = [
+    (1, "Índices de paginación keyset, plazas ocupadas y feed de cambios", [
+        f"CREATE INDEX IF NOT EXISTS {indice} ON estudiantes ({columna}, id)"
+        for columna, indice in COLUMNAS_ORDEN_ESTUDIANTES.items()
+    ] + [
+        "CREATE INDEX IF NOT EXISTS idx_matriculas_curso_estado ON matriculas (curso_codigo, estado)",
+        "CREATE INDEX IF NOT EXISTS idx_log_actividad_tabla_timestamp ON log_actividad (tabla_afectada, timestamp)",
+    ]),
+    (2, "Índices compuestos y parciales para las consultas de las herramientas", [
+        # Cursos aprobados / matrículas de un estudiante
+        "CREATE INDEX IF NOT EXISTS idx_matriculas_estudiante_estado "
+        "ON matriculas (estudiante_id, estado, curso_codigo)",
+        # Matrículas en curso (dashboard, demanda por curso)
+        "CREATE INDEX IF NOT EXISTS idx_matriculas_activas "
+        "ON matriculas (curso_codigo) WHERE estado = 'Matriculado'",
+        # Histórico de calificaciones (tasa de aprobación, simulación)
+        "CREATE INDEX IF NOT EXISTS idx_matriculas_calificadas "
+        "ON matriculas (curso_codigo, estado, calificacion) WHERE calificacion IS NOT NULL",
+        # Estudiantes activos por carrera y año (análisis y dashboard)
+        "CREATE INDEX IF NOT EXISTS idx_estudiantes_activo_carrera "
+        "ON estudiantes (activo, carrera, promedio_general, creditos_completados)",
+        "CREATE INDEX IF NOT EXISTS idx_estudiantes_activo_año ON estudiantes (activo, año)",
+        "CREATE INDEX IF NOT EXISTS idx_estudiantes_activo_promedio ON estudiantes (activo, promedio_general)",
+    ]),
+    (3, "Feed de cambios por tabla paginado por id", [
+        "CREATE INDEX IF NOT EXISTS idx_log_actividad_tabla_id ON log_actividad (tabla_afectada, id)",
+    ]),
+    (4, "Índices de paginación keyset sobre columnas de orden que admiten NULL", [
+        f"CREATE INDEX IF NOT EXISTS {COLUMNAS_ORDEN_ESTUDIANTES[columna]}_coalesce "
+        f"ON estudiantes ({_expresion_orden(columna)}, id)"
+        for columna in CENTINELAS_ORDEN_ESTUDIANTES
+    ]),
+]
+
+# Tablas que pueden crecer sin límite: sus consultas no deben recorrerlas enteras
+TABLAS_GRANDES = ("estudiantes", "matriculas", "log_actividad")
+
+# Recorridos completos de tablas grandes aceptados a sabiendas en la
+# verificación de planes: (patrón sobre la consulta normalizada, motivo)
+SCAN_PERMITIDO = (
+    (r"FROM estudiantes WHERE 1=1 ORDER BY (\w+|COALESCE\(\w+, -?\d+\)) (ASC|DESC), id (ASC|DESC) LIMIT \d+$",
+     "primera página sin filtros: el índice (columna, id) da el orden y el LIMIT corta tras limite+1 filas"),
+    (r"^SELECT COUNT\(\*\) FROM \(SELECT 1 FROM estudiantes WHERE .* LIMIT \d+\)$",
+     "conteo estimado: acotado a LIMITE_CONTEO_ESTIMADO filas"),
+    (r"WHERE carrera LIKE '%[^']*%' AND activo = 1 ORDER BY (\w+|COALESCE\(\w+, -?\d+\)) (ASC|DESC), "
+     r"id (ASC|DESC) LIMIT \d+$",
+     "búsqueda de carrera por subcadena: ningún índice la acota; se sigue el orden del índice y el LIMIT "
+     "corta, pero una carrera sin coincidencias lee toda la tabla"),
+    (r"^SELECT COUNT\(\*\) FROM matriculas$|COUNT\(CASE WHEN estado = 'Aprobado' THEN 1 END\) \* 100\.0",
+     "agregados globales de analizar_rendimiento: necesitan todas las filas (recorren un índice de "
+     "cobertura) y con instantánea columnar no llegan a SQLite"),
+    (r"AS matriculas_activas",
+     "métricas del dashboard: agregado global, recorre el índice parcial de matrículas activas y se cachea"),
+)
+PALABRAS_TRAS_TABLA = {"WHERE", "JOIN", "LEFT", "INNER", "ON", "GROUP", "ORDER", "LIMIT", "USING", "CROSS"}
+
+# Tablas que exportar_datos puede volcar, con su lista fija de columnas
+TABLAS_EXPORTABLES = {
+    "estudiantes": COLUMNAS_ESTUDIANTE,
+    "cursos": (
+        "codigo", "nombre", "profesor", "creditos", "max_estudiantes",
+        "prerequisitos", "activo", "semestre", "descripcion"
+    ),
+    "matriculas": (
+        "id", "estudiante_id", "curso_codigo", "fecha_matricula",
+        "calificacion", "estado", "intentos"
+    ),
+    "log_actividad": (
+        "id", "tabla_afectada", "accion", "registro_id",
+        "datos_anteriores", "datos_nuevos", "usuario", "timestamp"
+    ),
+}
+
+EXTENSIONES_EXPORTACION = {"csv": ".csv", "jsonl": ".jsonl", "columnar": ".columnar.jsonl"}
+TAMANO_LOTE_EXPORTACION = 5000
+INTERVALO_PROGRESO_EXPORTACION = 100000
+
+LIMITE_CREDITOS_SEMESTRE = 30
+
+# Reintentos de procesar_matricula ante SQLITE_BUSY (segundos)
+REINTENTOS_MATRICULA = 8
+ESPERA_BLOQUEO_MATRICULA = 0.05
+BACKOFF_BASE_MATRICULA = 0.005
+BACKOFF_MAXIMO_MATRICULA = 0.5
+
+# Conexiones de lectura guardadas para reutilizar y refresco de la instantánea (segundos)
+TAMANO_POOL_LECTURA = 4
+INTERVALO_INSTANTANEA = 30.0
+
+# Herramientas que el modo multiproceso envía a los trabajadores; el resto se atiende en el front-end
+HERRAMIENTAS_CPU = ("analizar_rendimiento", "simular_carga_academica", "exportar_datos")
+PETICIONES_POR_TRABAJADOR = 500
+
+# Mínimo de segundos entre volcados de la instantánea columnar para los trabajadores
+INTERVALO_PUBLICACION_COLUMNAR = 1.0
+
+# Sentencias preparadas guardadas por conexión
+SENTENCIAS_PREPARADAS_POR_CONEXION = 256
+
+COLUMNAS_CAMBIO = (
+    "id", "tabla_afectada", "accion", "registro_id", "datos_anteriores",
+    "datos_nuevos", "usuario", "timestamp"
+)
+
+# Todas las sentencias de las herramientas, con sus columnas de resultado
+CONSULTAS = {
+    "grafo_prerequisitos": Consulta("SELECT codigo, prerequisitos FROM cursos"),
+    "ultimo_cambio": Consulta("SELECT COALESCE(MAX(id), 0) FROM log_actividad"),
+    "insertar_cambios": Consulta('''
+        INSERT INTO log_actividad (tabla_afectada, accion, registro_id,
+                                   datos_anteriores, datos_nuevos, usuario, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''),
+    "aprobados_de_estudiantes": Consulta('''
+        SELECT estudiante_id, curso_codigo FROM matriculas
+        WHERE estado = 'Aprobado' AND estudiante_id IN ({marcadores})
+    ''', ("estudiante_id", "curso_codigo")),
+    
+    # gestionar_curso
+    "insertar_curso": Consulta('''
+        INSERT INTO cursos (codigo, nombre, profesor, creditos, max_estudiantes,
+                            prerequisitos, semestre, descripcion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''),
+    "curso_por_codigo": Consulta('''
+        SELECT codigo, nombre, profesor, creditos, max_estudiantes, prerequisitos, semestre, descripcion
+        FROM cursos WHERE codigo = ?
+    ''', ("codigo", "nombre", "profesor", "creditos", "max_estudiantes", "prerequisitos",
+          "semestre", "descripcion")),
+    "estadisticas_curso": Consulta('''
+        SELECT COUNT(*) as matriculados,
+               AVG(calificacion) as promedio,
+               COUNT(CASE WHEN estado = 'Aprobado' THEN 1 END) as aprobados
+        FROM matriculas WHERE curso_codigo = ?
+    ''', ("matriculados", "promedio_calificaciones", "aprobados")),
+    "cursos_activos": Consulta('''
+        SELECT codigo, nombre, profesor, creditos, max_estudiantes, prerequisitos, semestre
+        FROM cursos WHERE activo = 1
+    ''', ("codigo", "nombre", "profesor", "creditos", "max_estudiantes", "prerequisitos", "semestre")),
+    
+    # analizar_rendimiento
+    "total_estudiantes": Consulta("SELECT COUNT(*) FROM estudiantes WHERE activo = 1"),
+    "promedio_sistema": Consulta(
+        "SELECT AVG(promedio_general) FROM estudiantes WHERE activo = 1 AND promedio_general > 0"),
+    "total_cursos": Consulta("SELECT COUNT(*) FROM cursos WHERE activo = 1"),
+    "total_matriculas": Consulta("SELECT COUNT(*) FROM matriculas"),
+    "tasa_aprobacion": Consulta('''
+        SELECT 
+            COUNT(CASE WHEN estado = 'Aprobado' THEN 1 END) * 100.0 / COUNT(*) 
+        FROM matriculas 
+        WHERE calificacion IS NOT NULL
+    '''),
+    "top_estudiantes": Consulta('''
+        SELECT nombre, carrera, promedio_general 
+        FROM estudiantes 
+        WHERE promedio_general > 0 
+        ORDER BY promedio_general DESC 
+        LIMIT 5
+    ''', ("nombre", "carrera", "promedio")),
+    "rendimiento_por_carrera": Consulta('''
+        SELECT carrera, 
+               COUNT(*) as total_estudiantes,
+               AVG(promedio_general) as promedio_carrera,
+               AVG(creditos_completados) as promedio_creditos
+        FROM estudiantes 
+        WHERE activo = 1 AND promedio_general > 0
+        GROUP BY carrera
+        ORDER BY promedio_carrera DESC
+    ''', ("carrera", "total_estudiantes", "promedio_carrera", "promedio_creditos")),
+    
+    # generar_dashboard
+    "metricas_dashboard": Consulta('''
+        SELECT 
+            (SELECT COUNT(*) FROM estudiantes WHERE activo = 1) as estudiantes_activos,
+            (SELECT COUNT(*) FROM cursos WHERE activo = 1) as cursos_activos,
+            (SELECT COUNT(*) FROM matriculas WHERE estado = 'Matriculado') as matriculas_activas,
+            (SELECT AVG(promedio_general) FROM estudiantes WHERE promedio_general > 0) as promedio_general
+    ''', ("estudiantes_activos", "cursos_activos", "matriculas_activas", "promedio_general")),
+    "distribucion_años": Consulta('''
+        SELECT año, COUNT(*) as cantidad
+        FROM estudiantes WHERE activo = 1
+        GROUP BY año ORDER BY año
+    ''', ("año", "cantidad")),
+    "cursos_mas_demandados": Consulta('''
+        SELECT c.nombre, c.codigo, COUNT(m.id) as matriculados, c.max_estudiantes
+        FROM cursos c
+        LEFT JOIN matriculas m ON c.codigo = m.curso_codigo AND m.estado = 'Matriculado'
+        WHERE c.activo = 1
+        GROUP BY c.codigo, c.nombre, c.max_estudiantes
+        ORDER BY matriculados DESC
+        LIMIT 5
+    ''', ("nombre", "codigo", "matriculados", "max_estudiantes")),
+    
+    # procesar_matricula
+    "estudiante_activo": Consulta("SELECT activo FROM estudiantes WHERE id = ?", ("activo",)),
+    "curso_plazas": Consulta("SELECT max_estudiantes, activo FROM cursos WHERE codigo = ?",
+                             ("max_estudiantes", "activo")),
+    "matricula_previa": Consulta('''
+        SELECT estado, intentos FROM matriculas
+        WHERE estudiante_id = ? AND curso_codigo = ?
+        ORDER BY intentos DESC LIMIT 1
+    ''', ("estado", "intentos")),
+    "aprobados_de_estudiante": Consulta(
+        "SELECT curso_codigo FROM matriculas WHERE estudiante_id = ? AND estado = 'Aprobado'"),
+    "insertar_matricula_con_plaza": Consulta('''
+        INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula, estado, intentos)
+        SELECT ?, ?, ?, 'Matriculado', ?
+        WHERE (SELECT COUNT(*) FROM matriculas
+               WHERE curso_codigo = ? AND estado = 'Matriculado') < ?
+    '''),
+    "matriculados_en_curso": Consulta(
+        "SELECT COUNT(*) FROM matriculas WHERE curso_codigo = ? AND estado = 'Matriculado'"),
+    
+    # simular_carga_academica
+    "datos_cursos": Consulta(
+        "SELECT codigo, creditos, max_estudiantes FROM cursos WHERE codigo IN ({marcadores})",
+        ("codigo", "creditos", "max_estudiantes")),
+    "historico_aprobacion": Consulta('''
+        SELECT curso_codigo, COUNT(*), SUM(CASE WHEN calificacion >= 5 THEN 1 ELSE 0 END)
+        FROM matriculas
+        WHERE calificacion IS NOT NULL AND curso_codigo IN ({marcadores})
+        GROUP BY curso_codigo
+    ''', ("codigo", "calificadas", "aprobadas")),
+    
+    # exportar_datos: una sentencia por tabla exportable
+    **{
+        f"exportar_{tabla}": Consulta(f"SELECT {', '.join(columnas)} FROM {tabla} ORDER BY rowid", columnas)
+        for tabla, columnas in TABLAS_EXPORTABLES.items()
+    },
+}
+
+# Condición de cada filtro de búsqueda de estudiantes, en el orden en que se aplican
+CONDICIONES_FILTRO_ESTUDIANTE = {
+    "carrera": "carrera LIKE ?",
+    "año": "año = ?",
+    "activo": "activo = ?",
+    # Sobre la misma expresión que el orden, para que el índice sirva a ambos
+    "promedio_min": f"{_expresion_orden('promedio_general')} >= ?",
+}
+
+# Las consultas con filtros opcionales se generan una vez por combinación de
+# filtros; el orden y la columna salen siempre de listas blancas, así que el
+# número de variantes (y de sentencias preparadas) está acotado.
+
+def _where_estudiantes(claves: Tuple[str, ...]) -> str:
+    return " AND ".join(CONDICIONES_FILTRO_ESTUDIANTE[c] for c in claves) or "1=1"
+
+@lru_cache(maxsize=None)
+def _consulta_pagina_estudiantes(claves: Tuple[str, ...], columna: str, descendente: bool,
+                                 desde_cursor: bool) -> Consulta:
+    """Página keyset de estudiantes; con desde_cursor añade la condición de seek"""
+    expresion = _expresion_orden(columna)
+    condiciones = [_where_estudiantes(claves)]
+    if desde_cursor:
+        signo = "<" if descendente else ">"
+        if expresion == columna:
+            condiciones.append(f"({columna}, id) {signo} (?, ?)")
+        else:
+            condiciones.append(f"{expresion} {signo}= ? AND ({expresion} {signo} ? OR id {signo} ?)")
+    direccion = "DESC" if descendente else "ASC"
+    return Consulta(f"""
+        SELECT {", ".join(COLUMNAS_ESTUDIANTE)}
+        FROM estudiantes
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY {expresion} {direccion}, id {direccion}
+        LIMIT ?
+    """, COLUMNAS_ESTUDIANTE)
+
+@lru_cache(maxsize=None)
+def _consulta_conteo_estudiantes(claves: Tuple[str, ...], acotado: bool) -> Consulta:
+    """Conteo exacto, o acotado con LIMIT para dejar de recorrer filas al alcanzarlo"""
+    if acotado:
+        return Consulta(f"SELECT COUNT(*) FROM (SELECT 1 FROM estudiantes WHERE {_where_estudiantes(claves)} LIMIT ?)")
+    return Consulta(f"SELECT COUNT(*) FROM estudiantes WHERE {_where_estudiantes(claves)}")
+
+@lru_cache(maxsize=None)
+def _consulta_cohorte(claves: Tuple[str, ...], columna: str) -> Consulta:
+    """Una columna de los estudiantes de una cohorte"""
+    return Consulta(f"SELECT {columna} FROM estudiantes WHERE {_where_estudiantes(claves)}", (columna,))
+
+@lru_cache(maxsize=None)
+def _consulta_cambios(por_tabla: bool, por_timestamp: bool) -> Consulta:
+    """Feed de log_actividad, ordenado y paginado siempre por id"""
+    condiciones = ["id > ?"]
+    if por_tabla:
+        condiciones.append("tabla_afectada = ?")
+    if por_timestamp:
+        condiciones.append("timestamp > ?")
+    return Consulta(f"""
+        SELECT {", ".join(COLUMNAS_CAMBIO)}
+        FROM log_actividad WHERE {" AND ".join(condiciones)}
+        ORDER BY id LIMIT ?
+    """, COLUMNAS_CAMBIO)
 
 class CacheSimple:
     """Cache simple en memoria para optimizar consultas"""
@@ -76,16 +451,466 @@ class CacheSimple:
     def clear(self):
         self.cache.clear()
     
+    def invalidar(self, prefijo: str):
+        """Elimina las entradas cuya clave empieza por el prefijo dado"""
+        for key in list(self.cache):
+            if key.startswith(prefijo):
+                self.cache.pop(key, None)
+    
     def get_stats(self) -> Dict[str, Any]:
         return {
             "total_keys": len(self.cache),
             "cache_size_mb": sys.getsizeof(self.cache) / (1024 * 1024)
         }
 
+# Registros de cambios vivos; se cierran una sola vez al salir del proceso
+_REGISTROS_ABIERTOS: "weakref.WeakSet" = weakref.WeakSet()
+
+def _cerrar_registros():
+    for registro in list(_REGISTROS_ABIERTOS):
+        registro.cerrar()
+
+atexit.register(_cerrar_registros)
+
+class RegistroCambios:
+    """
+    Captura de cambios con escritura diferida (write-behind) en log_actividad.
+    
+    Las escrituras registran sus imágenes antes/después en una cola en memoria
+    y un hilo de fondo las vuelca en lotes, cada lote en una sola transacción.
+    La cola está acotada: si se llena, quien registra espera (backpressure) y,
+    si la espera se agota, escribe su cambio de forma síncrona para no perderlo.
+    Los suscriptores reciben cada cambio al registrarse, lo que permite usar el
+    registro como feed de invalidación de caches.
+    """
+    
+    def __init__(self, db_path: str, capacidad: int = 10000, tamano_lote: int = 500,
+                 intervalo_flush: float = 0.2, espera_maxima: float = 1.0,
+                 conectar: Optional[Callable[..., sqlite3.Connection]] = None,
+                 escritor: Optional[Callable[..., Any]] = None):
+        self.db_path = db_path
+        self._conectar = conectar or (lambda **opciones: sqlite3.connect(db_path, **opciones))
+        self._escritor = escritor or self._conexion_propia
+        self.cola: "queue.Queue" = queue.Queue(maxsize=capacidad)
+        self.tamano_lote = tamano_lote
+        self.intervalo_flush = intervalo_flush
+        self.espera_maxima = espera_maxima
+        self.suscriptores: List[Callable[[Dict[str, Any]], None]] = []
+        self.estadisticas = {
+            "registrados": 0, "escritos": 0, "lotes": 0,
+            "esperas_backpressure": 0, "escrituras_sincronas": 0
+        }
+        self._hilo = threading.Thread(target=self._bucle_escritura, name="registro-cambios", daemon=True)
+        self._hilo.start()
+        _REGISTROS_ABIERTOS.add(self)
+    
+    def suscribir(self, callback: Callable[[Dict[str, Any]], None]):
+        """Registra una función que recibe cada cambio en cuanto se produce"""
+        self.suscriptores.append(callback)
+    
+    def registrar(self, tabla: str, accion: str, registro_id: str,
+                  antes: Optional[Dict[str, Any]] = None, despues: Optional[Dict[str, Any]] = None,
+                  usuario: str = "sistema"):
+        """Encola un cambio y notifica a los suscriptores sin esperar a la escritura"""
+        cambio = {
+            "tabla_afectada": tabla,
+            "accion": accion,
+            "registro_id": str(registro_id),
+            "datos_anteriores": antes,
+            "datos_nuevos": despues,
+            "usuario": usuario,
+            "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        }
+        self.estadisticas["registrados"] += 1
+        
+        try:
+            self.cola.put_nowait(cambio)
+        except queue.Full:
+            self.estadisticas["esperas_backpressure"] += 1
+            try:
+                self.cola.put(cambio, timeout=self.espera_maxima)
+            except queue.Full:
+                self.estadisticas["escrituras_sincronas"] += 1
+                self._escribir_lote([cambio])
+        
+        for callback in self.suscriptores:
+            try:
+                callback(cambio)
+            except Exception as e:
+                logger.error(f"Error en suscriptor del registro de cambios: {e}")
+    
+    def _bucle_escritura(self):
+        """Hilo de fondo: agrupa cambios de la cola y los escribe por lotes"""
+        while True:
+            try:
+                primero = self.cola.get(timeout=self.intervalo_flush)
+            except queue.Empty:
+                continue
+            if primero is None:
+                break
+            
+            lote = [primero]
+            fin = False
+            while len(lote) < self.tamano_lote:
+                try:
+                    siguiente = self.cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    fin = True
+                    break
+                lote.append(siguiente)
+            
+            try:
+                self._escribir_lote(lote)
+            except Exception as e:
+                logger.error(f"Error escribiendo lote de log_actividad ({len(lote)} cambios): {e}")
+            finally:
+                for _ in lote:
+                    self.cola.task_done()
+            if fin:
+                break
+    
+    @contextmanager
+    def _conexion_propia(self, espera: float = 5.0):
+        """Conexión de escritura usada cuando no se comparte la del servidor"""
+        conn = self._conectar(timeout=espera)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def _escribir_lote(self, lote: List[Dict[str, Any]]):
+        """Escribe un lote de cambios en una única transacción"""
+        with self._escritor(5.0) as conn:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                CONSULTAS["insertar_cambios"].ejecutar_lote(conn, [
+                    (c["tabla_afectada"], c["accion"], c["registro_id"],
+                     json.dumps(c["datos_anteriores"]) if c["datos_anteriores"] is not None else None,
+                     json.dumps(c["datos_nuevos"]) if c["datos_nuevos"] is not None else None,
+                     c["usuario"], c["timestamp"])
+                    for c in lote
+                ])
+        self.estadisticas["escritos"] += len(lote)
+        self.estadisticas["lotes"] += 1
+    
+    def vaciar(self):
+        """Espera a que todos los cambios encolados estén escritos"""
+        self.cola.join()
+    
+    def cerrar(self):
+        """Vacía la cola y detiene el hilo de escritura"""
+        if self._hilo.is_alive():
+            self.cola.put(None)
+            self._hilo.join()
+    
+    def leer_cambios(self, desde_id: int = 0, tabla: Optional[str] = None,
+                     desde_timestamp: Optional[str] = None, limite: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Lee el feed de cambios ya escritos, ordenado por id para que desde_id
+        sirva de cursor. Por tabla se apoya en el índice (tabla_afectada, id).
+        """
+        params = [desde_id]
+        if tabla:
+            params.append(tabla)
+        if desde_timestamp:
+            params.append(desde_timestamp)
+        
+        conn = self._conectar()
+        try:
+            cambios = _consulta_cambios(bool(tabla), bool(desde_timestamp)).filas(conn, params + [limite])
+        finally:
+            conn.close()
+        
+        for cambio in cambios:
+            for imagen in ("datos_anteriores", "datos_nuevos"):
+                cambio[imagen] = json.loads(cambio[imagen]) if cambio[imagen] else None
+        return cambios
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.estadisticas, en_cola=self.cola.qsize())
+
+class GrafoPrerequisitos:
+    """
+    Índice en memoria del grafo de prerequisitos.
+    Cada curso ocupa una posición de bit; el cierre transitivo de sus
+    prerequisitos se guarda como un entero usado como bitset, de modo que
+    comprobar si un estudiante cumple los requisitos es un test de subconjunto.
+    """
+    
+    def __init__(self):
+        self.posiciones: Dict[str, int] = {}
+        self.codigos: List[str] = []
+        self.directos: Dict[str, List[str]] = {}
+        self.cierre: Dict[str, int] = {}
+    
+    def bit(self, codigo: str) -> int:
+        """Devuelve la máscara del curso, asignándole posición si es nuevo"""
+        if codigo not in self.posiciones:
+            self.posiciones[codigo] = len(self.codigos)
+            self.codigos.append(codigo)
+        return 1 << self.posiciones[codigo]
+    
+    def mascara(self, codigos) -> int:
+        """Convierte una colección de códigos en bitset"""
+        resultado = 0
+        for codigo in codigos:
+            resultado |= self.bit(codigo)
+        return resultado
+    
+    def a_codigos(self, bitset: int) -> List[str]:
+        """Convierte un bitset en la lista de códigos de curso"""
+        codigos = []
+        while bitset:
+            bajo = bitset & -bitset
+            codigos.append(self.codigos[bajo.bit_length() - 1])
+            bitset ^= bajo
+        return codigos
+    
+    def cargar(self, filas: List[tuple]):
+        """Construye el grafo desde filas (codigo, prerequisitos_json) de la tabla cursos"""
+        self.posiciones, self.codigos, self.directos = {}, [], {}
+        for codigo, prerequisitos in filas:
+            self.bit(codigo)
+            self.directos[codigo] = json.loads(prerequisitos or "[]")
+        self._recalcular_cierre()
+    
+    def _recalcular_cierre(self):
+        """Calcula el cierre transitivo en orden topológico (algoritmo de Kahn)"""
+        pendientes = {c: len(p) for c, p in self.directos.items()}
+        dependientes: Dict[str, List[str]] = {}
+        for codigo, prerequisitos in self.directos.items():
+            for p in prerequisitos:
+                dependientes.setdefault(p, []).append(codigo)
+                if p not in self.directos:
+                    # Prerequisito que aún no existe como curso: nodo hoja
+                    pendientes[codigo] -= 1
+        
+        self.cierre = {}
+        listos = [c for c, n in pendientes.items() if n == 0]
+        while listos:
+            codigo = listos.pop()
+            cierre = 0
+            for p in self.directos[codigo]:
+                cierre |= self.bit(p) | self.cierre.get(p, 0)
+            self.cierre[codigo] = cierre
+            for d in dependientes.get(codigo, []):
+                pendientes[d] -= 1
+                if pendientes[d] == 0:
+                    listos.append(d)
+        
+        en_ciclo = [c for c in self.directos if c not in self.cierre]
+        if en_ciclo:
+            logger.warning(f"Cursos afectados por un ciclo de prerequisitos: {en_ciclo}")
+            # Punto fijo para que los cursos afectados tengan un cierre utilizable
+            for codigo in en_ciclo:
+                self.cierre[codigo] = self.mascara(self.directos[codigo])
+            cambiado = True
+            while cambiado:
+                cambiado = False
+                for codigo in en_ciclo:
+                    nuevo = self.cierre[codigo]
+                    for p in self.directos[codigo]:
+                        nuevo |= self.cierre.get(p, 0)
+                    if nuevo != self.cierre[codigo]:
+                        self.cierre[codigo] = nuevo
+                        cambiado = True
+    
+    def detectar_ciclo(self, codigo: str, prerequisitos: List[str]) -> List[str]:
+        """Devuelve los prerequisitos que cerrarían un ciclo si se añade el curso"""
+        # Sin posición asignada ningún cierre lo contiene: solo cabe el autociclo.
+        # No se asigna aquí para no reservar posiciones a cursos rechazados
+        posicion = self.posiciones.get(codigo)
+        bit_curso = 0 if posicion is None else 1 << posicion
+        return [
+            p for p in prerequisitos
+            if p == codigo or self.cierre.get(p, 0) & bit_curso
+        ]
+    
+    def agregar_curso(self, codigo: str, prerequisitos: List[str]):
+        """Añade o actualiza un curso y propaga su cierre a los cursos que dependen de él"""
+        ciclo = self.detectar_ciclo(codigo, prerequisitos)
+        if ciclo:
+            raise ValueError(f"Los prerequisitos {ciclo} crearían un ciclo con {codigo}")
+        
+        if codigo in self.directos:
+            self.directos[codigo] = list(prerequisitos)
+            self._recalcular_cierre()
+            return
+        
+        self.directos[codigo] = list(prerequisitos)
+        bit_curso = self.bit(codigo)
+        cierre = 0
+        for p in prerequisitos:
+            cierre |= self.bit(p) | self.cierre.get(p, 0)
+        self.cierre[codigo] = cierre
+        
+        # Cursos creados antes que ya referenciaban a este código
+        for otro, cierre_otro in self.cierre.items():
+            if cierre_otro & bit_curso:
+                self.cierre[otro] = cierre_otro | cierre
+    
+    def requisitos(self, codigo: str) -> int:
+        """Cierre transitivo de prerequisitos de un curso como bitset"""
+        return self.cierre.get(codigo, 0)
+
+class ConexionLectura(sqlite3.Connection):
+    """Conexión de solo lectura que al cerrarse vuelve a su pool en lugar de cerrarse"""
+    
+    def close(self):
+        pool = getattr(self, "pool", None)
+        if pool is not None:
+            pool.devolver(self)
+        else:
+            super().close()
+    
+    def cerrar_definitivamente(self):
+        super().close()
+
+class PoolLecturas:
+    """
+    Pool de conexiones de solo lectura (mode=ro) para las herramientas de consulta.
+    
+    Las conexiones se reutilizan entre llamadas; el pool no tiene máximo de
+    conexiones en uso, solo de conexiones libres guardadas. Al cambiar la ruta
+    (por ejemplo al renovar una instantánea) sube la generación y las
+    conexiones antiguas se descartan en cuanto se devuelven.
+    """
+    
+    def __init__(self, db_path: str, tamano: int = 4):
+        self.db_path = db_path
+        self.tamano = tamano
+        self.generacion = 0
+        self._libres: "queue.LifoQueue" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.estadisticas = {"creadas": 0, "reutilizadas": 0, "descartadas": 0}
+    
+    def obtener(self) -> ConexionLectura:
+        """Devuelve una conexión libre de la generación actual o abre una nueva"""
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            if conn.generacion == self.generacion:
+                self.estadisticas["reutilizadas"] += 1
+                return conn
+            conn.cerrar_definitivamente()
+            self.estadisticas["descartadas"] += 1
+        
+        with self._lock:
+            ruta, generacion = self.db_path, self.generacion
+        conn = sqlite3.connect(f"{Path(ruta).resolve().as_uri()}?mode=ro", uri=True,
+                               factory=ConexionLectura, check_same_thread=False,
+                               cached_statements=SENTENCIAS_PREPARADAS_POR_CONEXION)
+        conn.pool = self
+        conn.generacion = generacion
+        self.estadisticas["creadas"] += 1
+        return conn
+    
+    def devolver(self, conn: ConexionLectura):
+        """Guarda la conexión para reutilizarla, o la cierra si sobra o es de otra generación"""
+        if conn.in_transaction:
+            conn.rollback()
+        if conn.generacion != self.generacion or self._libres.qsize() >= self.tamano:
+            conn.cerrar_definitivamente()
+            self.estadisticas["descartadas"] += 1
+        else:
+            self._libres.put(conn)
+    
+    def cambiar_ruta(self, db_path: str):
+        """Apunta el pool a otro fichero; las conexiones abiertas sobre el anterior se descartan"""
+        with self._lock:
+            self.db_path = db_path
+            self.generacion += 1
+    
+    def cerrar(self):
+        """Cierra todas las conexiones libres"""
+        while True:
+            try:
+                self._libres.get_nowait().cerrar_definitivamente()
+            except queue.Empty:
+                break
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.estadisticas, "libres": self._libres.qsize(), "generacion": self.generacion}
+
+class InstantaneaLectura:
+    """
+    Copia de la base de datos refrescada periódicamente con la API de backup.
+    
+    Las consultas analíticas largas leen de la copia, así que no mantienen
+    transacciones de lectura abiertas sobre la base de datos principal ni
+    retrasan sus checkpoints del WAL. Se alternan dos ficheros: cada refresco
+    escribe en el que no está en uso y después redirige el pool.
+    """
+    
+    def __init__(self, db_path: str, pool: PoolLecturas, intervalo: float = INTERVALO_INSTANTANEA,
+                 conectar: Optional[Callable[..., sqlite3.Connection]] = None):
+        self.db_path = db_path
+        self.pool = pool
+        self.intervalo = intervalo
+        self._conectar = conectar or (lambda **opciones: sqlite3.connect(db_path, **opciones))
+        base = Path(db_path)
+        self.ficheros = [str(base.with_name(f"{base.stem}.instantanea{i}{base.suffix}")) for i in (0, 1)]
+        self.activo = 1
+        self.refrescos = 0
+        self.ultimo_refresco: Optional[float] = None
+        self.refrescar()
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle_refresco, name="instantanea-lectura", daemon=True)
+        self._hilo.start()
+    
+    def refrescar(self):
+        """Copia la base de datos al fichero inactivo y lo convierte en el activo"""
+        inicio = time.perf_counter()
+        siguiente = 1 - self.activo
+        origen = self._conectar()
+        destino = sqlite3.connect(self.ficheros[siguiente], timeout=30.0)
+        try:
+            origen.backup(destino)
+            # La copia hereda el modo WAL; en modo DELETE se puede abrir con mode=ro sin -shm
+            destino.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            destino.close()
+            origen.close()
+        self.activo = siguiente
+        self.pool.cambiar_ruta(self.ficheros[siguiente])
+        self.refrescos += 1
+        self.ultimo_refresco = time.time()
+        logger.debug(f"Instantánea renovada en {time.perf_counter() - inicio:.3f}s")
+    
+    def _bucle_refresco(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.refrescar()
+            except Exception as e:
+                logger.error(f"Error renovando la instantánea de lectura: {e}")
+    
+    def cerrar(self):
+        """Detiene el refresco y borra las copias"""
+        self._parar.set()
+        self._hilo.join()
+        self.pool.cerrar()
+        for fichero in self.ficheros:
+            try:
+                os.remove(fichero)
+            except OSError:
+                pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "refrescos": self.refrescos,
+            "antiguedad_segundos": round(time.time() - self.ultimo_refresco, 1) if self.ultimo_refresco else None,
+            "pool": self.pool.get_stats()
+        }
+
 class UniversidadMCPAvanzado:
     """Servidor MCP avanzado con base de datos real y caching"""
     
-    def __init__(self, db_path: str = "universidad.db"):
+    def __init__(self, db_path: str = "universidad.db", tamano_pool_lectura: int = TAMANO_POOL_LECTURA,
+                 intervalo_instantanea: Optional[float] = None, columnar: bool = False):
         self.db_path = db_path
         self.cache = CacheSimple(ttl_seconds=300)  # 5 minutos
         self.tools = {
@@ -98,11 +923,54 @@ class UniversidadMCPAvanzado:
             "validar_prerequisitos": self.validar_prerequisitos,
             "simular_carga_academica": self.simular_carga_academica
         }
+        self.trazador_sql: Optional[Callable[[str], None]] = None
+        self.grafo_prerequisitos = GrafoPrerequisitos()
+        self.aprobados_cache: Dict[str, int] = {}
         self.init_database()
+        self._cargar_grafo_prerequisitos()
+        
+        # Un único escritor serializado; las consultas usan conexiones de solo lectura
+        self._escritor: Optional[sqlite3.Connection] = None
+        self._lock_escritura = threading.RLock()
+        self.pool_lectura = PoolLecturas(db_path, tamano_pool_lectura)
+        self.instantanea: Optional[InstantaneaLectura] = None
+        if intervalo_instantanea:
+            self.instantanea = InstantaneaLectura(
+                db_path, PoolLecturas(db_path, tamano_pool_lectura), intervalo_instantanea,
+                conectar=self._get_connection
+            )
+        
+        self.registro_cambios = RegistroCambios(db_path, conectar=self._get_connection,
+                                                escritor=self._conexion_escritura)
+        self.registro_cambios.suscribir(self._invalidar_por_cambio)
+        self.trabajadores: Optional[ProcessPoolExecutor] = None
+        # Pool de la simulación Monte Carlo en modo de un solo proceso: se crea
+        # en la primera llamada y se reutiliza, con el mismo límite de procesos
+        self.procesos_simulacion = os.cpu_count() or 1
+        self._pool_simulacion: Optional[ProcessPoolExecutor] = None
+        self._lock_pool_simulacion = threading.Lock()
+        
+        # Instantánea columnar opcional para las herramientas analíticas
+        self.columnar: Optional[InstantaneaColumnar] = None
+        self.ruta_columnar: Optional[str] = None
+        self._columnar_publicada: Optional[Tuple[int, float]] = None
+        if columnar:
+            if np is None:
+                logger.warning("La instantánea columnar requiere NumPy: se usará SQLite")
+            else:
+                self.columnar = InstantaneaColumnar(
+                    conectar=self._get_connection_lectura,
+                    leer_cambios=lambda desde, limite: self.cambios_desde(desde, limite=limite)
+                )
+                self.columnar.cargar()
+                base = Path(db_path).resolve()
+                self.ruta_columnar = str(base.with_name(f"{base.stem}.columnar"))
     
     def init_database(self):
         """Inicializa la base de datos con esquema avanzado"""
         conn = sqlite3.connect(self.db_path)
+        # WAL permite lecturas concurrentes mientras una transacción escribe
+        conn.execute("PRAGMA journal_mode=WAL")
         cursor = conn.cursor()
         
         # Esquema más completo
@@ -162,6 +1030,9 @@ class UniversidadMCPAvanzado:
         
         for query in schema_queries:
             cursor.execute(query)
+        conn.commit()
+        
+        self._aplicar_migraciones(conn)
         
         # Insertar datos de ejemplo si la tabla está vacía
         cursor.execute("SELECT COUNT(*) FROM estudiantes")
@@ -172,6 +1043,18 @@ class UniversidadMCPAvanzado:
         conn.close()
         logger.info(f"Base de datos inicializada: {self.db_path}")
     
+    def _aplicar_migraciones(self, conn):
+        """Aplica en orden las migraciones con versión mayor que PRAGMA user_version"""
+        version_actual = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version <= version_actual:
+                continue
+            with conn:
+                for sentencia in sentencias:
+                    conn.execute(sentencia)
+                conn.execute(f"PRAGMA user_version = {version}")
+            logger.info(f"Migración {version} aplicada: {descripcion}")
+    
     def _insertar_datos_ejemplo(self, cursor):
         """Inserta datos de ejemplo más realistas"""
         estudiantes_ejemplo = [
@@ -216,167 +1099,422 @@ class UniversidadMCPAvanzado:
             VALUES (?, ?, ?, ?, ?)
         ''', matriculas_ejemplo)
     
-    def _get_connection(self):
+    def _get_connection(self, **opciones):
         """Obtiene conexión a la base de datos"""
-        return sqlite3.connect(self.db_path)
+        opciones.setdefault("cached_statements", SENTENCIAS_PREPARADAS_POR_CONEXION)
+        conn = sqlite3.connect(self.db_path, **opciones)
+        if self.trazador_sql:
+            conn.set_trace_callback(self.trazador_sql)
+        return conn
+    
+    def _get_connection_lectura(self, instantanea: bool = False) -> ConexionLectura:
+        """
+        Conexión de solo lectura del pool; close() la devuelve al pool.
+        
+        Con instantanea=True, y si el servidor tiene una configurada, lee de la
+        copia periódica en lugar de la base de datos principal (puede ir hasta
+        intervalo_instantanea segundos por detrás).
+        """
+        pool = self.instantanea.pool if instantanea and self.instantanea else self.pool_lectura
+        conn = pool.obtener()
+        conn.set_trace_callback(self.trazador_sql)
+        return conn
+    
+    @contextmanager
+    def _conexion_escritura(self, espera: float = 5.0):
+        """Conexión de escritura única (autocommit, transacciones explícitas) bajo un lock"""
+        with self._lock_escritura:
+            if self._escritor is None:
+                self._escritor = self._get_connection(isolation_level=None, check_same_thread=False)
+            self._escritor.set_trace_callback(self.trazador_sql)
+            self._escritor.execute(f"PRAGMA busy_timeout = {int(espera * 1000)}")
+            yield self._escritor
+    
+    def _invalidar_por_cambio(self, cambio: Dict[str, Any]):
+        """Suscriptor del registro de cambios: invalida las caches afectadas"""
+        tabla = cambio["tabla_afectada"]
+        self.cache.invalidar("dashboard")
+        if tabla == "estudiantes":
+            self.cache.invalidar("buscar_estudiantes")
+        elif tabla == "matriculas":
+            for imagen in (cambio["datos_anteriores"], cambio["datos_nuevos"]):
+                if imagen and imagen.get("estado") == "Aprobado":
+                    self.invalidar_aprobados(imagen.get("estudiante_id"))
+    
+    def cambios_desde(self, desde_id: int = 0, tabla: Optional[str] = None,
+                      limite: int = 1000) -> List[Dict[str, Any]]:
+        """Feed de cambios persistidos posteriores a desde_id"""
+        return self.registro_cambios.leer_cambios(desde_id, tabla, limite=limite)
+    
+    def _instantanea_columnar(self) -> Optional[InstantaneaColumnar]:
+        """
+        Instantánea columnar al día, o None si el servidor no tiene. Aplica
+        los cambios ya volcados a log_actividad (los del write-behind aún en
+        cola llegan en la siguiente llamada) o, en un trabajador, vuelve a
+        mapear el fichero si el front-end lo ha renovado.
+        """
+        if self.columnar is None:
+            return None
+        try:
+            self.columnar.refrescar()
+        except Exception as e:
+            logger.error(f"Error refrescando la instantánea columnar: {e}")
+        return self.columnar
+    
+    def _publicar_columnar(self, forzar: bool = False):
+        """Vuelca la instantánea para los trabajadores si ha cambiado desde el último volcado"""
+        columnar = self._instantanea_columnar()
+        if columnar is None:
+            return
+        version, momento = self._columnar_publicada or (None, 0.0)
+        if forzar or (columnar.version != version
+                      and time.monotonic() - momento >= INTERVALO_PUBLICACION_COLUMNAR):
+            columnar.persistir(self.ruta_columnar)
+            self._columnar_publicada = (columnar.version, time.monotonic())
+    
+    def cerrar(self):
+        """Vuelca los cambios pendientes, detiene los hilos de fondo y cierra las conexiones"""
+        if self.trabajadores:
+            self.trabajadores.shutdown(wait=True)
+            self.trabajadores = None
+        with self._lock_pool_simulacion:
+            if self._pool_simulacion is not None:
+                self._pool_simulacion.shutdown(wait=True)
+                self._pool_simulacion = None
+        if self.columnar:
+            self.columnar.cerrar()
+            if self._columnar_publicada and self.ruta_columnar:
+                try:
+                    os.remove(self.ruta_columnar)
+                except OSError:
+                    pass
+        self.registro_cambios.cerrar()
+        if self.instantanea:
+            self.instantanea.cerrar()
+        self.pool_lectura.cerrar()
+        with self._lock_escritura:
+            if self._escritor is not None:
+                self._escritor.close()
+                self._escritor = None
+    
+    def _cargar_grafo_prerequisitos(self):
+        """Construye el grafo de prerequisitos una sola vez a partir de la tabla cursos"""
+        conn = self._get_connection()
+        try:
+            filas = CONSULTAS["grafo_prerequisitos"].ejecutar(conn).fetchall()
+        finally:
+            conn.close()
+        self.grafo_prerequisitos.cargar(filas)
+        # Las posiciones de bit se reasignan: los bitsets de aprobados ya no valen
+        self.invalidar_aprobados()
+        logger.info(f"Grafo de prerequisitos cargado: {len(filas)} cursos")
+    
+    def invalidar_aprobados(self, estudiante_id: Optional[str] = None):
+        """Descarta el conjunto de cursos aprobados cacheado de un estudiante (o de todos)"""
+        if estudiante_id is None:
+            self.aprobados_cache.clear()
+        else:
+            self.aprobados_cache.pop(estudiante_id, None)
+    
+    def _cargar_aprobados(self, cursor, estudiante_ids: List[str]) -> Dict[str, int]:
+        """Devuelve los cursos aprobados como bitset, consultando solo los que no están en cache"""
+        faltan = list(dict.fromkeys(e for e in estudiante_ids if e not in self.aprobados_cache))
+        nuevos = dict.fromkeys(faltan, 0)
+        for fila in CONSULTAS["aprobados_de_estudiantes"].filas_in(cursor, faltan):
+            nuevos[fila["estudiante_id"]] |= self.grafo_prerequisitos.bit(fila["curso_codigo"])
+        self.aprobados_cache.update(nuevos)
+        return {e: self.aprobados_cache[e] for e in estudiante_ids}
+    
+    def _parsear_orden(self, orden: str) -> tuple:
+        """Valida el criterio de orden contra la lista blanca y devuelve (columna, descendente)"""
+        texto = (orden or "nombre").strip()
+        descendente = False
+        if texto.startswith("-"):
+            texto, descendente = texto[1:], True
+        partes = texto.split()
+        if len(partes) == 2 and partes[1].upper() in ("ASC", "DESC"):
+            descendente = partes[1].upper() == "DESC"
+            partes = partes[:1]
+        if len(partes) != 1 or partes[0] not in COLUMNAS_ORDEN_ESTUDIANTES:
+            raise ValueError(
+                f"Orden no permitido: '{orden}'. Columnas válidas: "
+                f"{', '.join(COLUMNAS_ORDEN_ESTUDIANTES)}"
+            )
+        return partes[0], descendente
+    
+    def _construir_filtros_estudiantes(self, filtros: Dict[str, Any]) -> tuple:
+        """Traduce los filtros de búsqueda a (claves de CONDICIONES_FILTRO_ESTUDIANTE, parámetros)"""
+        claves = []
+        params = []
+        
+        if filtros.get("carrera"):
+            claves.append("carrera")
+            params.append(f"%{filtros['carrera']}%")
+        
+        if filtros.get("año"):
+            claves.append("año")
+            params.append(filtros["año"])
+        
+        if filtros.get("activo") is not None:
+            claves.append("activo")
+            params.append(filtros["activo"])
+        
+        if filtros.get("promedio_min"):
+            claves.append("promedio_min")
+            params.append(filtros["promedio_min"])
+        
+        return tuple(claves), params
+    
+    @staticmethod
+    def _huella_filtros(filtros: Dict[str, Any]) -> str:
+        """Huella corta de los filtros para ligar un cursor a su búsqueda"""
+        return hashlib.sha256(json.dumps(filtros, sort_keys=True).encode()).hexdigest()[:12]
+    
+    @staticmethod
+    def _codificar_cursor(datos: List[Any]) -> str:
+        """Codifica la posición de paginación como token opaco"""
+        return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def _decodificar_cursor(token: str) -> List[Any]:
+        """Decodifica un token generado por _codificar_cursor"""
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(token + "===").decode())
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Cursor de paginación inválido")
+        if not isinstance(datos, list) or len(datos) != 5:
+            raise ValueError("Cursor de paginación inválido")
+        return datos
+    
+    def _pagina_estudiantes(self, cursor, filtros: Dict[str, Any], orden: str,
+                            limite: int, token: Optional[str] = None) -> tuple:
+        """
+        Obtiene una página de estudiantes con paginación keyset (seek).
+        Devuelve (filas, siguiente_token). El coste no depende de la profundidad
+        de la página: se busca en el índice (columna, id) desde la última fila vista.
+        """
+        columna, descendente = self._parsear_orden(orden)
+        claves, params = self._construir_filtros_estudiantes(filtros)
+        huella = self._huella_filtros(filtros)
+        
+        if token:
+            orden_token, desc_token, huella_token, ultimo_valor, ultimo_id = self._decodificar_cursor(token)
+            if [orden_token, desc_token, huella_token] != [columna, descendente, huella]:
+                raise ValueError("El cursor no corresponde a esta búsqueda (orden o filtros distintos)")
+            if columna in CENTINELAS_ORDEN_ESTUDIANTES:
+                params.append(ultimo_valor)
+            params.extend([ultimo_valor, ultimo_id])
+        
+        # La columna de orden sale de la lista blanca, nunca de la entrada del usuario
+        consulta = _consulta_pagina_estudiantes(claves, columna, descendente, bool(token))
+        filas = consulta.filas(cursor, params + [limite + 1])
+        
+        siguiente_token = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            ultimo_valor = ultima[columna]
+            if ultimo_valor is None:
+                ultimo_valor = CENTINELAS_ORDEN_ESTUDIANTES[columna]
+            siguiente_token = self._codificar_cursor([
+                columna, descendente, huella, ultimo_valor, ultima["id"]
+            ])
+        
+        return filas, siguiente_token
+    
+    def _contar_estudiantes(self, cursor, filtros: Dict[str, Any], modo: str) -> Optional[int]:
+        """Cuenta coincidencias en modo 'exacto', 'estimado' (acotado) o 'ninguno'"""
+        if modo == "ninguno":
+            return None
+        
+        claves, params = self._construir_filtros_estudiantes(filtros)
+        if modo == "exacto":
+            return _consulta_conteo_estudiantes(claves, False).valor(cursor, params)
+        return _consulta_conteo_estudiantes(claves, True).valor(cursor, params + [LIMITE_CONTEO_ESTIMADO])
+    
+    @staticmethod
+    def _fila_a_estudiante(e: Dict[str, Any]) -> Dict[str, Any]:
+        """Normaliza una fila de COLUMNAS_ESTUDIANTE (activo como booleano)"""
+        e["activo"] = bool(e["activo"])
+        return e
     
     def buscar_estudiantes(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Búsqueda avanzada de estudiantes con filtros múltiples"""
+        """
+        Búsqueda avanzada de estudiantes con filtros múltiples y paginación keyset.
+        
+        Argumentos: filtros, orden (columna permitida, con prefijo '-' o sufijo
+        DESC para orden descendente), limite, cursor (valor de 'siguiente_cursor'
+        de la página anterior) y conteo ('estimado', 'exacto' o 'ninguno').
+        """
         try:
             filtros = args.get("filtros", {})
             orden = args.get("orden", "nombre")
-            limite = args.get("limite", 50)
+            limite = max(1, min(int(args.get("limite", 50)), LIMITE_MAXIMO_PAGINA))
+            token = args.get("cursor")
+            modo_conteo = args.get("conteo", "estimado")
+            
+            if modo_conteo not in ("estimado", "exacto", "ninguno"):
+                return {"success": False, "error": f"Modo de conteo no soportado: {modo_conteo}"}
             
-            # Crear clave de cache
-            cache_key = f"buscar_estudiantes_{hash(str(sorted(filtros.items())))}"
+            # Crear clave de cache con todos los parámetros que afectan al resultado
+            cache_key = "buscar_estudiantes_" + json.dumps(
+                [filtros, orden, limite, token, modo_conteo], sort_keys=True, default=str
+            )
             cached_result = self.cache.get(cache_key)
             if cached_result:
                 logger.info("Resultado obtenido del cache")
                 return cached_result
             
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            # Construir consulta dinámica
-            where_clauses = []
-            params = []
-            
-            if filtros.get("carrera"):
-                where_clauses.append("carrera LIKE ?")
-                params.append(f"%{filtros['carrera']}%")
-            
-            if filtros.get("año"):
-                where_clauses.append("año = ?")
-                params.append(filtros["año"])
-            
-            if filtros.get("activo") is not None:
-                where_clauses.append("activo = ?")
-                params.append(filtros["activo"])
-            
-            if filtros.get("promedio_min"):
-                where_clauses.append("promedio_general >= ?")
-                params.append(filtros["promedio_min"])
-            
-            where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
-            
-            query = f'''
-                SELECT id, nombre, email, carrera, año, activo, fecha_ingreso, 
-                       creditos_completados, promedio_general
-                FROM estudiantes 
-                WHERE {where_sql}
-                ORDER BY {orden}
-                LIMIT ?
-            '''
-            params.append(limite)
-            
-            cursor.execute(query, params)
-            estudiantes = cursor.fetchall()
-            
-            # Obtener estadísticas adicionales
-            cursor.execute(f"SELECT COUNT(*) FROM estudiantes WHERE {where_sql}", params[:-1])
-            total_encontrados = cursor.fetchone()[0]
+            conn = self._get_connection_lectura()
+            try:
+                cursor = conn.cursor()
+                estudiantes, siguiente_token = self._pagina_estudiantes(
+                    cursor, filtros, orden, limite, token
+                )
+                total_encontrados = self._contar_estudiantes(cursor, filtros, modo_conteo)
+            finally:
+                conn.close()
             
             resultado = {
                 "success": True,
                 "data": {
-                    "estudiantes": [
-                        {
-                            "id": e[0], "nombre": e[1], "email": e[2], "carrera": e[3],
-                            "año": e[4], "activo": bool(e[5]), "fecha_ingreso": e[6],
-                            "creditos_completados": e[7], "promedio_general": e[8]
-                        } for e in estudiantes
-                    ],
+                    "estudiantes": [self._fila_a_estudiante(e) for e in estudiantes],
                     "total_encontrados": total_encontrados,
+                    "total_es_estimado": (
+                        modo_conteo == "estimado" and total_encontrados == LIMITE_CONTEO_ESTIMADO
+                    ),
                     "mostrando": len(estudiantes),
+                    "siguiente_cursor": siguiente_token,
                     "filtros_aplicados": filtros
                 }
             }
             
-            conn.close()
-            
             # Guardar en cache
             self.cache.set(cache_key, resultado)
             
             return resultado
             
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"Error en buscar_estudiantes: {e}")
             return {"success": False, "error": str(e)}
     
+    def iterar_estudiantes(self, filtros: Dict[str, Any], orden: str = "nombre",
+                           tamano_lote: int = 500):
+        """
+        Recorre todos los estudiantes que cumplen los filtros en lotes de tamaño
+        fijo. Cada lote se pide con paginación keyset, así que la memoria usada
+        no depende del número total de coincidencias.
+        """
+        tamano_lote = max(1, min(tamano_lote, LIMITE_MAXIMO_PAGINA))
+        conn = self._get_connection_lectura()
+        try:
+            cursor = conn.cursor()
+            token = None
+            while True:
+                filas, token = self._pagina_estudiantes(cursor, filtros, orden, tamano_lote, token)
+                if filas:
+                    yield [self._fila_a_estudiante(e) for e in filas]
+                if not token:
+                    break
+        finally:
+            conn.close()
+    
+    def stream_buscar_estudiantes(self, args: Dict[str, Any]):
+        """
+        Versión en streaming de buscar_estudiantes: produce un bloque de
+        contenido MCP por lote y un bloque final de cierre.
+        """
+        filtros = args.get("filtros", {})
+        orden = args.get("orden", "nombre")
+        tamano_lote = int(args.get("tamano_lote", 500))
+        enviados = 0
+        
+        try:
+            for secuencia, lote in enumerate(self.iterar_estudiantes(filtros, orden, tamano_lote)):
+                enviados += len(lote)
+                yield {"type": "text", "text": json.dumps({
+                    "secuencia": secuencia, "estudiantes": lote, "fin": False
+                })}
+            yield {"type": "text", "text": json.dumps({
+                "success": True, "total_enviados": enviados, "fin": True
+            })}
+        except ValueError as e:
+            yield {"type": "text", "text": json.dumps({
+                "success": False, "error": str(e), "fin": True
+            })}
+    
     def gestionar_curso(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """CRUD completo para gestión de cursos"""
         try:
             accion = args.get("accion")  # crear, leer, actualizar, eliminar
             datos_curso = args.get("datos", {})
             
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
             if accion == "crear":
                 curso = datos_curso
-                cursor.execute('''
-                    INSERT INTO cursos (codigo, nombre, profesor, creditos, max_estudiantes, 
-                                      prerequisitos, semestre, descripcion)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    curso["codigo"], curso["nombre"], curso["profesor"], 
-                    curso["creditos"], curso["max_estudiantes"],
-                    json.dumps(curso.get("prerequisitos", [])),
-                    curso["semestre"], curso.get("descripcion", "")
-                ))
-                conn.commit()
+                prerequisitos = curso.get("prerequisitos", [])
+                
+                # Comprobación de ciclos, inserción y grafo bajo el mismo lock de
+                # escritura: dos altas concurrentes no pueden cerrar un ciclo entre sí
+                with self._conexion_escritura() as conn:
+                    ciclo = self.grafo_prerequisitos.detectar_ciclo(curso["codigo"], prerequisitos)
+                    if ciclo:
+                        return {
+                            "success": False,
+                            "error": f"Los prerequisitos {ciclo} crearían un ciclo con {curso['codigo']}"
+                        }
+                    try:
+                        with conn:
+                            conn.execute("BEGIN IMMEDIATE")
+                            CONSULTAS["insertar_curso"].ejecutar(conn, (
+                                curso["codigo"], curso["nombre"], curso["profesor"], 
+                                curso["creditos"], curso["max_estudiantes"],
+                                json.dumps(prerequisitos),
+                                curso["semestre"], curso.get("descripcion", "")
+                            ))
+                            # Antes del COMMIT: si falla, la inserción se deshace
+                            self.grafo_prerequisitos.agregar_curso(curso["codigo"], prerequisitos)
+                    except Exception:
+                        # El grafo puede haber quedado a medias o por delante de la
+                        # tabla: se reconstruye desde lo que sí está confirmado
+                        self._cargar_grafo_prerequisitos()
+                        raise
+                self.registro_cambios.registrar(
+                    "cursos", "INSERT", curso["codigo"], None,
+                    dict(curso, prerequisitos=prerequisitos), args.get("usuario", "sistema")
+                )
                 resultado = {"success": True, "message": f"Curso {curso['codigo']} creado"}
             
             elif accion == "leer":
+                conn = self._get_connection_lectura()
+                cursor = conn.cursor()
                 codigo = datos_curso.get("codigo")
                 if codigo:
-                    cursor.execute("SELECT * FROM cursos WHERE codigo = ?", (codigo,))
-                    curso = cursor.fetchone()
+                    curso = CONSULTAS["curso_por_codigo"].fila(cursor, (codigo,))
                     if curso:
+                        curso["prerequisitos"] = json.loads(curso["prerequisitos"])
                         # Obtener estadísticas del curso
-                        cursor.execute('''
-                            SELECT COUNT(*) as matriculados,
-                                   AVG(calificacion) as promedio,
-                                   COUNT(CASE WHEN estado = 'Aprobado' THEN 1 END) as aprobados
-                            FROM matriculas WHERE curso_codigo = ?
-                        ''', (codigo,))
-                        stats = cursor.fetchone()
+                        stats = CONSULTAS["estadisticas_curso"].fila(cursor, (codigo,))
+                        if stats["promedio_calificaciones"]:
+                            stats["promedio_calificaciones"] = round(stats["promedio_calificaciones"], 2)
+                        else:
+                            stats["promedio_calificaciones"] = None
                         
                         resultado = {
                             "success": True,
-                            "data": {
-                                "curso": {
-                                    "codigo": curso[0], "nombre": curso[1], "profesor": curso[2],
-                                    "creditos": curso[3], "max_estudiantes": curso[4],
-                                    "prerequisitos": json.loads(curso[5]),
-                                    "semestre": curso[7], "descripcion": curso[8]
-                                },
-                                "estadisticas": {
-                                    "matriculados": stats[0],
-                                    "promedio_calificaciones": round(stats[1], 2) if stats[1] else None,
-                                    "aprobados": stats[2]
-                                }
-                            }
+                            "data": {"curso": curso, "estadisticas": stats}
                         }
                 else:
-                    cursor.execute("SELECT * FROM cursos WHERE activo = 1")
-                    cursos = cursor.fetchall()
-                    resultado = {
-                        "success": True,
-                        "data": [
-                            {
-                                "codigo": c[0], "nombre": c[1], "profesor": c[2],
-                                "creditos": c[3], "max_estudiantes": c[4],
-                                "prerequisitos": json.loads(c[5]),
-                                "semestre": c[7]
-                            } for c in cursos
-                        ]
-                    }
+                    cursos = CONSULTAS["cursos_activos"].filas(cursor)
+                    for c in cursos:
+                        c["prerequisitos"] = json.loads(c["prerequisitos"])
+                    resultado = {"success": True, "data": cursos}
+                conn.close()
             
             else:
                 resultado = {"success": False, "error": f"Acción '{accion}' no soportada"}
             
-            conn.close()
             return resultado
             
         except Exception as e:
@@ -388,65 +1526,39 @@ class UniversidadMCPAvanzado:
         try:
             tipo_analisis = args.get("tipo", "general")  # general, por_carrera, por_curso
             
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            # Con instantánea columnar se agrega sobre sus arrays; si no, en SQLite
+            columnar = self._instantanea_columnar()
+            conn = None if columnar else self._get_connection_lectura(instantanea=True)
+            cursor = conn.cursor() if conn else None
             
             resultado = {"success": True, "data": {"tipo_analisis": tipo_analisis}}
             
             if tipo_analisis == "general":
                 # Estadísticas generales del sistema
-                queries = {
-                    "total_estudiantes": "SELECT COUNT(*) FROM estudiantes WHERE activo = 1",
-                    "promedio_sistema": "SELECT AVG(promedio_general) FROM estudiantes WHERE activo = 1 AND promedio_general > 0",
-                    "total_cursos": "SELECT COUNT(*) FROM cursos WHERE activo = 1",
-                    "total_matriculas": "SELECT COUNT(*) FROM matriculas",
-                    "tasa_aprobacion": '''
-                        SELECT 
-                            COUNT(CASE WHEN estado = 'Aprobado' THEN 1 END) * 100.0 / COUNT(*) 
-                        FROM matriculas 
-                        WHERE calificacion IS NOT NULL
-                    '''
-                }
-                
-                for key, query in queries.items():
-                    cursor.execute(query)
-                    valor = cursor.fetchone()[0]
+                if columnar:
+                    valores = columnar.rendimiento_general()
+                else:
+                    valores = {key: CONSULTAS[key].valor(cursor) for key in (
+                        "total_estudiantes", "promedio_sistema", "total_cursos",
+                        "total_matriculas", "tasa_aprobacion")}
+                for key, valor in valores.items():
                     resultado["data"][key] = round(valor, 2) if valor else 0
                 
                 # Top estudiantes
-                cursor.execute('''
-                    SELECT nombre, carrera, promedio_general 
-                    FROM estudiantes 
-                    WHERE promedio_general > 0 
-                    ORDER BY promedio_general DESC 
-                    LIMIT 5
-                ''')
-                resultado["data"]["top_estudiantes"] = [
-                    {"nombre": r[0], "carrera": r[1], "promedio": r[2]} 
-                    for r in cursor.fetchall()
-                ]
+                resultado["data"]["top_estudiantes"] = (
+                    columnar.top_estudiantes() if columnar else CONSULTAS["top_estudiantes"].filas(cursor)
+                )
             
             elif tipo_analisis == "por_carrera":
-                cursor.execute('''
-                    SELECT carrera, 
-                           COUNT(*) as total_estudiantes,
-                           AVG(promedio_general) as promedio_carrera,
-                           AVG(creditos_completados) as promedio_creditos
-                    FROM estudiantes 
-                    WHERE activo = 1 AND promedio_general > 0
-                    GROUP BY carrera
-                    ORDER BY promedio_carrera DESC
-                ''')
-                
-                resultado["data"]["carreras"] = [
-                    {
-                        "carrera": r[0], "total_estudiantes": r[1],
-                        "promedio_carrera": round(r[2], 2),
-                        "promedio_creditos": round(r[3], 1)
-                    } for r in cursor.fetchall()
-                ]
+                carreras = (columnar.rendimiento_por_carrera() if columnar
+                            else CONSULTAS["rendimiento_por_carrera"].filas(cursor))
+                for r in carreras:
+                    r["promedio_carrera"] = round(r["promedio_carrera"], 2)
+                    r["promedio_creditos"] = round(r["promedio_creditos"], 1)
+                resultado["data"]["carreras"] = carreras
             
-            conn.close()
+            if conn:
+                conn.close()
             return resultado
             
         except Exception as e:
@@ -461,63 +1573,36 @@ class UniversidadMCPAvanzado:
             if cached_result:
                 return cached_result
             
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            columnar = self._instantanea_columnar()
+            if columnar:
+                metricas = columnar.metricas_dashboard()
+                distribucion_años = columnar.distribucion_años()
+                cursos_demanda = columnar.cursos_mas_demandados()
+            else:
+                conn = self._get_connection_lectura(instantanea=True)
+                cursor = conn.cursor()
+            
+                # Métricas principales, distribución por año académico y cursos con más demanda
+                metricas = CONSULTAS["metricas_dashboard"].fila(cursor)
+                distribucion_años = CONSULTAS["distribucion_años"].filas(cursor)
+                cursos_demanda = CONSULTAS["cursos_mas_demandados"].filas(cursor)
+                conn.close()
             
-            # Métricas principales
-            cursor.execute('''
-                SELECT 
-                    (SELECT COUNT(*) FROM estudiantes WHERE activo = 1) as estudiantes_activos,
-                    (SELECT COUNT(*) FROM cursos WHERE activo = 1) as cursos_activos,
-                    (SELECT COUNT(*) FROM matriculas WHERE estado = 'Matriculado') as matriculas_activas,
-                    (SELECT AVG(promedio_general) FROM estudiantes WHERE promedio_general > 0) as promedio_general
-            ''')
-            metricas = cursor.fetchone()
-            
-            # Distribución por año académico
-            cursor.execute('''
-                SELECT año, COUNT(*) as cantidad
-                FROM estudiantes WHERE activo = 1
-                GROUP BY año ORDER BY año
-            ''')
-            distribucion_años = cursor.fetchall()
-            
-            # Cursos con más demanda
-            cursor.execute('''
-                SELECT c.nombre, c.codigo, COUNT(m.id) as matriculados, c.max_estudiantes
-                FROM cursos c
-                LEFT JOIN matriculas m ON c.codigo = m.curso_codigo AND m.estado = 'Matriculado'
-                WHERE c.activo = 1
-                GROUP BY c.codigo, c.nombre, c.max_estudiantes
-                ORDER BY matriculados DESC
-                LIMIT 5
-            ''')
-            cursos_demanda = cursor.fetchall()
+            metricas["promedio_general"] = round(metricas["promedio_general"], 2) if metricas["promedio_general"] else 0
+            for r in cursos_demanda:
+                r["ocupacion_pct"] = round((r["matriculados"] / r["max_estudiantes"]) * 100, 1)
             
             resultado = {
                 "success": True,
                 "data": {
-                    "metricas_principales": {
-                        "estudiantes_activos": metricas[0],
-                        "cursos_activos": metricas[1],
-                        "matriculas_activas": metricas[2],
-                        "promedio_general": round(metricas[3], 2) if metricas[3] else 0
-                    },
-                    "distribucion_años": [
-                        {"año": r[0], "cantidad": r[1]} for r in distribucion_años
-                    ],
-                    "cursos_mas_demandados": [
-                        {
-                            "nombre": r[0], "codigo": r[1], "matriculados": r[2],
-                            "max_estudiantes": r[3], "ocupacion_pct": round((r[2]/r[3])*100, 1)
-                        } for r in cursos_demanda
-                    ],
+                    "metricas_principales": metricas,
+                    "distribucion_años": distribucion_años,
+                    "cursos_mas_demandados": cursos_demanda,
                     "cache_stats": self.cache.get_stats(),
                     "timestamp": datetime.now().isoformat()
                 }
             }
             
-            conn.close()
             self.cache.set(cache_key, resultado)
             
             return resultado
@@ -528,21 +1613,1275 @@ class UniversidadMCPAvanzado:
     
     # Implementar el resto de herramientas...
     def procesar_matricula(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Procesa matrícula con validación de prerequisitos"""
-        # Implementación similar pero más avanzada...
-        return {"success": True, "message": "Matrícula procesada (implementar completamente)"}
+        """
+        Procesa matrícula con validación de prerequisitos.
+        
+        Toda la operación ocurre en una transacción BEGIN IMMEDIATE: las
+        comprobaciones y un INSERT condicionado a que queden plazas se ejecutan
+        con el bloqueo de escritura tomado, así que peticiones concurrentes no
+        pueden sobrevender un curso. Si la base de datos está ocupada
+        (SQLITE_BUSY) se reintenta con backoff exponencial y jitter.
+        """
+        estudiante_id = args.get("estudiante_id")
+        curso_codigo = args.get("curso_codigo")
+        if not estudiante_id or not curso_codigo:
+            return {"success": False, "error": "Se requiere estudiante_id y curso_codigo"}
+        
+        for intento in range(REINTENTOS_MATRICULA + 1):
+            # El lock del escritor serializa los hilos de este proceso; los reintentos
+            # cubren a otros procesos que escriban en la misma base de datos
+            with self._conexion_escritura(ESPERA_BLOQUEO_MATRICULA) as conn:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    resultado = self._matricular_en_transaccion(conn, estudiante_id, curso_codigo)
+                    conn.execute("COMMIT" if resultado["success"] else "ROLLBACK")
+                    
+                except sqlite3.OperationalError as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    mensaje = str(e).lower()
+                    if ("locked" not in mensaje and "busy" not in mensaje) or intento == REINTENTOS_MATRICULA:
+                        logger.error(f"Error en procesar_matricula: {e}")
+                        return {"success": False, "error": str(e)}
+                    resultado = None
+                    
+                except Exception as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    logger.error(f"Error en procesar_matricula: {e}")
+                    return {"success": False, "error": str(e)}
+            
+            if resultado is not None:
+                if resultado["success"]:
+                    datos = resultado["data"]
+                    self.registro_cambios.registrar("matriculas", "INSERT", datos["matricula_id"], None, {
+                        "id": datos["matricula_id"], "estudiante_id": estudiante_id,
+                        "curso_codigo": curso_codigo, "fecha_matricula": datos["fecha_matricula"],
+                        "calificacion": None, "estado": "Matriculado", "intentos": datos["intentos"]
+                    }, args.get("usuario", "sistema"))
+                resultado.setdefault("data", {})["reintentos"] = intento
+                return resultado
+            
+            espera = min(BACKOFF_MAXIMO_MATRICULA, BACKOFF_BASE_MATRICULA * 2 ** intento)
+            time.sleep(espera * random.uniform(0.5, 1.0))
+    
+    def _matricular_en_transaccion(self, conn, estudiante_id: str, curso_codigo: str) -> Dict[str, Any]:
+        """Comprobaciones e inserción de la matrícula; se llama con la transacción ya abierta"""
+        cursor = conn.cursor()
+        
+        estudiante = CONSULTAS["estudiante_activo"].fila(cursor, (estudiante_id,))
+        if not estudiante:
+            return {"success": False, "error": "Estudiante no encontrado"}
+        if not estudiante["activo"]:
+            return {"success": False, "error": "El estudiante no está activo"}
+        
+        curso = CONSULTAS["curso_plazas"].fila(cursor, (curso_codigo,))
+        if not curso:
+            return {"success": False, "error": "Curso no encontrado"}
+        if not curso["activo"]:
+            return {"success": False, "error": "El curso no está activo"}
+        
+        # Matrícula previa: se permite repetir tras suspender o retirarse
+        previa = CONSULTAS["matricula_previa"].fila(cursor, (estudiante_id, curso_codigo))
+        if previa and previa["estado"] in ("Matriculado", "Aprobado"):
+            return {"success": False, "error": f"El estudiante ya tiene este curso en estado {previa['estado']}"}
+        intentos = previa["intentos"] + 1 if previa else 1
+        
+        # Prerequisitos leídos dentro de la misma transacción
+        aprobados = self.grafo_prerequisitos.mascara(
+            fila[0] for fila in CONSULTAS["aprobados_de_estudiante"].ejecutar(cursor, (estudiante_id,))
+        )
+        self.aprobados_cache[estudiante_id] = aprobados
+        faltantes = self.grafo_prerequisitos.requisitos(curso_codigo) & ~aprobados
+        if faltantes:
+            return {
+                "success": False,
+                "error": "Prerequisitos no cumplidos",
+                "data": {"prerequisitos_faltantes": self.grafo_prerequisitos.a_codigos(faltantes)}
+            }
+        
+        # Inserción condicionada: solo se inserta si quedan plazas
+        fecha_matricula = datetime.now().strftime("%Y-%m-%d")
+        CONSULTAS["insertar_matricula_con_plaza"].ejecutar(cursor, (
+            estudiante_id, curso_codigo, fecha_matricula, intentos, curso_codigo, curso["max_estudiantes"]
+        ))
+        if cursor.rowcount == 0:
+            return {"success": False, "error": "No hay plazas disponibles en este curso"}
+        
+        matricula_id = cursor.lastrowid
+        matriculados = CONSULTAS["matriculados_en_curso"].valor(cursor, (curso_codigo,))
+        return {
+            "success": True,
+            "message": f"Estudiante {estudiante_id} matriculado en {curso_codigo}",
+            "data": {
+                "matricula_id": matricula_id,
+                "fecha_matricula": fecha_matricula,
+                "intentos": intentos,
+                "plazas_disponibles": curso["max_estudiantes"] - matriculados
+            }
+        }
     
     def exportar_datos(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Exporta datos en diferentes formatos"""
-        return {"success": True, "message": "Exportación disponible (implementar completamente)"}
+        """
+        Exporta una tabla completa en streaming a CSV, JSON Lines o bloques columnares.
+        
+        Argumentos: tabla, formato ('csv', 'jsonl' o 'columnar'), destino
+        (ruta opcional relativa al directorio de exportaciones, junto a la base
+        de datos), comprimir (gzip), tamano_lote (filas por fetchmany).
+        """
+        try:
+            tabla = args.get("tabla", "estudiantes")
+            formato = args.get("formato", "csv")
+            comprimir = bool(args.get("comprimir", False))
+            tamano_lote = max(1, int(args.get("tamano_lote", TAMANO_LOTE_EXPORTACION)))
+            
+            if tabla not in TABLAS_EXPORTABLES:
+                return {"success": False, "error": f"Tabla no exportable: {tabla}"}
+            if formato not in EXTENSIONES_EXPORTACION:
+                return {"success": False, "error": f"Formato no soportado: {formato}"}
+            
+            directorio = (Path(self.db_path).resolve().parent / "exportaciones").resolve()
+            destino = args.get("destino")
+            if not destino:
+                marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+                destino = f"{tabla}_{marca}{EXTENSIONES_EXPORTACION[formato]}{'.gz' if comprimir else ''}"
+            
+            # El cliente solo elige el nombre dentro del directorio de exportaciones
+            relativa = Path(str(destino))
+            if relativa.is_absolute() or relativa.drive or ".." in relativa.parts:
+                return {"success": False, "error": "destino debe ser una ruta relativa sin '..'"}
+            ruta = (directorio / relativa).resolve()
+            if ruta == directorio or directorio not in ruta.parents:
+                return {"success": False, "error": "destino fuera del directorio de exportaciones"}
+            destino = str(ruta)
+            
+            estadisticas = self.exportar_tabla(tabla, formato, destino, comprimir, tamano_lote)
+            return {"success": True, "data": estadisticas}
+            
+        except Exception as e:
+            logger.error(f"Error en exportar_datos: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def exportar_tabla(self, tabla: str, formato: str, destino: str, comprimir: bool = False,
+                       tamano_lote: int = TAMANO_LOTE_EXPORTACION,
+                       progreso: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """
+        Motor de exportación: lee la tabla con fetchmany y escribe cada lote en
+        cuanto llega, así que la memoria usada es O(tamano_lote) y no depende
+        del tamaño de la tabla. 'progreso' recibe el total de filas escritas;
+        el resultado incluye los lotes escritos y las filas en cada aviso.
+        """
+        columnas = TABLAS_EXPORTABLES[tabla]
+        ruta = Path(destino)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        abrir = gzip.open if comprimir else open
+        
+        inicio = time.perf_counter()
+        filas_exportadas = 0
+        numero_lote = 0
+        avisos: List[Dict[str, int]] = []
+        siguiente_aviso = INTERVALO_PROGRESO_EXPORTACION
+        
+        conn = self._get_connection_lectura(instantanea=True)
+        try:
+            cursor = conn.cursor()
+            CONSULTAS[f"exportar_{tabla}"].ejecutar(cursor)
+            
+            with abrir(ruta, "wt", encoding="utf-8", newline="") as salida:
+                escritor = None
+                if formato == "csv":
+                    escritor = csv.writer(salida)
+                    escritor.writerow(columnas)
+                elif formato == "columnar":
+                    salida.write(json.dumps({"tabla": tabla, "columnas": columnas}) + "\n")
+                
+                while True:
+                    lote = cursor.fetchmany(tamano_lote)
+                    if not lote:
+                        break
+                    
+                    if formato == "csv":
+                        escritor.writerows(lote)
+                    elif formato == "jsonl":
+                        salida.writelines(
+                            json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + "\n"
+                            for fila in lote
+                        )
+                    else:
+                        # Un bloque por lote con los valores agrupados por columna,
+                        # al estilo de los row groups de Parquet
+                        salida.write(json.dumps({
+                            "lote": numero_lote,
+                            "filas": len(lote),
+                            "datos": dict(zip(columnas, map(list, zip(*lote))))
+                        }, ensure_ascii=False) + "\n")
+                    
+                    numero_lote += 1
+                    filas_exportadas += len(lote)
+                    if progreso:
+                        progreso(filas_exportadas)
+                    if filas_exportadas >= siguiente_aviso:
+                        logger.info(f"Exportación {tabla}: {filas_exportadas} filas")
+                        avisos.append({"filas": filas_exportadas, "lotes": numero_lote})
+                        siguiente_aviso += INTERVALO_PROGRESO_EXPORTACION
+        finally:
+            conn.close()
+        
+        duracion = time.perf_counter() - inicio
+        return {
+            "tabla": tabla,
+            "formato": formato,
+            "comprimido": comprimir,
+            "ruta": str(ruta),
+            "filas_exportadas": filas_exportadas,
+            "lotes_escritos": numero_lote,
+            "progreso": avisos,
+            "bytes_escritos": ruta.stat().st_size,
+            "duracion_segundos": round(duracion, 3),
+            "filas_por_segundo": round(filas_exportadas / duracion, 1) if duracion > 0 else None
+        }
     
     def validar_prerequisitos(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Valida prerequisitos para un curso"""
-        return {"success": True, "message": "Validación de prerequisitos (implementar completamente)"}
+        """
+        Valida prerequisitos para un curso.
+        
+        Argumentos: curso_codigo y uno de estudiante_id, estudiantes (lista de
+        IDs) o cohorte (filtros como en buscar_estudiantes) para validar en lote.
+        """
+        try:
+            curso_codigo = args.get("curso_codigo")
+            if not curso_codigo:
+                return {"success": False, "error": "Se requiere curso_codigo"}
+            if curso_codigo not in self.grafo_prerequisitos.directos:
+                return {"success": False, "error": "Curso no encontrado"}
+            
+            requeridos = self.grafo_prerequisitos.requisitos(curso_codigo)
+            
+            conn = self._get_connection_lectura()
+            try:
+                cursor = conn.cursor()
+                if args.get("estudiante_id"):
+                    estudiante_ids = [args["estudiante_id"]]
+                elif args.get("estudiantes"):
+                    estudiante_ids = list(args["estudiantes"])
+                elif args.get("cohorte") is not None:
+                    claves, params = self._construir_filtros_estudiantes(args["cohorte"])
+                    estudiante_ids = [fila[0] for fila in _consulta_cohorte(claves, "id").ejecutar(cursor, params)]
+                else:
+                    return {"success": False, "error": "Se requiere estudiante_id, estudiantes o cohorte"}
+                
+                aprobados = self._cargar_aprobados(cursor, estudiante_ids)
+            finally:
+                conn.close()
+            
+            resultados = []
+            for estudiante_id in estudiante_ids:
+                faltantes = requeridos & ~aprobados[estudiante_id]
+                resultados.append({
+                    "estudiante_id": estudiante_id,
+                    "cumple": faltantes == 0,
+                    "prerequisitos_faltantes": self.grafo_prerequisitos.a_codigos(faltantes)
+                })
+            
+            datos = {
+                "curso_codigo": curso_codigo,
+                "prerequisitos_directos": self.grafo_prerequisitos.directos[curso_codigo],
+                "prerequisitos_requeridos": self.grafo_prerequisitos.a_codigos(requeridos)
+            }
+            if args.get("estudiante_id"):
+                datos.update(resultados[0])
+            else:
+                datos.update({
+                    "total_estudiantes": len(resultados),
+                    "cumplen": sum(1 for r in resultados if r["cumple"]),
+                    "resultados": resultados
+                })
+            return {"success": True, "data": datos}
+            
+        except Exception as e:
+            logger.error(f"Error en validar_prerequisitos: {e}")
+            return {"success": False, "error": str(e)}
     
     def simular_carga_academica(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Simula diferentes escenarios de carga académica"""
-        return {"success": True, "message": "Simulación de carga (implementar completamente)"}
+        """
+        Simula diferentes escenarios de carga académica.
+        
+        Argumentos: planes (lista de listas de códigos de curso candidatos),
+        pesos_planes (opcional), cohorte (filtros de estudiantes), escenarios,
+        procesos, semilla y limite_creditos.
+        """
+        try:
+            if np is None:
+                return {"success": False, "error": "La simulación requiere NumPy (pip install numpy)"}
+            
+            planes = args.get("planes") or []
+            if not planes:
+                return {"success": False, "error": "Se requiere al menos un plan de cursos"}
+            cohorte = args.get("cohorte", {"activo": True})
+            escenarios = max(1, int(args.get("escenarios", 1000)))
+            codigos = sorted({codigo for plan in planes for codigo in plan})
+            
+            columnar = self._instantanea_columnar()
+            if columnar:
+                promedios = columnar.promedios_cohorte(cohorte)
+                datos_cursos = columnar.datos_cursos(codigos)
+                historico = columnar.historico_aprobacion(codigos)
+            else:
+                conn = self._get_connection_lectura(instantanea=True)
+                try:
+                    cursor = conn.cursor()
+                    claves, params = self._construir_filtros_estudiantes(cohorte)
+                    promedios = np.array([
+                        fila[0] or 0.0
+                        for fila in _consulta_cohorte(claves, "promedio_general").ejecutar(cursor, params)
+                    ], dtype=float)
+                
+                    datos_cursos = {
+                        c["codigo"]: (c["creditos"], c["max_estudiantes"])
+                        for c in CONSULTAS["datos_cursos"].filas_in(cursor, codigos)
+                    }
+                
+                    # Tasa histórica de aprobación (calificación >= 5) por curso
+                    historico = {
+                        h["codigo"]: (h["calificadas"], h["aprobadas"])
+                        for h in CONSULTAS["historico_aprobacion"].filas_in(cursor, codigos)
+                    }
+                finally:
+                    conn.close()
+            
+            desconocidos = [c for c in codigos if c not in datos_cursos]
+            if desconocidos:
+                return {"success": False, "error": f"Cursos no encontrados: {desconocidos}"}
+            if len(promedios) == 0:
+                return {"success": False, "error": "La cohorte no contiene estudiantes"}
+            
+            columnas = {codigo: j for j, codigo in enumerate(codigos)}
+            matriz_planes = np.zeros((len(planes), len(codigos)), dtype=bool)
+            for i, plan in enumerate(planes):
+                matriz_planes[i, [columnas[c] for c in plan]] = True
+            pesos = np.asarray(args.get("pesos_planes") or [1.0] * len(planes), dtype=float)
+            pesos = pesos / pesos.sum()
+            creditos = np.array([datos_cursos[c][0] for c in codigos], dtype=float)
+            plazas = np.array([datos_cursos[c][1] for c in codigos], dtype=float)
+            
+            # Probabilidad base por curso con suavizado de Laplace, ajustada en
+            # escala logit según el promedio del estudiante respecto a la cohorte
+            base = np.array([(historico.get(c, (0, 0))[1] + 1) / (historico.get(c, (0, 0))[0] + 2)
+                             for c in codigos])
+            logit = np.log(base / (1 - base))
+            desviacion = (promedios - promedios.mean())[:, None]
+            prob_aprobar = 1 / (1 + np.exp(-(logit[None, :] + 0.5 * desviacion)))
+            
+            # procesos no puede superar el pool compartido: ninguna petición abre uno propio
+            procesos = min(int(args.get("procesos") or self.procesos_simulacion), self.procesos_simulacion)
+            simulacion = ejecutar_simulacion_carga(
+                matriz_planes, pesos, creditos, plazas, prob_aprobar, escenarios,
+                procesos, args.get("semilla"),
+                int(args.get("limite_creditos", LIMITE_CREDITOS_SEMESTRE)),
+                pool=self._obtener_pool_simulacion() if procesos > 1 else None
+            )
+            for codigo, detalle in zip(codigos, simulacion["por_curso"]):
+                detalle["codigo"] = codigo
+                detalle["plazas"] = int(plazas[columnas[codigo]])
+                detalle["tasa_aprobacion_historica"] = round(float(base[columnas[codigo]]), 3)
+            
+            simulacion["estudiantes"] = len(promedios)
+            simulacion["planes"] = [
+                {"cursos": plan, "peso": round(float(p), 3),
+                 "creditos": int(creditos[matriz_planes[i]].sum())}
+                for i, (plan, p) in enumerate(zip(planes, pesos))
+            ]
+            return {"success": True, "data": simulacion}
+            
+        except Exception as e:
+            logger.error(f"Error en simular_carga_academica: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def listar_herramientas(self) -> List[Dict[str, Any]]:
+        """Describe las herramientas disponibles para tools/list"""
+        esquemas = {
+            "buscar_estudiantes": {
+                "type": "object",
+                "properties": {
+                    "filtros": {"type": "object", "description": "carrera, año, activo, promedio_min"},
+                    "orden": {"type": "string", "enum": list(COLUMNAS_ORDEN_ESTUDIANTES),
+                              "description": "Columna de orden; prefijo '-' para descendente"},
+                    "limite": {"type": "integer", "maximum": LIMITE_MAXIMO_PAGINA},
+                    "cursor": {"type": "string", "description": "Token 'siguiente_cursor' de la página anterior"},
+                    "conteo": {"type": "string", "enum": ["estimado", "exacto", "ninguno"]}
+                }
+            }
+        }
+        return [
+            {
+                "name": nombre,
+                "description": (funcion.__doc__ or "").strip().splitlines()[0],
+                "inputSchema": esquemas.get(nombre, {"type": "object", "properties": {}})
+            }
+            for nombre, funcion in self.tools.items()
+        ]
+    
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Maneja las peticiones MCP entrantes"""
+        try:
+            method = request.get("method")
+            
+            if method == "tools/list":
+                return {"tools": self.listar_herramientas()}
+            
+            elif method == "tools/call":
+                if not isinstance(request.get("params", {}), dict):
+                    return {"error": "Parámetros inválidos: params debe ser un objeto"}
+                tool_name = request.get("params", {}).get("name")
+                arguments = request.get("params", {}).get("arguments", {})
+                
+                if tool_name in self.tools:
+                    result = self.tools[tool_name](arguments)
+                    return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
+                else:
+                    return {"error": f"Herramienta desconocida: {tool_name}"}
+            
+            else:
+                return {"error": f"Método no soportado: {method}"}
+                
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def iniciar_trabajadores(self, procesos: Optional[int] = None,
+                             reciclar_cada: int = PETICIONES_POR_TRABAJADOR):
+        """
+        Activa el modo multiproceso: las herramientas de HERRAMIENTAS_CPU se
+        ejecutan en un pool de procesos, cada uno con su propio servidor.
+        
+        Tras una media de reciclar_cada peticiones por trabajador el pool se
+        sustituye por uno nuevo; el anterior termina las peticiones que ya
+        tenía y sus procesos salen, lo que acota el crecimiento de memoria y
+        caches. (max_tasks_per_child no se usa: en Python 3.11 puede bloquear
+        el pool cuando hay tareas en cola.)
+        """
+        self.procesos_trabajadores = procesos or os.cpu_count() or 1
+        self.reciclar_cada = reciclar_cada
+        self.peticiones_trabajadores = 0
+        self.reciclados_trabajadores = 0
+        # Los trabajadores mapean la instantánea columnar del front-end en vez de cargar la suya
+        self._publicar_columnar(forzar=True)
+        self.trabajadores = self._crear_pool_trabajadores()
+        logger.info(f"Modo multiproceso: {self.procesos_trabajadores} trabajadores, "
+                    f"reciclados cada {reciclar_cada} peticiones")
+    
+    def _obtener_pool_simulacion(self) -> ProcessPoolExecutor:
+        """Pool de procesos de la simulación, creado en el primer uso y reutilizado"""
+        with self._lock_pool_simulacion:
+            if self._pool_simulacion is None:
+                self._pool_simulacion = _crear_pool_simulacion(self.procesos_simulacion)
+            return self._pool_simulacion
+    
+    def _crear_pool_trabajadores(self) -> ProcessPoolExecutor:
+        # spawn: el servidor tiene hilos de fondo y no es seguro duplicarlo con fork
+        return ProcessPoolExecutor(
+            max_workers=self.procesos_trabajadores,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_inicializar_trabajador,
+            initargs=(str(Path(self.db_path).resolve()), self.ruta_columnar if self.columnar else None)
+        )
+    
+    def _enviar_a_trabajador(self, nombre: str, args: Dict[str, Any]):
+        """Envía una petición al pool, reciclándolo cuando le toca"""
+        self._publicar_columnar()
+        self.peticiones_trabajadores += 1
+        if self.peticiones_trabajadores > self.reciclar_cada * self.procesos_trabajadores:
+            anterior = self.trabajadores
+            self.trabajadores = self._crear_pool_trabajadores()
+            anterior.shutdown(wait=False)
+            self.peticiones_trabajadores = 1
+            self.reciclados_trabajadores += 1
+        return self.trabajadores.submit(_ejecutar_en_trabajador, nombre, args)
+    
+    async def handle_request_async(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Variante de handle_request para el modo multiproceso: las herramientas
+        pesadas se esperan sin bloquear el bucle de eventos, de modo que el
+        front-end sigue atendiendo consultas ligeras mientras tanto.
+        """
+        params = request.get("params", {})
+        tool_name = params.get("name") if isinstance(params, dict) else None
+        if (request.get("method") == "tools/call" and self.trabajadores
+                and tool_name in HERRAMIENTAS_CPU):
+            try:
+                futuro = self._enviar_a_trabajador(tool_name, params.get("arguments", {}))
+                result = await asyncio.wrap_future(futuro)
+                return [{"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}]
+            except Exception as e:
+                return [{"error": str(e)}]
+        return list(self.handle_request_stream(request))
+    
+    def handle_request_stream(self, request: Dict[str, Any]):
+        """
+        Variante de handle_request para resultados grandes: si la herramienta
+        tiene versión en streaming y la petición lo solicita con
+        params.stream = true, produce respuestas parciales una a una.
+        """
+        params = request.get("params", {})
+        streams = {"buscar_estudiantes": self.stream_buscar_estudiantes}
+        
+        # Unos params que no son un objeto los rechaza handle_request
+        if (request.get("method") == "tools/call" and isinstance(params, dict)
+                and params.get("stream") and params.get("name") in streams):
+            tool_name = params["name"]
+            for bloque in streams[tool_name](params.get("arguments", {})):
+                yield {"content": [bloque], "parcial": not json.loads(bloque["text"]).get("fin")}
+        else:
+            yield self.handle_request(request)
+
+# Estado de cada proceso trabajador del modo multiproceso
+_servidor_trabajador: Optional[UniversidadMCPAvanzado] = None
+_ultimo_cambio_trabajador = 0
+
+def _inicializar_trabajador(db_path: str, ruta_columnar: Optional[str] = None):
+    """
+    Initializer del ProcessPoolExecutor: cada trabajador abre su propio
+    servidor (conexiones, grafo de prerequisitos y caches) una sola vez y lo
+    reutiliza en todas las peticiones que atiende hasta ser reciclado. Si el
+    front-end publica una instantánea columnar, la mapea en solo lectura: las
+    páginas del fichero se comparten entre todos los trabajadores.
+    """
+    global _servidor_trabajador, _ultimo_cambio_trabajador
+    _servidor_trabajador = UniversidadMCPAvanzado(db_path)
+    if ruta_columnar:
+        _servidor_trabajador.columnar = InstantaneaColumnar.abrir(ruta_columnar)
+    atexit.register(_servidor_trabajador.cerrar)
+    conn = _servidor_trabajador._get_connection_lectura()
+    try:
+        _ultimo_cambio_trabajador = CONSULTAS["ultimo_cambio"].valor(conn)
+    finally:
+        conn.close()
+
+def _ejecutar_en_trabajador(nombre: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ejecuta una herramienta en el servidor del trabajador. Antes aplica los
+    cambios que otros procesos hayan dejado en log_actividad para que sus
+    caches no sirvan datos invalidados por escrituras del front-end.
+    """
+    global _ultimo_cambio_trabajador
+    servidor = _servidor_trabajador
+    cambios = servidor.cambios_desde(_ultimo_cambio_trabajador)
+    for cambio in cambios:
+        servidor._invalidar_por_cambio(cambio)
+    if cambios:
+        _ultimo_cambio_trabajador = cambios[-1]["id"]
+        if any(c["tabla_afectada"] == "cursos" for c in cambios):
+            servidor._cargar_grafo_prerequisitos()
+    
+    if nombre == "simular_carga_academica":
+        # El trabajador ya es un proceso: no se abre otro pool dentro
+        args = dict(args, procesos=1)
+    return servidor.tools[nombre](args)
+
+def _simular_bloque_carga(planes: "np.ndarray", pesos: "np.ndarray", creditos: "np.ndarray",
+                          plazas: "np.ndarray", prob_aprobar: "np.ndarray", escenarios: int,
+                          semilla, limite_creditos: int) -> Dict[str, "np.ndarray"]:
+    """
+    Ejecuta un bloque de escenarios Monte Carlo (función de módulo para poder
+    enviarla a un ProcessPoolExecutor). El cálculo es matricial sobre
+    estudiantes × cursos: solo se itera sobre escenarios y planes, nunca
+    sobre estudiantes.
+    """
+    rng = np.random.default_rng(semilla)
+    n_estudiantes, n_cursos = prob_aprobar.shape
+    columnas_plan = [np.flatnonzero(plan) for plan in planes]
+    
+    demanda = np.empty((escenarios, n_cursos), dtype=np.int64)
+    admitidos = np.zeros((escenarios, n_cursos), dtype=np.int64)
+    aprobados = np.zeros((escenarios, n_cursos), dtype=np.int64)
+    carga_media = np.empty(escenarios)
+    carga_p95 = np.empty(escenarios)
+    carga_max = np.empty(escenarios)
+    sobrecargados = np.empty(escenarios)
+    carga = np.empty(n_estudiantes)
+    
+    for i in range(escenarios):
+        # Cada estudiante elige un plan candidato
+        eleccion = rng.choice(len(planes), size=n_estudiantes, p=pesos)
+        demanda[i] = np.bincount(eleccion, minlength=len(planes)) @ planes
+        # Si un curso tiene más demanda que plazas, entra cada solicitante con prob. plazas/demanda
+        prob_admision = np.minimum(1.0, plazas / np.maximum(demanda[i], 1))
+        
+        for p, columnas in enumerate(columnas_plan):
+            filas = np.flatnonzero(eleccion == p)
+            forma = (len(filas), len(columnas))
+            admitido = rng.random(forma, dtype=np.float32) < prob_admision[columnas]
+            carga[filas] = admitido @ creditos[columnas]
+            admitidos[i, columnas] += admitido.sum(axis=0)
+            aprueba = admitido & (rng.random(forma, dtype=np.float32) < prob_aprobar[np.ix_(filas, columnas)])
+            aprobados[i, columnas] += aprueba.sum(axis=0)
+        
+        carga_media[i] = carga.mean()
+        carga_p95[i] = np.percentile(carga, 95)
+        carga_max[i] = carga.max()
+        sobrecargados[i] = (carga > limite_creditos).mean()
+    
+    return {
+        "demanda": demanda, "admitidos": admitidos, "aprobados": aprobados, "carga_media": carga_media,
+        "carga_p95": carga_p95, "carga_max": carga_max, "sobrecargados": sobrecargados
+    }
+
+def _crear_pool_simulacion(procesos: int) -> ProcessPoolExecutor:
+    # spawn: quien simula tiene hilos de fondo (registro de cambios, pools) y no
+    # es seguro duplicarlo con fork
+    return ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+
+def ejecutar_simulacion_carga(planes: "np.ndarray", pesos: "np.ndarray", creditos: "np.ndarray",
+                              plazas: "np.ndarray", prob_aprobar: "np.ndarray",
+                              escenarios: int = 1000, procesos: Optional[int] = None,
+                              semilla: Optional[int] = None,
+                              limite_creditos: int = LIMITE_CREDITOS_SEMESTRE,
+                              pool: Optional[ProcessPoolExecutor] = None) -> Dict[str, Any]:
+    """
+    Motor de simulación de carga académica.
+    
+    planes: matriz (planes × cursos) de 0/1; pesos: probabilidad de cada plan;
+    creditos y plazas: vectores por curso; prob_aprobar: matriz
+    (estudiantes × cursos) con la probabilidad de aprobar. Los escenarios se
+    reparten en bloques entre un pool de procesos con semillas independientes:
+    el pool recibido, que se reutiliza entre llamadas, o uno temporal (spawn).
+    """
+    procesos = procesos or os.cpu_count() or 1
+    procesos = max(1, min(procesos, escenarios))
+    tamanos = [escenarios // procesos + (1 if i < escenarios % procesos else 0) for i in range(procesos)]
+    semillas = np.random.SeedSequence(semilla).spawn(procesos)
+    planes = planes.astype(bool)
+    prob_aprobar = prob_aprobar.astype(np.float32)
+    
+    if procesos == 1:
+        bloques = [_simular_bloque_carga(planes, pesos, creditos, plazas, prob_aprobar,
+                                         escenarios, semillas[0], limite_creditos)]
+    else:
+        temporal = _crear_pool_simulacion(procesos) if pool is None else None
+        try:
+            futuros = [
+                (pool or temporal).submit(_simular_bloque_carga, planes, pesos, creditos, plazas, prob_aprobar,
+                                          tamano, semilla_bloque, limite_creditos)
+                for tamano, semilla_bloque in zip(tamanos, semillas)
+            ]
+            bloques = [f.result() for f in futuros]
+        finally:
+            if temporal is not None:
+                temporal.shutdown(wait=True)
+    
+    total = {clave: np.concatenate([b[clave] for b in bloques]) for clave in bloques[0]}
+    demanda = total["demanda"]
+    admitidos = total["admitidos"]
+    tasa_aprobacion = np.divide(total["aprobados"], admitidos,
+                                out=np.zeros(demanda.shape), where=admitidos > 0)
+    
+    def resumen(valores: "np.ndarray") -> Dict[str, float]:
+        p5, p50, p95 = np.percentile(valores, [5, 50, 95])
+        return {"media": round(float(valores.mean()), 3), "p5": round(float(p5), 3),
+                "p50": round(float(p50), 3), "p95": round(float(p95), 3)}
+    
+    return {
+        "escenarios": escenarios,
+        "procesos": procesos,
+        "carga_estudiantes": {
+            "media": resumen(total["carga_media"]),
+            "p95": resumen(total["carga_p95"]),
+            "maxima": float(total["carga_max"].max()),
+            "fraccion_sobre_limite": resumen(total["sobrecargados"]),
+            "limite_creditos": limite_creditos
+        },
+        "por_curso": [
+            {
+                "demanda": resumen(demanda[:, j]),
+                "contencion_plazas": resumen(demanda[:, j] / plazas[j]),
+                "prob_exceder_plazas": round(float((demanda[:, j] > plazas[j]).mean()), 3),
+                "tasa_aprobacion": resumen(tasa_aprobacion[:, j])
+            }
+            for j in range(len(plazas))
+        ]
+    }
+
+def benchmark_simulacion(estudiantes: int = 50000, cursos: int = 40, planes: int = 8,
+                         escenarios: int = 2000) -> Dict[str, Any]:
+    """Mide escenarios por segundo del motor de simulación con distintos números de procesos"""
+    rng = np.random.default_rng(42)
+    matriz_planes = np.zeros((planes, cursos), dtype=bool)
+    for p in range(planes):
+        matriz_planes[p, rng.choice(cursos, size=5, replace=False)] = True
+    pesos = np.full(planes, 1.0 / planes)
+    creditos = rng.integers(3, 7, size=cursos).astype(float)
+    plazas = rng.integers(estudiantes // 20, estudiantes // 4, size=cursos).astype(float)
+    prob_aprobar = np.clip(rng.normal(0.7, 0.1, size=(estudiantes, cursos)), 0.05, 0.99)
+    
+    resultados = {"estudiantes": estudiantes, "cursos": cursos, "escenarios": escenarios, "mediciones": []}
+    procesos_max = os.cpu_count() or 1
+    # Un pool para todas las mediciones, ya arrancado: no se mide el spawn
+    pool = _crear_pool_simulacion(procesos_max)
+    try:
+        list(pool.map(abs, range(procesos_max)))
+        for procesos in sorted({1, 2, 4, procesos_max} & set(range(1, procesos_max + 1))):
+            inicio = time.perf_counter()
+            ejecutar_simulacion_carga(matriz_planes, pesos, creditos, plazas, prob_aprobar,
+                                      escenarios, procesos, semilla=7, pool=pool)
+            duracion = time.perf_counter() - inicio
+            resultados["mediciones"].append({
+                "procesos": procesos,
+                "segundos": round(duracion, 2),
+                "escenarios_por_segundo": round(escenarios / duracion, 1)
+            })
+    finally:
+        pool.shutdown(wait=True)
+    return resultados
+
+def _tablas_por_alias(sql: str) -> Dict[str, str]:
+    """Relaciona alias y nombres de tabla de las cláusulas FROM/JOIN de una consulta"""
+    alias = {}
+    for tabla, nombre in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+        alias[tabla] = tabla
+        if nombre and nombre.upper() not in PALABRAS_TRAS_TABLA:
+            alias[nombre] = tabla
+    return alias
+
+def analizar_plan_consulta(conn, sql: str) -> List[str]:
+    """
+    Ejecuta EXPLAIN QUERY PLAN y devuelve los pasos que recorren por completo
+    una tabla grande (SCAN tabla), lo hagan sobre la tabla o sobre un índice:
+    un SCAN ... USING (COVERING) INDEX sigue leyendo todas las filas; solo
+    SEARCH acota el recorrido.
+    """
+    alias = _tablas_por_alias(sql)
+    problemas = []
+    for _, _, _, detalle in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+        coincidencia = re.match(r"SCAN (\w+)", detalle)
+        if not coincidencia:
+            continue
+        if alias.get(coincidencia.group(1), coincidencia.group(1)) in TABLAS_GRANDES:
+            problemas.append(detalle)
+    return problemas
+
+def verificar_planes_consulta(estudiantes: int = 20000, cursos: int = 200) -> Dict[str, Any]:
+    """
+    Regresión de planes de consulta: ejecuta todas las herramientas con una
+    traza de SQL activa sobre un conjunto de datos sintético y analizado, y
+    comprueba con EXPLAIN QUERY PLAN que ninguna consulta recorre entera una
+    tabla grande, ni siquiera por un índice, salvo las de SCAN_PERMITIDO (que
+    se informan con su motivo). La exportación queda fuera porque recorre la
+    tabla a propósito.
+    """
+    import tempfile
+    
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directorio:
+        server = UniversidadMCPAvanzado(os.path.join(directorio, "planes.db"))
+        conn = server._get_connection()
+        carreras = ["Ingeniería Informática", "Matemáticas", "Física", "Química", "Biología"]
+        conn.executemany('''
+            INSERT INTO estudiantes (id, nombre, email, carrera, año, activo, fecha_ingreso,
+                                     creditos_completados, promedio_general)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (f"P{i:07d}", f"Estudiante {i}", f"p{i}@univ.edu", rng.choice(carreras),
+             rng.randint(1, 5), rng.random() < 0.9, "2023-09-01", rng.randint(0, 240),
+             round(rng.uniform(5, 10), 2))
+            for i in range(estudiantes)
+        ])
+        conn.executemany('''
+            INSERT INTO cursos (codigo, nombre, profesor, creditos, max_estudiantes, prerequisitos, semestre)
+            VALUES (?, ?, ?, ?, ?, '[]', '2024S1')
+        ''', [(f"C{j:04d}", f"Curso {j}", "Dr. Prueba", 6, 200) for j in range(cursos)])
+        conn.executemany('''
+            INSERT INTO matriculas (estudiante_id, curso_codigo, fecha_matricula, calificacion, estado)
+            VALUES (?, ?, '2024-01-15', ?, ?)
+        ''', [
+            (f"P{i:07d}", f"C{j:04d}", nota, "Aprobado" if nota >= 5 else "Reprobado")
+            for i in range(estudiantes)
+            for j in rng.sample(range(cursos), 5)
+            for nota in [round(rng.uniform(2, 10), 1)]
+        ])
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.close()
+        server._cargar_grafo_prerequisitos()
+        
+        capturadas = []
+        server.trazador_sql = capturadas.append
+        
+        for orden in COLUMNAS_ORDEN_ESTUDIANTES:
+            for prefijo in ("", "-"):
+                pagina = server.buscar_estudiantes({"orden": prefijo + orden, "limite": 20})
+                server.buscar_estudiantes({"orden": prefijo + orden, "limite": 20,
+                                           "cursor": pagina["data"]["siguiente_cursor"]})
+        server.buscar_estudiantes({"filtros": {"carrera": "Física", "activo": True}, "conteo": "exacto"})
+        server.buscar_estudiantes({"filtros": {"año": 2, "promedio_min": 8}, "orden": "-promedio_general"})
+        server.gestionar_curso({"accion": "leer", "datos": {"codigo": "C0001"}})
+        server.gestionar_curso({"accion": "leer", "datos": {}})
+        server.analizar_rendimiento({"tipo": "general"})
+        server.analizar_rendimiento({"tipo": "por_carrera"})
+        server.generar_dashboard({})
+        server.validar_prerequisitos({"curso_codigo": "C0002", "estudiante_id": "P0000001"})
+        server.validar_prerequisitos({"curso_codigo": "C0002", "cohorte": {"año": 3, "activo": True}})
+        server.procesar_matricula({"estudiante_id": "P0000002", "curso_codigo": "C0003"})
+        if np is not None:
+            server.simular_carga_academica({"planes": [["C0001", "C0002"]], "escenarios": 2, "procesos": 1})
+        server.registro_cambios.vaciar()
+        server.cambios_desde(0)
+        server.cambios_desde(0, "matriculas")
+        server.cerrar()
+        
+        server.trazador_sql = None
+        conn = server._get_connection()
+        resultados = {"consultas_analizadas": 0, "fallos": [], "permitidas": []}
+        for sql in dict.fromkeys(capturadas):
+            if not re.match(r"\s*(SELECT|INSERT\s+INTO\s+\w+\s*\([^)]*\)\s*SELECT)", sql, re.IGNORECASE):
+                continue
+            resultados["consultas_analizadas"] += 1
+            problemas = analizar_plan_consulta(conn, sql)
+            if not problemas:
+                continue
+            consulta = " ".join(sql.split())
+            motivo = next((m for patron, m in SCAN_PERMITIDO if re.search(patron, consulta, re.IGNORECASE)), None)
+            if motivo:
+                resultados["permitidas"].append({"consulta": consulta, "plan": problemas, "motivo": motivo})
+            else:
+                resultados["fallos"].append({"consulta": consulta, "plan": problemas})
+        conn.close()
+    
+    return resultados
+
+def prueba_concurrencia_matricula(enroladores: int = 64, plazas: int = 30,
+                                  servidores: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Prueba de estrés: 'enroladores' hilos intentan matricularse a la vez en un
+    curso con 'plazas' plazas. Comprueba que nunca se sobrevende y mide
+    commits por segundo. Los hilos se reparten entre 'servidores' instancias
+    (por defecto una por hilo) sobre el mismo fichero, cada una con su
+    escritor y su lock, como varios procesos: compiten en SQLite y ejercitan
+    SQLITE_BUSY y los reintentos de BEGIN IMMEDIATE, que el lock de una sola
+    instancia ocultaría.
+    """
+    import tempfile
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        server = UniversidadMCPAvanzado(os.path.join(directorio, "estres.db"))
+        conn = server._get_connection()
+        conn.execute('''
+            INSERT INTO cursos (codigo, nombre, profesor, creditos, max_estudiantes, semestre)
+            VALUES ('EST100', 'Curso de estrés', 'Dr. Prueba', 6, ?, '2024S1')
+        ''', (plazas,))
+        conn.executemany('''
+            INSERT INTO estudiantes (id, nombre, email, carrera, año, fecha_ingreso)
+            VALUES (?, ?, ?, 'Pruebas', 1, '2024-09-01')
+        ''', [(f"EST{i:05d}", f"Estudiante {i}", f"est{i}@univ.edu") for i in range(enroladores)])
+        conn.commit()
+        conn.close()
+        server._cargar_grafo_prerequisitos()
+        instancias = [server] + [
+            UniversidadMCPAvanzado(server.db_path) for _ in range(max(1, servidores or enroladores) - 1)
+        ]
+        
+        barrera = threading.Barrier(enroladores)
+        
+        def matricular(i: int) -> Dict[str, Any]:
+            barrera.wait()
+            return instancias[i % len(instancias)].procesar_matricula(
+                {"estudiante_id": f"EST{i:05d}", "curso_codigo": "EST100"}
+            )
+        
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=enroladores) as pool:
+            resultados = list(pool.map(matricular, range(enroladores)))
+        duracion = time.perf_counter() - inicio
+        
+        conn = server._get_connection()
+        matriculados = conn.execute(
+            "SELECT COUNT(*) FROM matriculas WHERE curso_codigo = 'EST100' AND estado = 'Matriculado'"
+        ).fetchone()[0]
+        conn.close()
+        for instancia in instancias:
+            instancia.cerrar()
+    
+    exitos = sum(1 for r in resultados if r["success"])
+    return {
+        "enroladores": enroladores,
+        "plazas": plazas,
+        "servidores": len(instancias),
+        "matriculas_confirmadas": exitos,
+        "matriculados_en_bd": matriculados,
+        "sobreventa": matriculados > plazas,
+        "rechazos_sin_plaza": sum(1 for r in resultados if r.get("error") == "No hay plazas disponibles en este curso"),
+        "otros_errores": [r["error"] for r in resultados
+                          if not r["success"] and r.get("error") != "No hay plazas disponibles en este curso"],
+        "reintentos_totales": sum(r.get("data", {}).get("reintentos", 0) for r in resultados),
+        "duracion_segundos": round(duracion, 3),
+        "commits_por_segundo": round(exitos / duracion, 1) if duracion > 0 else None
+    }
+
+def benchmark_exportacion(filas: int = 200000, formatos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Mide filas por segundo de exportar_datos para cada formato sobre una
+    tabla log_actividad sintética, y el pico de memoria (tracemalloc) para
+    comprobar que no crece con el número de filas.
+    """
+    import tempfile
+    import tracemalloc
+    
+    formatos = formatos or list(EXTENSIONES_EXPORTACION)
+    resultados = {"filas": filas, "formatos": {}}
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        server = UniversidadMCPAvanzado(os.path.join(directorio, "benchmark.db"))
+        conn = server._get_connection()
+        conn.executemany(
+            "INSERT INTO log_actividad (tabla_afectada, accion, registro_id, datos_nuevos) VALUES (?, ?, ?, ?)",
+            (("matriculas", "INSERT", str(i), json.dumps({"estado": "Matriculado", "n": i}))
+             for i in range(filas))
+        )
+        conn.commit()
+        conn.close()
+        
+        for formato in formatos:
+            for comprimir in (False, True):
+                destino = os.path.join(directorio, f"export_{formato}_{int(comprimir)}")
+                stats = server.exportar_tabla("log_actividad", formato, destino, comprimir)
+                
+                tracemalloc.start()
+                server.exportar_tabla("log_actividad", formato, destino, comprimir)
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                
+                clave = formato + ("+gzip" if comprimir else "")
+                resultados["formatos"][clave] = {
+                    "filas_por_segundo": stats["filas_por_segundo"],
+                    "bytes_escritos": stats["bytes_escritos"],
+                    "pico_memoria_kb": round(pico / 1024, 1)
+                }
+        server.cerrar()
+    
+    return resultados
+
+def benchmark_columnar(estudiantes: int = 100000, repeticiones: int = 5) -> Dict[str, Any]:
+    """
+    Compara las herramientas analíticas sobre SQLite y sobre la instantánea
+    columnar (mediana de milisegundos por llamada y si el resultado
+    coincide), y mide la carga inicial, un refresco incremental tras nuevas
+    matrículas y el volcado/apertura del fichero mapeado.
+    """
+    import tempfile
+    import statistics
+    from generador_datos_sinteticos import cargar_universidad
+    
+    def sin_volatiles(resultado: Dict[str, Any]) -> str:
+        datos = dict(resultado.get("data", {}))
+        datos.pop("timestamp", None)
+        datos.pop("cache_stats", None)
+        return json.dumps(dict(resultado, data=datos), sort_keys=True)
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, "columnar.db")
+        UniversidadMCPAvanzado(db_path).cerrar()
+        conn = sqlite3.connect(db_path)
+        cargar_universidad(conn, estudiantes, cursos=max(50, estudiantes // 20))
+        cursos = [fila[0] for fila in conn.execute("SELECT codigo FROM cursos LIMIT 12")]
+        nuevos = [fila[0] for fila in conn.execute("SELECT id FROM estudiantes WHERE activo = 1 LIMIT 200")]
+        # Cursos con plazas libres y sin prerequisitos, para que las matrículas del refresco se apliquen
+        con_plazas = [fila[0] for fila in conn.execute(
+            """SELECT c.codigo FROM cursos c
+               LEFT JOIN matriculas m ON m.curso_codigo = c.codigo AND m.estado = 'Matriculado'
+               WHERE c.activo = 1 AND COALESCE(c.prerequisitos, '[]') = '[]'
+               GROUP BY c.codigo HAVING c.max_estudiantes - COUNT(m.id) > 0
+               ORDER BY c.max_estudiantes - COUNT(m.id) DESC"""
+        )]
+        conn.close()
+        
+        servidor_sql = UniversidadMCPAvanzado(db_path)
+        inicio = time.perf_counter()
+        servidor_col = UniversidadMCPAvanzado(db_path, columnar=True)
+        carga = time.perf_counter() - inicio
+        resultados: Dict[str, Any] = {
+            "estudiantes": estudiantes,
+            "carga_segundos": round(carga, 3),
+            "instantanea": servidor_col.columnar.get_stats() if servidor_col.columnar else None,
+            "herramientas": {}
+        }
+        
+        llamadas = [("analizar_rendimiento", {"tipo": "general"}),
+                    ("analizar_rendimiento", {"tipo": "por_carrera"}),
+                    ("generar_dashboard", {})]
+        if np is not None:
+            llamadas.append(("simular_carga_academica", {
+                "planes": [cursos[:4], cursos[4:8], cursos[8:12]], "escenarios": 20, "semilla": 1, "procesos": 1
+            }))
+        for nombre, args in llamadas:
+            medidas = {}
+            salidas = {}
+            for modo, servidor in (("sqlite", servidor_sql), ("columnar", servidor_col)):
+                tiempos = []
+                for _ in range(repeticiones):
+                    servidor.cache.clear()
+                    inicio = time.perf_counter()
+                    salidas[modo] = servidor.tools[nombre](args)
+                    tiempos.append(time.perf_counter() - inicio)
+                medidas[f"{modo}_ms"] = round(statistics.median(tiempos) * 1000, 2)
+            medidas["aceleracion"] = round(medidas["sqlite_ms"] / max(medidas["columnar_ms"], 1e-6), 1)
+            medidas["coincide"] = sin_volatiles(salidas["sqlite"]) == sin_volatiles(salidas["columnar"])
+            resultados["herramientas"][f"{nombre}:{args.get('tipo', '')}".rstrip(":")] = medidas
+        
+        if servidor_col.columnar:
+            # Refresco incremental: matrículas nuevas registradas en log_actividad;
+            # cada estudiante prueba los cursos con plazas hasta que uno lo admite
+            matriculas = 0
+            for i, estudiante_id in enumerate(nuevos):
+                for j in range(len(con_plazas)):
+                    curso = con_plazas[(i + j) % len(con_plazas)]
+                    if servidor_sql.procesar_matricula({"estudiante_id": estudiante_id, "curso_codigo": curso})["success"]:
+                        matriculas += 1
+                        break
+            servidor_sql.registro_cambios.vaciar()
+            inicio = time.perf_counter()
+            aplicados = servidor_col.columnar.refrescar()
+            if aplicados == 0:
+                raise RuntimeError(
+                    f"El refresco incremental no aplicó cambios ({matriculas} matrículas nuevas): no se ha medido nada"
+                )
+            resultados["refresco_incremental"] = {
+                "matriculas": matriculas,
+                "cambios": aplicados,
+                "ms": round((time.perf_counter() - inicio) * 1000, 2),
+                "coincide": sin_volatiles(servidor_sql.analizar_rendimiento({}))
+                            == sin_volatiles(servidor_col.analizar_rendimiento({}))
+            }
+            
+            ruta = os.path.join(directorio, "benchmark.columnar")
+            inicio = time.perf_counter()
+            servidor_col.columnar.persistir(ruta)
+            volcado = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            mapeada = InstantaneaColumnar.abrir(ruta)
+            apertura = time.perf_counter() - inicio
+            resultados["fichero_mmap"] = {
+                "bytes": os.path.getsize(ruta),
+                "volcado_ms": round(volcado * 1000, 2),
+                "apertura_ms": round(apertura * 1000, 2),
+                "coincide": mapeada.rendimiento_general() == servidor_col.columnar.rendimiento_general()
+            }
+            mapeada.cerrar()
+        
+        servidor_sql.cerrar()
+        servidor_col.cerrar()
+    return resultados
+
+def benchmark_memoria_modelos(instancias: int = 1_000_000) -> Dict[str, Any]:
+    """
+    Compara bytes por objeto de Estudiante, Curso y Matricula frente a su
+    versión anterior (dataclass con __dict__ y sin internar). Cada instancia
+    se crea a partir de una fila JSON decodificada, de modo que sus cadenas
+    son copias nuevas como las que devuelve la base de datos.
+    """
+    import tracemalloc
+    
+    def bytes_por_objeto(clase, filas: List[str]) -> float:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        objetos = [clase(*json.loads(fila)) for fila in filas]
+        usados = tracemalloc.get_traced_memory()[0] - base - sys.getsizeof(objetos)
+        tracemalloc.stop()
+        del objetos
+        return usados / len(filas)
+    
+    carreras = ["Ingeniería Informática", "Matemáticas", "Física", "Derecho", "Economía"]
+    estados = ["Matriculado", "Aprobado", "Reprobado"]
+    generadores = {
+        Estudiante: lambda i: [f"{2021 + i % 4}{i:07d}", f"Estudiante {i}", f"e{i}@univ.edu",
+                               carreras[i % 5], 1 + i % 4, True, f"{2021 + i % 4}-09-01", 6 * (i % 40)],
+        Curso: lambda i: [f"C{i:07d}", f"Curso {i}", f"Dr. Profesor {i % 40}", 6, 60,
+                          [], True, f"2024S{1 + i % 2}"],
+        Matricula: lambda i: [i, f"2024{i % 100000:07d}", f"INF{i % 1000:04d}", f"{2021 + i % 4}-09-15",
+                              5.0 + i % 5, estados[i % 3]],
+    }
+    
+    resultados = {"instancias": instancias, "slots": bool(_SLOTS), "modelos": {}}
+    for clase, generar in generadores.items():
+        anterior = make_dataclass(f"{clase.__name__}Anterior", [(f.name, f.type) for f in fields(clase)])
+        filas = [json.dumps(generar(i)) for i in range(instancias)]
+        antes = bytes_por_objeto(anterior, filas)
+        despues = bytes_por_objeto(clase, filas)
+        resultados["modelos"][clase.__name__] = {
+            "antes_bytes_por_objeto": round(antes, 1),
+            "despues_bytes_por_objeto": round(despues, 1),
+            "reduccion_pct": round(100 * (1 - despues / antes), 1)
+        }
+    return resultados
+
+def benchmark_lecturas_escrituras(estudiantes: int = 20000, segundos: float = 5.0,
+                                  lectores: int = 4) -> Dict[str, Any]:
+    """
+    Mide la latencia de procesar_matricula sola y mientras varios hilos lanzan
+    sin parar analizar_rendimiento y generar_dashboard (sin cache), tanto
+    leyendo de la base de datos principal como de la instantánea. Informa
+    también del tamaño del WAL al terminar, que crece si las lecturas largas
+    impiden los checkpoints.
+    """
+    import tempfile
+    from generador_datos_sinteticos import cargar_universidad
+    
+    def percentiles(latencias: List[float]) -> Dict[str, float]:
+        latencias = sorted(latencias)
+        if not latencias:
+            return {}
+        return {f"p{p}_ms": round(latencias[min(len(latencias) - 1, int(len(latencias) * p / 100))] * 1000, 3)
+                for p in (50, 95, 99)}
+    
+    resultados: Dict[str, Any] = {"estudiantes": estudiantes, "lectores": lectores, "configuraciones": {}}
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, "lecturas.db")
+        UniversidadMCPAvanzado(db_path).cerrar()
+        conn = sqlite3.connect(db_path)
+        cargar_universidad(conn, estudiantes, cursos=max(50, estudiantes // 20))
+        ids = [fila[0] for fila in conn.execute("SELECT id FROM estudiantes WHERE activo = 1")]
+        cursos = [fila[0] for fila in conn.execute("SELECT codigo FROM cursos")]
+        conn.close()
+        
+        for nombre, intervalo in (("pool_solo_lectura", None), ("instantanea", 1.0)):
+            server = UniversidadMCPAvanzado(db_path, intervalo_instantanea=intervalo)
+            rng = random.Random(7)
+            
+            def fase(con_analitica: bool) -> Dict[str, Any]:
+                parar = threading.Event()
+                consultas = [0]
+                
+                def analitica():
+                    while not parar.is_set():
+                        server.cache.clear()
+                        server.analizar_rendimiento({"tipo": "general"})
+                        server.analizar_rendimiento({"tipo": "por_carrera"})
+                        server.generar_dashboard({})
+                        consultas[0] += 3
+                
+                hilos = [threading.Thread(target=analitica) for _ in range(lectores if con_analitica else 0)]
+                for hilo in hilos:
+                    hilo.start()
+                latencias = []
+                fin = time.perf_counter() + segundos
+                while time.perf_counter() < fin:
+                    inicio = time.perf_counter()
+                    server.procesar_matricula({"estudiante_id": rng.choice(ids), "curso_codigo": rng.choice(cursos)})
+                    latencias.append(time.perf_counter() - inicio)
+                parar.set()
+                for hilo in hilos:
+                    hilo.join()
+                return {"escrituras": len(latencias), "consultas_analiticas": consultas[0], **percentiles(latencias)}
+            
+            resultados["configuraciones"][nombre] = {
+                "sin_analitica": fase(False),
+                "con_analitica": fase(True),
+                "wal_kb": round(os.path.getsize(db_path + "-wal") / 1024, 1) if os.path.exists(db_path + "-wal") else 0,
+                "pool": server.pool_lectura.get_stats(),
+                "instantanea": server.instantanea.get_stats() if server.instantanea else None
+            }
+            server.cerrar()
+    
+    return resultados
+
+async def servir_stdio_multiproceso(server: UniversidadMCPAvanzado):
+    """
+    Bucle stdio del modo multiproceso: cada petición se atiende en su propia
+    tarea, así que las respuestas pueden salir en distinto orden que las
+    peticiones y llevan su id para poder emparejarlas.
+    """
+    loop = asyncio.get_running_loop()
+    pendientes = set()
+    
+    async def atender(request: Dict[str, Any]):
+        for response in await server.handle_request_async(request):
+            if "id" in request:
+                response["id"] = request["id"]
+            print(json.dumps(response))
+            sys.stdout.flush()
+    
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(json.dumps({"error": f"JSON inválido: {str(e)}"}))
+            sys.stdout.flush()
+            continue
+        tarea = asyncio.create_task(atender(request))
+        pendientes.add(tarea)
+        tarea.add_done_callback(pendientes.discard)
+    
+    await asyncio.gather(*pendientes)
+
+def benchmark_trabajadores(estudiantes: int = 20000, peticiones: int = 48,
+                           procesos: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Throughput de herramientas pesadas (analizar_rendimiento y, con numpy,
+    simular_carga_academica) atendidas en el propio proceso frente al modo
+    multiproceso con 1, 2, 4... trabajadores, hasta el número de núcleos.
+    """
+    import tempfile
+    from generador_datos_sinteticos import cargar_universidad
+    
+    nucleos = os.cpu_count() or 1
+    procesos = procesos or sorted({1, 2, 4, 8, 16, nucleos} & set(range(1, nucleos + 1))) or [1]
+    resultados: Dict[str, Any] = {"estudiantes": estudiantes, "peticiones": peticiones,
+                                  "nucleos": nucleos, "modos": {}}
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, "trabajadores.db")
+        UniversidadMCPAvanzado(db_path).cerrar()
+        conn = sqlite3.connect(db_path)
+        cargar_universidad(conn, estudiantes, cursos=max(50, estudiantes // 20))
+        cursos = [fila[0] for fila in conn.execute("SELECT codigo FROM cursos LIMIT 12")]
+        conn.close()
+        
+        carga = []
+        for i in range(peticiones):
+            if np is not None and i % 2:
+                carga.append(("simular_carga_academica", {
+                    "planes": [cursos[:4], cursos[4:8], cursos[8:12]], "escenarios": 40, "semilla": i
+                }))
+            else:
+                carga.append(("analizar_rendimiento", {"tipo": ("general", "por_carrera")[i % 4 // 2]}))
+        
+        server = UniversidadMCPAvanzado(db_path)
+        inicio = time.perf_counter()
+        for nombre, args in carga:
+            server.tools[nombre](dict(args, procesos=1) if nombre == "simular_carga_academica" else args)
+        duracion = time.perf_counter() - inicio
+        resultados["modos"]["en_proceso"] = {"peticiones_por_segundo": round(peticiones / duracion, 2)}
+        
+        async def lanzar() -> tuple:
+            # Una petición por trabajador para que todos estén inicializados antes de medir
+            await asyncio.gather(*(server.handle_request_async({
+                "method": "tools/call", "params": {"name": "analizar_rendimiento", "arguments": {}}
+            }) for _ in range(n)))
+            inicio = time.perf_counter()
+            respuestas = await asyncio.gather(*(server.handle_request_async({
+                "method": "tools/call", "params": {"name": nombre, "arguments": args}
+            }) for nombre, args in carga))
+            errores = sum(1 for r in respuestas if "error" in r[0])
+            return time.perf_counter() - inicio, errores
+        
+        base = None
+        for n in procesos:
+            server.iniciar_trabajadores(n)
+            duracion, errores = asyncio.run(lanzar())
+            server.trabajadores.shutdown(wait=True)
+            server.trabajadores = None
+            throughput = peticiones / duracion
+            base = base or throughput
+            resultados["modos"][f"{n}_trabajadores"] = {
+                "peticiones_por_segundo": round(throughput, 2),
+                "aceleracion": round(throughput / base, 2),
+                "errores": errores
+            }
+        server.cerrar()
+    
+    return resultados
 
 def main():
     """Función principal con modo interactivo mejorado"""
@@ -581,10 +2920,69 @@ def main():
             except KeyboardInterrupt:
                 break
     
+    elif len(sys.argv) > 1 and sys.argv[1] == "--verificar-planes":
+        resultado = verificar_planes_consulta()
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        sys.exit(1 if resultado["fallos"] else 0)
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--estres-matricula":
+        enroladores = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+        print(json.dumps(prueba_concurrencia_matricula(enroladores), indent=2))
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-simulacion":
+        estudiantes = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+        print(json.dumps(benchmark_simulacion(estudiantes), indent=2))
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-exportacion":
+        filas = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+        print(json.dumps(benchmark_exportacion(filas), indent=2))
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-trabajadores":
+        estudiantes = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+        print(json.dumps(benchmark_trabajadores(estudiantes), indent=2))
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--trabajadores":
+        # Modo servidor MCP (stdio) con las herramientas pesadas en procesos trabajadores
+        server = UniversidadMCPAvanzado()
+        server.iniciar_trabajadores(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+        print("Servidor MCP avanzado iniciado en modo multiproceso...", file=sys.stderr)
+        try:
+            asyncio.run(servir_stdio_multiproceso(server))
+        finally:
+            server.cerrar()
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-columnar":
+        estudiantes = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+        print(json.dumps(benchmark_columnar(estudiantes), indent=2))
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-memoria":
+        instancias = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+        print(json.dumps(benchmark_memoria_modelos(instancias), indent=2))
+    
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-lecturas":
+        estudiantes = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+        print(json.dumps(benchmark_lecturas_escrituras(estudiantes), indent=2))
+    
     else:
-        # Modo servidor MCP real
+        # Modo servidor MCP real (stdio)
         server = UniversidadMCPAvanzado()
         print("Servidor MCP avanzado iniciado...", file=sys.stderr)
+        
+        for line in sys.stdin:
+            try:
+                request = json.loads(line)
+                for response in server.handle_request_stream(request):
+                    # Cada bloque parcial lleva el id para asociarlo a su petición
+                    if "id" in request:
+                        response["id"] = request["id"]
+                    print(json.dumps(response))
+                    sys.stdout.flush()
+            except json.JSONDecodeError as e:
+                print(json.dumps({"error": f"JSON inválido: {str(e)}"}))
+                sys.stdout.flush()
+            except Exception as e:
+                print(json.dumps({"error": f"Error del servidor: {str(e)}"}))
+                sys.stdout.flush()
 
 if __name__ == "__main__":
     main()
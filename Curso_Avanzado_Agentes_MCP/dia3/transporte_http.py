@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Transporte HTTP/SSE para los servidores MCP universitarios - Día 3
+Servidor asyncio de la biblioteca estándar con keep-alive que expone:
+  POST /mcp      peticiones JSON-RPC (con SSE si se piden resultados en streaming)
+  GET  /health   comprobación de salud para Docker, nginx y monitor.sh
+  GET  /metrics  métricas en formato de texto de Prometheus
+Incluye también un adaptador ASGI mínimo y un cliente de prueba de carga.
+"""
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, AsyncIterator, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RUTA_MCP = "/mcp"
+TAMANO_MAXIMO_CUERPO = 1024 * 1024
+TAMANO_MAXIMO_CABECERAS = 16 * 1024
+ESPERA_KEEP_ALIVE = 15.0
+LIMITES_HISTOGRAMA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+MENSAJES_HTTP = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"
+}
+
+@dataclass
+class RespuestaHTTP:
+    """Respuesta completa (cuerpo) o en streaming (eventos SSE ya serializados)"""
+    estado: int
+    cuerpo: bytes = b""
+    tipo: str = "application/json"
+    eventos: Optional[AsyncIterator[bytes]] = None
+
+class MetricasHTTP:
+    """Contadores e histogramas de latencia por herramienta, exportables a Prometheus"""
+    
+    def __init__(self):
+        self.respuestas: Dict[Tuple[str, int], int] = {}
+        self.herramientas: Dict[str, Dict[str, Any]] = {}
+        self.conexiones_abiertas = 0
+        self.conexiones_totales = 0
+        self.peticiones_en_curso = 0
+    
+    def contar_respuesta(self, ruta: str, estado: int):
+        clave = (ruta, estado)
+        self.respuestas[clave] = self.respuestas.get(clave, 0) + 1
+    
+    def observar(self, herramienta: str, duracion: float, error: bool):
+        datos = self.herramientas.setdefault(herramienta, {
+            "llamadas": 0, "errores": 0, "suma": 0.0, "cubetas": [0] * len(LIMITES_HISTOGRAMA)
+        })
+        datos["llamadas"] += 1
+        datos["errores"] += int(error)
+        datos["suma"] += duracion
+        for i, limite in enumerate(LIMITES_HISTOGRAMA):
+            if duracion <= limite:
+                datos["cubetas"][i] += 1
+    
+    def exportar(self, extra: Dict[str, float]) -> str:
+        """Formato de exposición de texto de Prometheus"""
+        lineas = [
+            "# TYPE mcp_http_respuestas_total counter",
+            *(f'mcp_http_respuestas_total{{ruta="{ruta}",estado="{estado}"}} {n}'
+              for (ruta, estado), n in sorted(self.respuestas.items())),
+            "# TYPE mcp_http_conexiones_abiertas gauge",
+            f"mcp_http_conexiones_abiertas {self.conexiones_abiertas}",
+            "# TYPE mcp_http_conexiones_total counter",
+            f"mcp_http_conexiones_total {self.conexiones_totales}",
+            "# TYPE mcp_http_peticiones_en_curso gauge",
+            f"mcp_http_peticiones_en_curso {self.peticiones_en_curso}",
+            "# TYPE mcp_herramienta_errores_total counter",
+        ]
+        lineas += [f'mcp_herramienta_errores_total{{herramienta="{h}"}} {d["errores"]}'
+                   for h, d in sorted(self.herramientas.items())]
+        lineas.append("# TYPE mcp_herramienta_duracion_segundos histogram")
+        for herramienta, datos in sorted(self.herramientas.items()):
+            etiqueta = f'herramienta="{herramienta}"'
+            for limite, n in zip(LIMITES_HISTOGRAMA, datos["cubetas"]):
+                lineas.append(f'mcp_herramienta_duracion_segundos_bucket{{{etiqueta},le="{limite}"}} {n}')
+            lineas.append(f'mcp_herramienta_duracion_segundos_bucket{{{etiqueta},le="+Inf"}} {datos["llamadas"]}')
+            lineas.append(f'mcp_herramienta_duracion_segundos_sum{{{etiqueta}}} {datos["suma"]:.6f}')
+            lineas.append(f'mcp_herramienta_duracion_segundos_count{{{etiqueta}}} {datos["llamadas"]}')
+        for nombre, valor in extra.items():
+            lineas += [f"# TYPE {nombre} gauge", f"{nombre} {valor}"]
+        return "\n".join(lineas) + "\n"
+
+class TransporteHTTP:
+    """
+    Expone un servidor MCP (cualquier objeto con handle_request) por HTTP.
+    
+    Las herramientas son síncronas: con hilos > 0 se ejecutan en un pool de
+    hilos para no bloquear el bucle de eventos (el servidor avanzado abre sus
+    propias conexiones por llamada); con hilos = 0 se ejecutan en el propio
+    bucle, necesario para el servidor básico, cuya conexión SQLite en memoria
+    solo puede usarse desde el hilo que la creó. Si el servidor avanzado está
+    en modo multiproceso, sus herramientas pesadas van a los trabajadores.
+    """
+    
+    def __init__(self, servidor, hilos: int = 8):
+        self.servidor = servidor
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="mcp-http") if hilos else None
+        self.metricas = MetricasHTTP()
+        self.inicio = time.time()
+    
+    async def despachar(self, metodo: str, ruta: str, cabeceras: Dict[str, str], cuerpo: bytes) -> RespuestaHTTP:
+        """Enruta una petición HTTP ya leída; común al servidor asyncio y al adaptador ASGI"""
+        ruta = ruta.split("?", 1)[0]
+        rutas = {"/health": "GET", "/metrics": "GET", RUTA_MCP: "POST"}
+        if ruta not in rutas:
+            respuesta = self._json(404, {"error": f"Ruta no encontrada: {ruta}"})
+        elif metodo != rutas[ruta]:
+            respuesta = self._json(405, {"error": f"Método {metodo} no permitido en {ruta}"})
+        elif ruta == "/health":
+            respuesta = self._json(200, self.estado_salud())
+        elif ruta == "/metrics":
+            respuesta = RespuestaHTTP(200, self.metricas.exportar(self._metricas_servidor()).encode(),
+                                      "text/plain; version=0.0.4")
+        else:
+            respuesta = await self._jsonrpc(cabeceras, cuerpo)
+        self.metricas.contar_respuesta(ruta if ruta in rutas else "otra", respuesta.estado)
+        return respuesta
+    
+    def estado_salud(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "servidor": type(self.servidor).__name__,
+            "uptime_segundos": round(time.time() - self.inicio, 1),
+            "conexiones_abiertas": self.metricas.conexiones_abiertas,
+            "peticiones_en_curso": self.metricas.peticiones_en_curso
+        }
+    
+    def _metricas_servidor(self) -> Dict[str, float]:
+        extra = {"mcp_uptime_segundos": round(time.time() - self.inicio, 1)}
+        cache = getattr(self.servidor, "cache", None)
+        if cache is not None:
+            extra["mcp_cache_entradas"] = cache.get_stats().get("total_keys", 0)
+        return extra
+    
+    @staticmethod
+    def _json(estado: int, datos: Any) -> RespuestaHTTP:
+        return RespuestaHTTP(estado, json.dumps(datos).encode())
+    
+    @staticmethod
+    def _sobre_jsonrpc(request: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Envuelve la respuesta de handle_request en un objeto JSON-RPC 2.0"""
+        sobre: Dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+        if "error" in response and len(response) == 1:
+            sobre["error"] = {"code": -32000, "message": str(response["error"])}
+        else:
+            sobre["result"] = response
+        return sobre
+    
+    async def _jsonrpc(self, cabeceras: Dict[str, str], cuerpo: bytes) -> RespuestaHTTP:
+        try:
+            request = json.loads(cuerpo)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return self._json(400, {"jsonrpc": "2.0", "id": None,
+                                    "error": {"code": -32700, "message": f"JSON inválido: {e}"}})
+        if isinstance(request, list) and request and hasattr(self.servidor, "handle_batch"):
+            return await self._lote(request)
+        if not isinstance(request, dict):
+            return self._json(400, {"jsonrpc": "2.0", "id": None,
+                                    "error": {"code": -32600, "message": "Se esperaba un objeto JSON-RPC"}})
+        
+        params = request.get("params", {})
+        if not isinstance(params, dict):
+            # Sobre válido con parámetros inválidos: error JSON-RPC en una respuesta normal
+            self.metricas.observar(str(request.get("method", "desconocido")), 0.0, True)
+            return self._json(200, {"jsonrpc": "2.0", "id": request.get("id"), "error": {
+                "code": -32602, "message": "Parámetros inválidos: params debe ser un objeto"
+            }})
+        quiere_sse = "text/event-stream" in cabeceras.get("accept", "")
+        if request.get("method") == "tools/call" and (quiere_sse or params.get("stream")):
+            request = dict(request, params=dict(params, stream=True))
+            return RespuestaHTTP(200, tipo="text/event-stream", eventos=self._eventos(request))
+        
+        respuestas = await self._ejecutar(request)
+        return self._json(200, self._sobre_jsonrpc(request, respuestas[-1]))
+    
+    async def _lote(self, requests: List[Any]) -> RespuestaHTTP:
+        """
+        Lote JSON-RPC: lo resuelve handle_batch del servidor y se devuelve como
+        array. Cada respuesta trae el id de su petición; las notificaciones no
+        tienen respuesta y un lote solo de notificaciones se contesta con 202.
+        """
+        inicio = time.perf_counter()
+        self.metricas.peticiones_en_curso += 1
+        try:
+            if self.ejecutor:
+                respuestas = await asyncio.get_running_loop().run_in_executor(
+                    self.ejecutor, self.servidor.handle_batch, requests)
+            else:
+                respuestas = self.servidor.handle_batch(requests)
+        finally:
+            self.metricas.peticiones_en_curso -= 1
+        # El lote cuenta como error si alguna de sus respuestas lo es (sin respuestas, ninguna)
+        self.metricas.observar("lote", time.perf_counter() - inicio,
+                               respuestas is not None and any("error" in r for r in respuestas))
+        if respuestas is None:
+            return RespuestaHTTP(202)
+        return self._json(200, [
+            self._sobre_jsonrpc({"id": response.pop("id", None)}, response)
+            for response in respuestas
+        ])
+    
+    def _atender(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if hasattr(self.servidor, "handle_request_stream"):
+            return list(self.servidor.handle_request_stream(request))
+        return [self.servidor.handle_request(request)]
+    
+    async def _ejecutar(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Ejecuta la petición sin bloquear el bucle y registra su latencia"""
+        herramienta = request.get("params", {}).get("name") or request.get("method", "desconocido")
+        self.metricas.peticiones_en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            if getattr(self.servidor, "trabajadores", None):
+                respuestas = await self.servidor.handle_request_async(request)
+            elif self.ejecutor:
+                respuestas = await asyncio.get_running_loop().run_in_executor(self.ejecutor, self._atender, request)
+            else:
+                respuestas = self._atender(request)
+        except Exception as e:
+            logger.error(f"Error atendiendo {herramienta}: {e}")
+            respuestas = [{"error": f"Error del servidor: {e}"}]
+        finally:
+            self.metricas.peticiones_en_curso -= 1
+        self.metricas.observar(herramienta, time.perf_counter() - inicio, "error" in respuestas[-1])
+        return respuestas
+    
+    async def _eventos(self, request: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """
+        Produce cada respuesta parcial como un evento SSE según se genera. Con
+        pool de hilos, el generador corre en un hilo y entrega los bloques por
+        una cola acotada, así que un cliente lento frena al productor.
+        """
+        def evento(response: Dict[str, Any]) -> bytes:
+            return f"event: message\ndata: {json.dumps(self._sobre_jsonrpc(request, response))}\n\n".encode()
+        
+        if not self.ejecutor or not hasattr(self.servidor, "handle_request_stream"):
+            for response in await self._ejecutar(request):
+                yield evento(response)
+            return
+        
+        loop = asyncio.get_running_loop()
+        cola: "asyncio.Queue" = asyncio.Queue(maxsize=8)
+        cancelado = False
+        fin = object()
+        
+        def producir():
+            try:
+                for response in self.servidor.handle_request_stream(request):
+                    if cancelado:
+                        return
+                    asyncio.run_coroutine_threadsafe(cola.put(response), loop).result()
+            except Exception as e:
+                asyncio.run_coroutine_threadsafe(cola.put({"error": f"Error del servidor: {e}"}), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(cola.put(fin), loop).result()
+        
+        herramienta = request.get("params", {}).get("name", "desconocido")
+        inicio = time.perf_counter()
+        self.metricas.peticiones_en_curso += 1
+        productor = loop.run_in_executor(self.ejecutor, producir)
+        error = False
+        try:
+            while True:
+                response = await cola.get()
+                if response is fin:
+                    break
+                error = error or "error" in response
+                yield evento(response)
+        finally:
+            cancelado = True
+            # Vaciar la cola por si el productor estaba esperando para encolar
+            while not productor.done():
+                try:
+                    cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            self.metricas.peticiones_en_curso -= 1
+            self.metricas.observar(herramienta, time.perf_counter() - inicio, error)
+    
+    async def atender_conexion(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Bucle keep-alive de una conexión HTTP/1.1"""
+        self.metricas.conexiones_abiertas += 1
+        self.metricas.conexiones_totales += 1
+        try:
+            while True:
+                try:
+                    cabecera = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), ESPERA_KEEP_ALIVE)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._escribir(writer, self._json(413, {"error": "Cabeceras demasiado grandes"}), False)
+                    break
+                
+                lineas = cabecera.decode("latin-1").split("\r\n")
+                try:
+                    metodo, ruta, version = lineas[0].split(" ", 2)
+                except ValueError:
+                    await self._escribir(writer, self._json(400, {"error": "Línea de petición inválida"}), False)
+                    break
+                cabeceras = {}
+                for linea in lineas[1:]:
+                    if ":" in linea:
+                        nombre, valor = linea.split(":", 1)
+                        cabeceras[nombre.strip().lower()] = valor.strip()
+                
+                conexion = cabeceras.get("connection", "").lower()
+                mantener = conexion != "close" if version == "HTTP/1.1" else conexion == "keep-alive"
+                
+                cuerpo = b""
+                if "chunked" in cabeceras.get("transfer-encoding", "").lower():
+                    await self._escribir(writer, self._json(411, {"error": "Se requiere Content-Length"}), False)
+                    break
+                # Content-Length es 1*DIGIT: sin él no se sabe dónde acaba el cuerpo
+                # y la conexión no puede seguir usándose
+                valor_longitud = cabeceras.get("content-length", "0") or "0"
+                if not (valor_longitud.isascii() and valor_longitud.isdigit()):
+                    await self._escribir(writer, self._json(400, {"error": "Content-Length inválido"}), False)
+                    break
+                longitud = int(valor_longitud)
+                if longitud > TAMANO_MAXIMO_CUERPO:
+                    await self._escribir(writer, self._json(413, {"error": "Cuerpo demasiado grande"}), False)
+                    break
+                if longitud:
+                    try:
+                        cuerpo = await reader.readexactly(longitud)
+                    except asyncio.IncompleteReadError:
+                        break
+                
+                respuesta = await self.despachar(metodo.upper(), ruta, cabeceras, cuerpo)
+                if not await self._escribir(writer, respuesta, mantener) or not mantener:
+                    break
+        finally:
+            self.metricas.conexiones_abiertas -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    async def _escribir(self, writer: asyncio.StreamWriter, respuesta: RespuestaHTTP, mantener: bool) -> bool:
+        """Escribe la respuesta; los eventos SSE van con Transfer-Encoding: chunked"""
+        cabeceras = [
+            f"HTTP/1.1 {respuesta.estado} {MENSAJES_HTTP.get(respuesta.estado, '')}",
+            f"Content-Type: {respuesta.tipo}",
+            f"Connection: {'keep-alive' if mantener else 'close'}",
+        ]
+        try:
+            if respuesta.eventos is None:
+                cabeceras.append(f"Content-Length: {len(respuesta.cuerpo)}")
+                writer.write(("\r\n".join(cabeceras) + "\r\n\r\n").encode() + respuesta.cuerpo)
+                await writer.drain()
+                return True
+            
+            cabeceras += ["Cache-Control: no-cache", "Transfer-Encoding: chunked"]
+            writer.write(("\r\n".join(cabeceras) + "\r\n\r\n").encode())
+            async for evento in respuesta.eventos:
+                writer.write(f"{len(evento):x}\r\n".encode() + evento + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            return True
+        except ConnectionError:
+            if respuesta.eventos is not None:
+                await respuesta.eventos.aclose()
+            return False
+    
+    async def servir(self, host: str = "0.0.0.0", puerto: int = 8080,
+                     listo: Optional[asyncio.Event] = None):
+        """Arranca el servidor HTTP y atiende conexiones hasta que se cancele"""
+        servidor = await asyncio.start_server(self.atender_conexion, host, puerto,
+                                              limit=TAMANO_MAXIMO_CABECERAS)
+        logger.info(f"Transporte HTTP escuchando en http://{host}:{puerto} (MCP en {RUTA_MCP})")
+        if listo:
+            listo.set()
+        async with servidor:
+            await servidor.serve_forever()
+    
+    def app_asgi(self):
+        """Adaptador ASGI (p. ej. para `uvicorn modulo:app`) sobre el mismo enrutado"""
+        async def app(scope, receive, send):
+            if scope["type"] != "http":
+                return
+            cuerpo = b""
+            while True:
+                mensaje = await receive()
+                cuerpo += mensaje.get("body", b"")
+                if not mensaje.get("more_body"):
+                    break
+            cabeceras = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+            respuesta = await self.despachar(scope["method"], scope["path"], cabeceras, cuerpo)
+            await send({"type": "http.response.start", "status": respuesta.estado,
+                        "headers": [(b"content-type", respuesta.tipo.encode())]})
+            if respuesta.eventos is None:
+                await send({"type": "http.response.body", "body": respuesta.cuerpo})
+                return
+            async for evento in respuesta.eventos:
+                await send({"type": "http.response.body", "body": evento, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        return app
+
+def crear_servidor(tipo: str = "avanzado", db_path: str = "universidad.db"):
+    """Instancia el servidor MCP del día 2 (básico) o del día 3 (avanzado)"""
+    if tipo == "basico":
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dia2"))
+        from servidor_mcp_basico import UniversidadMCPServer
+        return UniversidadMCPServer()
+    from servidor_universitario_avanzado import UniversidadMCPAvanzado
+    return UniversidadMCPAvanzado(db_path)
+
+async def prueba_carga(host: str, puerto: int, clientes: int = 50, peticiones: int = 20,
+                       herramienta: str = "buscar_estudiantes",
+                       argumentos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Cliente de carga: cada cliente abre una conexión keep-alive y envía sus
+    peticiones JSON-RPC una tras otra. Devuelve latencias y throughput.
+    """
+    latencias: List[float] = []
+    errores = 0
+    
+    async def cliente(n: int):
+        nonlocal errores
+        reader, writer = await asyncio.open_connection(host, puerto)
+        try:
+            for i in range(peticiones):
+                cuerpo = json.dumps({"jsonrpc": "2.0", "id": n * peticiones + i, "method": "tools/call",
+                                     "params": {"name": herramienta, "arguments": argumentos or {}}}).encode()
+                inicio = time.perf_counter()
+                writer.write(f"POST {RUTA_MCP} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(cuerpo)}\r\n\r\n".encode() + cuerpo)
+                await writer.drain()
+                cabecera = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                longitud = int(cabecera.lower().split("content-length:", 1)[1].split("\r\n", 1)[0])
+                respuesta = json.loads(await reader.readexactly(longitud))
+                latencias.append(time.perf_counter() - inicio)
+                if " 200 " not in cabecera.split("\r\n", 1)[0] or "error" in respuesta:
+                    errores += 1
+        finally:
+            writer.close()
+    
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(n) for n in range(clientes)))
+    duracion = time.perf_counter() - inicio
+    latencias.sort()
+    
+    def percentil(p: float) -> float:
+        return round(latencias[min(len(latencias) - 1, int(len(latencias) * p / 100))] * 1000, 3)
+    
+    return {
+        "clientes": clientes,
+        "peticiones": len(latencias),
+        "errores": errores,
+        "duracion_segundos": round(duracion, 3),
+        "peticiones_por_segundo": round(len(latencias) / duracion, 1),
+        "p50_ms": percentil(50), "p95_ms": percentil(95), "p99_ms": percentil(99)
+    }
+
+async def _prueba_carga_local(transporte: TransporteHTTP, args) -> Dict[str, Any]:
+    """Arranca el transporte en un puerto libre y le lanza la prueba de carga"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    listo = asyncio.Event()
+    tarea = asyncio.create_task(transporte.servir("127.0.0.1", puerto, listo))
+    await listo.wait()
+    try:
+        resultado = await prueba_carga("127.0.0.1", puerto, args.clientes, args.peticiones,
+                                       args.herramienta, json.loads(args.argumentos))
+    finally:
+        tarea.cancel()
+    resultado["metricas"] = transporte.metricas.herramientas
+    return resultado
+
+def main():
+    """Punto de entrada: servidor HTTP o prueba de carga local"""
+    parser = argparse.ArgumentParser(description="Transporte HTTP/SSE para los servidores MCP")
+    parser.add_argument("--servidor", choices=("avanzado", "basico"), default="avanzado")
+    parser.add_argument("--db", default="universidad.db", help="Base de datos del servidor avanzado")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--hilos", type=int, default=8, help="Hilos para ejecutar herramientas (avanzado)")
+    parser.add_argument("--trabajadores", type=int, default=0, help="Procesos para herramientas pesadas (avanzado)")
+    parser.add_argument("--prueba-carga", action="store_true", help="Lanzar una prueba de carga local y salir")
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=20)
+    parser.add_argument("--herramienta", default=None)
+    parser.add_argument("--argumentos", default="{}")
+    args = parser.parse_args()
+    
+    servidor = crear_servidor(args.servidor, args.db)
+    if args.trabajadores and args.servidor == "avanzado":
+        servidor.iniciar_trabajadores(args.trabajadores)
+    # La conexión en memoria del servidor básico no puede usarse desde otros hilos
+    transporte = TransporteHTTP(servidor, hilos=args.hilos if args.servidor == "avanzado" else 0)
+    args.herramienta = args.herramienta or ("buscar_estudiantes" if args.servidor == "avanzado"
+                                            else "listar_cursos")
+    
+    try:
+        if args.prueba_carga:
+            logging.getLogger().setLevel(logging.WARNING)
+            print(json.dumps(asyncio.run(_prueba_carga_local(transporte, args)), indent=2))
+        else:
+            asyncio.run(transporte.servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if hasattr(servidor, "cerrar"):
+            servidor.cerrar()
+
+if __name__ == "__main__":
+    main()
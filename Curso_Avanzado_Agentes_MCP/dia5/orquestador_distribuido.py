@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Orquestador fragmentado en varios procesos - Día 5
+Cada proceso ejecuta su propio OrquestadorCentral con una partición de los
+agentes y de las colas; un router ligero reparte las tareas por hashing
+consistente y propaga las finalizaciones para resolver dependencias entre
+fragmentos
+"""
+
+import os
+import json
+import time
+import bisect
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+import multiprocessing
+from typing import Dict, Any, List, Optional, Sequence, Set, Tuple
+
+from orquestador_multi_agente import (
+    OrquestadorCentral, GestorSeguridad, AgenteEspecializado, AgenteSimulado,
+    TareaOrquestada, TipoAgente, EstadoTarea, LimitadorEnvios, LimiteEnviosExcedido,
+    LIMITES_ENVIO_USUARIO_POR_ROL, LIMITES_ENVIO_ROL, logger
+)
+
+# Mensajes por put(): router y fragmentos agrupan lo acumulado en cada vuelta del bucle
+MAX_MENSAJES_POR_ENVIO = 256
+
+class AnilloHash:
+    """
+    Anillo de hashing consistente con nodos virtuales. Añadir o quitar un
+    fragmento solo remapea ~1/N de las claves, y los nodos virtuales
+    reparten la carga de forma uniforme entre fragmentos.
+    """
+    
+    def __init__(self, nodos: Sequence[int], nodos_virtuales: int = 64):
+        self.nodos_virtuales = nodos_virtuales
+        self._puntos: List[int] = []
+        self._nodo_de_punto: Dict[int, int] = {}
+        for nodo in nodos:
+            self.añadir(nodo)
+    
+    @staticmethod
+    def _hash(clave: str) -> int:
+        return int.from_bytes(hashlib.blake2b(clave.encode(), digest_size=8).digest(), "big")
+    
+    def añadir(self, nodo: int):
+        for replica in range(self.nodos_virtuales):
+            punto = self._hash(f"{nodo}#{replica}")
+            bisect.insort(self._puntos, punto)
+            self._nodo_de_punto[punto] = nodo
+    
+    def quitar(self, nodo: int):
+        for replica in range(self.nodos_virtuales):
+            punto = self._hash(f"{nodo}#{replica}")
+            self._puntos.remove(punto)
+            del self._nodo_de_punto[punto]
+    
+    def nodo(self, clave: str) -> int:
+        """Primer nodo en sentido horario desde el hash de la clave"""
+        posicion = bisect.bisect(self._puntos, self._hash(clave)) % len(self._puntos)
+        return self._nodo_de_punto[self._puntos[posicion]]
+
+class AgenteCPU(AgenteEspecializado):
+    """
+    Agente cuyo trabajo ocupa la CPU del proceso (validación, cálculo,
+    serialización): es la carga que un solo bucle de eventos no puede
+    escalar y que el despliegue fragmentado reparte entre procesos.
+    """
+    
+    def __init__(self, tipo: TipoAgente, nombre: str, iteraciones: int = 2000):
+        super().__init__(tipo, nombre, ["cpu"])
+        self.iteraciones = iteraciones
+    
+    async def _ejecutar_tarea_especializada(self, tarea: TareaOrquestada) -> Dict[str, Any]:
+        huella = tarea.id.encode()
+        for _ in range(self.iteraciones):
+            huella = hashlib.sha256(huella).digest()
+        return {"success": True, "data": {"huella": huella.hex()[:16]}}
+
+_CLASES_AGENTE = {"simulado": AgenteSimulado, "cpu": AgenteCPU}
+
+class OrquestadorFragmento(OrquestadorCentral):
+    """
+    Orquestador de un proceso del despliegue fragmentado. Comunica cada
+    tarea terminada al router y acepta como completadas las dependencias
+    de otros fragmentos que el router le notifica. Los límites de envío los
+    aplica el router (aquí cada usuario tendría N cubos, uno por fragmento).
+    """
+    
+    def __init__(self, gestor_seguridad: GestorSeguridad, indice: int, salida: Any,
+                 ruta_diario: Optional[str] = None):
+        self.indice = indice
+        self.salida = salida
+        self.completadas_externas: Set[str] = set()
+        self._completadas_locales: Set[str] = set()
+        # Tarea original -> ids de sus duplicados (se completan con ella)
+        self._alias: Dict[str, List[str]] = {}
+        self._salientes: List[tuple] = []
+        self._envio_programado = False
+        super().__init__(gestor_seguridad, ruta_diario)
+        self.configuracion["limites_envio_activos"] = False
+        # Tras reproducir el diario, las completadas siguen satisfaciendo dependencias
+        self._completadas_locales.update(
+            t.id for t in self.historial_tareas if t.estado == EstadoTarea.COMPLETADA
+        )
+    
+    def _dependencias_completadas(self, tarea: TareaOrquestada) -> bool:
+        """Dependencias locales y remotas en O(1) por dependencia"""
+        return all(
+            dep_id in self._completadas_locales or dep_id in self.completadas_externas
+            for dep_id in tarea.dependencias
+        )
+    
+    def _tarea_terminada(self, tarea: TareaOrquestada):
+        super()._tarea_terminada(tarea)
+        alias = self._alias.pop(tarea.id, ())
+        if tarea.estado == EstadoTarea.COMPLETADA:
+            self._completadas_locales.add(tarea.id)
+            self._completadas_locales.update(alias)
+            if alias:
+                asyncio.create_task(self._procesar_cola())
+        self._enviar(("terminada", tarea.id, tarea.estado.value, tarea.resultado))
+    
+    def registrar_alias(self, duplicado: str, original: str):
+        """
+        enviar_tarea devolvió una tarea existente: las dependientes locales
+        del duplicado esperan a la original y el router resuelve con ella
+        sus esperas y notificaciones
+        """
+        if original in self._completadas_locales:
+            self._completadas_locales.add(duplicado)
+        else:
+            self._alias.setdefault(original, []).append(duplicado)
+        self._enviar(("alias", duplicado, original))
+    
+    def notificar_dependencia(self, tarea_id: str):
+        """Una tarea de otro fragmento se completó: sus dependientes pueden avanzar"""
+        self.completadas_externas.add(tarea_id)
+        asyncio.create_task(self._procesar_cola())
+    
+    def _enviar(self, mensaje: tuple):
+        self._salientes.append(mensaje)
+        if len(self._salientes) >= MAX_MENSAJES_POR_ENVIO:
+            self._vaciar_salientes()
+        elif not self._envio_programado:
+            self._envio_programado = True
+            asyncio.get_running_loop().call_soon(self._vaciar_salientes)
+    
+    def _vaciar_salientes(self):
+        self._envio_programado = False
+        if self._salientes:
+            self.salida.put((self.indice, self._salientes))
+            self._salientes = []
+
+def _ejecutar_fragmento(indice: int, entrada: Any, salida: Any, configuracion: Dict[str, Any]):
+    """Punto de entrada de cada proceso fragmento"""
+    logger.setLevel(configuracion.get("nivel_log", logging.WARNING))
+    asyncio.run(_bucle_fragmento(indice, entrada, salida, configuracion))
+
+async def _bucle_fragmento(indice: int, entrada: Any, salida: Any, configuracion: Dict[str, Any]):
+    ruta_diario = configuracion.get("ruta_diario")
+    orquestador = OrquestadorFragmento(
+        GestorSeguridad(configuracion["clave_secreta"]), indice, salida,
+        ruta_diario.format(indice=indice) if ruta_diario else None
+    )
+    for clase, tipo, cantidad, parametros in configuracion["agentes"]:
+        for i in range(cantidad):
+            orquestador.registrar_agente(
+                _CLASES_AGENTE[clase](TipoAgente(tipo), f"{clase}-{indice}-{tipo}-{i}", **parametros)
+            )
+    salida.put((indice, [("listo",)]))
+    
+    bucle = asyncio.get_running_loop()
+    while True:
+        # La lectura bloqueante de la cola va a un hilo para no parar el bucle
+        mensajes = await bucle.run_in_executor(None, entrada.get)
+        for mensaje in mensajes:
+            if mensaje[0] == "tarea":
+                tarea = TareaOrquestada.desde_json(mensaje[1])
+                try:
+                    tarea_id = await orquestador.enviar_tarea(tarea, mensaje[2])
+                    if tarea_id != tarea.id:
+                        orquestador.registrar_alias(tarea.id, tarea_id)
+                except PermissionError as e:
+                    orquestador._enviar(("terminada", tarea.id, EstadoTarea.FALLIDA.value,
+                                         {"success": False, "error": str(e)}))
+            elif mensaje[0] == "dependencia":
+                orquestador.notificar_dependencia(mensaje[1])
+            elif mensaje[0] == "estado":
+                orquestador._enviar(("estado", orquestador.obtener_estado_sistema()))
+            elif mensaje[0] == "fin":
+                while orquestador.cola_tareas or orquestador.tareas_activas or orquestador.reintentos_programados:
+                    await asyncio.sleep(0.01)
+                await orquestador.cerrar()
+                orquestador._vaciar_salientes()
+                return
+
+class RouterOrquestadores:
+    """
+    Front-end del despliegue fragmentado: valida nada y decide poco. Elige
+    el fragmento de cada tarea por hashing consistente (estudiante_id de
+    los datos de entrada o, en su defecto, el tipo de agente), le reenvía
+    enviar_tarea por una cola de multiprocessing y, cuando un fragmento
+    completa una tarea, avisa a los fragmentos con tareas que dependen de ella.
+    Los límites de envío por usuario y por rol se aplican aquí, una sola vez
+    para todo el despliegue; la autorización sigue en los fragmentos.
+    """
+    
+    def __init__(self, procesos: int = 4, particion: str = "estudiante",
+                 agentes: Optional[List[Tuple[str, str, int, Dict[str, Any]]]] = None,
+                 clave_secreta: str = "clave_secreta_universidad_2024",
+                 ruta_diario: Optional[str] = None, nodos_virtuales: int = 64,
+                 limites_envio: bool = True):
+        if particion not in ("estudiante", "tipo"):
+            raise ValueError(f"Partición no soportada: {particion}")
+        self.procesos = procesos
+        self.particion = particion
+        self.anillo = AnilloHash(range(procesos), nodos_virtuales)
+        self.configuracion = {
+            "clave_secreta": clave_secreta,
+            # (clase, tipo de agente, agentes por fragmento, parámetros)
+            "agentes": agentes or [("simulado", tipo.value, 2, {"duracion": 0.01}) for tipo in TipoAgente],
+            "ruta_diario": ruta_diario,
+            "nivel_log": logging.WARNING
+        }
+        self.gestor_seguridad = GestorSeguridad(clave_secreta)
+        self.limitador = LimitadorEnvios(LIMITES_ENVIO_USUARIO_POR_ROL, LIMITES_ENVIO_ROL) if limites_envio else None
+        self._contexto = multiprocessing.get_context("spawn")
+        self._entradas: List[Any] = []
+        self._salida = None
+        self._fragmentos: List[Any] = []
+        self._escucha: Optional[threading.Thread] = None
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        
+        self._pendientes_envio: List[List[tuple]] = [[] for _ in range(procesos)]
+        self._envio_programado = False
+        self.fragmento_de: Dict[str, int] = {}
+        self.terminadas: Dict[str, Tuple[str, Any]] = {}
+        self._dependientes: Dict[str, Set[int]] = {}
+        # Duplicado -> tarea original que devolvió su fragmento, y a la inversa
+        self.alias: Dict[str, str] = {}
+        self._alias_de: Dict[str, List[str]] = {}
+        self._esperas: Dict[str, List[asyncio.Future]] = {}
+        self._listos: Optional[asyncio.Future] = None
+        self._estados: Dict[int, Dict[str, Any]] = {}
+        self.estadisticas = {"enviadas": 0, "terminadas": 0, "notificaciones_dependencia": 0,
+                             "duplicados": 0, "limitadas": 0, "por_fragmento": [0] * procesos}
+    
+    def clave_particion(self, tarea: TareaOrquestada) -> str:
+        """Clave de hashing: el estudiante si la tarea lo lleva y se particiona por estudiante"""
+        if self.particion == "estudiante":
+            estudiante = tarea.dato("estudiante_id")
+            if estudiante is not None:
+                return f"estudiante:{estudiante}"
+        return f"tipo:{tarea.agente_requerido.value}"
+    
+    async def iniciar(self):
+        """Arranca los procesos fragmento y espera a que todos estén listos"""
+        self._bucle = asyncio.get_running_loop()
+        self._listos = self._bucle.create_future()
+        self._salida = self._contexto.Queue()
+        for indice in range(self.procesos):
+            entrada = self._contexto.Queue()
+            proceso = self._contexto.Process(
+                target=_ejecutar_fragmento, args=(indice, entrada, self._salida, self.configuracion),
+                daemon=True
+            )
+            proceso.start()
+            self._entradas.append(entrada)
+            self._fragmentos.append(proceso)
+        self._escucha = threading.Thread(target=self._escuchar, daemon=True)
+        self._escucha.start()
+        await self._listos
+        logger.info(f"Router con {self.procesos} fragmentos (partición por {self.particion})")
+    
+    async def enviar_tarea(self, tarea: TareaOrquestada, token_usuario: str = None) -> str:
+        """Reenvía la tarea a su fragmento; la validación del token la hace el fragmento"""
+        if token_usuario and self.limitador is not None:
+            # Sin payload válido el token lo rechazará el fragmento
+            payload = self.gestor_seguridad.validar_token(token_usuario)
+            if payload:
+                espera = self.limitador.admitir(payload["usuario"], payload["rol"])
+                if espera:
+                    self.estadisticas["limitadas"] += 1
+                    raise LimiteEnviosExcedido(
+                        f"Límite de envíos excedido para {payload['usuario']} ({payload['rol']})", espera
+                    )
+        indice = self.anillo.nodo(self.clave_particion(tarea))
+        self.fragmento_de[tarea.id] = indice
+        self._encolar(indice, ("tarea", tarea.a_json(), token_usuario))
+        self.estadisticas["enviadas"] += 1
+        self.estadisticas["por_fragmento"][indice] += 1
+        
+        # Dependencias en otros fragmentos: se notifican al completarse (o ya, si lo están)
+        for dep_id in tarea.dependencias:
+            fragmento_dep = self.fragmento_de.get(dep_id)
+            if fragmento_dep is None or fragmento_dep == indice:
+                continue
+            terminada = self.terminadas.get(dep_id)
+            if terminada is not None and terminada[0] == EstadoTarea.COMPLETADA.value:
+                self._encolar(indice, ("dependencia", dep_id))
+                self.estadisticas["notificaciones_dependencia"] += 1
+            else:
+                self._dependientes.setdefault(dep_id, set()).add(indice)
+        return tarea.id
+    
+    async def esperar_tarea(self, tarea_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Espera el resultado de una tarea enviada por este router"""
+        if tarea_id in self.terminadas:
+            return self.terminadas[tarea_id][1]
+        if tarea_id not in self.fragmento_de:
+            return {"success": False, "error": f"Tarea desconocida: {tarea_id}"}
+        futuro = self._bucle.create_future()
+        self._esperas.setdefault(tarea_id, []).append(futuro)
+        return await asyncio.wait_for(futuro, timeout)
+    
+    async def obtener_estado_sistema(self) -> Dict[str, Any]:
+        """Estado agregado: el de cada fragmento más el reparto del router"""
+        self._estados = {}
+        for indice in range(self.procesos):
+            self._encolar(indice, ("estado",))
+        while len(self._estados) < self.procesos:
+            await asyncio.sleep(0.01)
+        return {
+            "procesos": self.procesos,
+            "particion": self.particion,
+            "router": self.estadisticas,
+            "limitador_envios": self.limitador.resumen() if self.limitador is not None else None,
+            "fragmentos": [self._estados[i] for i in range(self.procesos)]
+        }
+    
+    async def cerrar(self):
+        """Deja que cada fragmento vacíe su cola y termina los procesos"""
+        for indice in range(self.procesos):
+            self._encolar(indice, ("fin",))
+        self._vaciar_envios()
+        await asyncio.to_thread(lambda: [p.join() for p in self._fragmentos])
+        self._salida.put(None)
+        self._escucha.join()
+    
+    def _encolar(self, indice: int, mensaje: tuple):
+        pendientes = self._pendientes_envio[indice]
+        pendientes.append(mensaje)
+        if len(pendientes) >= MAX_MENSAJES_POR_ENVIO:
+            self._entradas[indice].put(pendientes)
+            self._pendientes_envio[indice] = []
+        elif not self._envio_programado:
+            self._envio_programado = True
+            self._bucle.call_soon(self._vaciar_envios)
+    
+    def _vaciar_envios(self):
+        self._envio_programado = False
+        for indice, pendientes in enumerate(self._pendientes_envio):
+            if pendientes:
+                self._entradas[indice].put(pendientes)
+                self._pendientes_envio[indice] = []
+    
+    def _escuchar(self):
+        """Hilo lector de la cola de salida de los fragmentos"""
+        while True:
+            paquete = self._salida.get()
+            if paquete is None:
+                return
+            self._bucle.call_soon_threadsafe(self._procesar_mensajes, *paquete)
+    
+    def _resolver(self, tarea_id: str, estado: str, resultado: Any):
+        """Anota la finalización, avisa a los fragmentos dependientes y despierta a quien espera"""
+        self.terminadas[tarea_id] = (estado, resultado)
+        if estado == EstadoTarea.COMPLETADA.value:
+            for fragmento in self._dependientes.pop(tarea_id, ()):
+                self._encolar(fragmento, ("dependencia", tarea_id))
+                self.estadisticas["notificaciones_dependencia"] += 1
+        for futuro in self._esperas.pop(tarea_id, ()):
+            if not futuro.done():
+                futuro.set_result(resultado)
+    
+    def _procesar_mensajes(self, indice: int, mensajes: List[tuple]):
+        for mensaje in mensajes:
+            if mensaje[0] == "terminada":
+                _, tarea_id, estado, resultado = mensaje
+                self.estadisticas["terminadas"] += 1
+                self._resolver(tarea_id, estado, resultado)
+                # Los duplicados de la tarea terminan con ella
+                for duplicado in self._alias_de.pop(tarea_id, ()):
+                    self._resolver(duplicado, estado, resultado)
+            elif mensaje[0] == "alias":
+                _, duplicado, original = mensaje
+                self.alias[duplicado] = original
+                self.estadisticas["duplicados"] += 1
+                if original in self.terminadas:
+                    self._resolver(duplicado, *self.terminadas[original])
+                else:
+                    self._alias_de.setdefault(original, []).append(duplicado)
+            elif mensaje[0] == "estado":
+                self._estados[indice] = mensaje[1]
+            elif mensaje[0] == "listo":
+                self._estados[indice] = {}
+                if len(self._estados) == self.procesos and not self._listos.done():
+                    self._listos.set_result(None)
+
+async def _medir_escalado(procesos: int, tareas: int, agentes_por_fragmento: int, iteraciones: int,
+                          fraccion_dependientes: float) -> Dict[str, Any]:
+    router = RouterOrquestadores(
+        procesos, particion="estudiante",
+        agentes=[("cpu", TipoAgente.ACADEMICO.value, agentes_por_fragmento, {"iteraciones": iteraciones})]
+    )
+    await router.iniciar()
+    
+    enviadas = []
+    inicio = time.perf_counter()
+    for i in range(tareas):
+        # Una parte de las tareas depende de la de otro estudiante (probablemente en otro fragmento)
+        dependencias = (enviadas[i // 2],) if enviadas and (i * 7919) % 100 < fraccion_dependientes * 100 else ()
+        tarea = TareaOrquestada(tipo="calificaciones", agente_requerido=TipoAgente.ACADEMICO,
+                                datos_entrada={"estudiante_id": f"2024{i:05d}"}, dependencias=dependencias)
+        enviadas.append(await router.enviar_tarea(tarea))
+        if i % 200 == 199:
+            await asyncio.sleep(0)
+    resultados = await asyncio.gather(*(router.esperar_tarea(t) for t in enviadas))
+    duracion = time.perf_counter() - inicio
+    await router.cerrar()
+    
+    por_fragmento = router.estadisticas["por_fragmento"]
+    return {
+        "tareas_por_segundo": round(tareas / duracion, 1),
+        "segundos": round(duracion, 2),
+        "completadas": sum(1 for r in resultados if r and r.get("success")),
+        "notificaciones_dependencia": router.estadisticas["notificaciones_dependencia"],
+        "reparto_max_min": round(max(por_fragmento) / max(1, min(por_fragmento)), 2)
+    }
+
+def benchmark_escalado(tareas: int = 4000, procesos: Sequence[int] = (1, 2, 4, 8),
+                       agentes_por_fragmento: int = 4, iteraciones: int = 2000,
+                       fraccion_dependientes: float = 0.05) -> Dict[str, Any]:
+    """
+    Throughput de tareas con trabajo de CPU (iteraciones de SHA-256 por
+    tarea) al pasar de 1 a N procesos fragmento, con un 5% de tareas que
+    dependen de otra enrutada probablemente a otro fragmento. El escalado
+    está acotado por los núcleos disponibles (cpu_count en el resultado).
+    """
+    resultados = {"cpu_count": os.cpu_count(), "tareas": tareas, "iteraciones_cpu": iteraciones}
+    base = None
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        for n in procesos:
+            medida = asyncio.run(_medir_escalado(n, tareas, agentes_por_fragmento, iteraciones, fraccion_dependientes))
+            base = base or medida["tareas_por_segundo"]
+            medida["aceleracion"] = round(medida["tareas_por_segundo"] / base, 2)
+            resultados[f"procesos_{n}"] = medida
+    finally:
+        logger.setLevel(nivel_anterior)
+    return resultados
+
+async def demo_fragmentado(procesos: int = 3):
+    """Demo: reparto por estudiante y una dependencia entre fragmentos"""
+    print(f"🧩 Orquestador fragmentado con {procesos} procesos")
+    router = RouterOrquestadores(procesos)
+    await router.iniciar()
+    gestor = GestorSeguridad(router.configuracion["clave_secreta"])
+    token = gestor.generar_token("admin", "admin_sistema")
+    
+    matriculas = []
+    for i in range(6):
+        tarea = TareaOrquestada(tipo="matricula", agente_requerido=TipoAgente.ACADEMICO,
+                                datos_entrada={"estudiante_id": f"2024{i:04d}", "cursos": ["INF101"]})
+        matriculas.append(await router.enviar_tarea(tarea, token))
+    # El certificado del último estudiante espera a la matrícula del primero
+    certificado = TareaOrquestada(
+        tipo="generar_certificado", agente_requerido=TipoAgente.ADMINISTRACION,
+        datos_entrada={"estudiante_id": "20240005", "tipo_certificado": "matricula"},
+        dependencias=(matriculas[0],)
+    )
+    await router.enviar_tarea(certificado, token)
+    
+    for tarea_id in matriculas + [certificado.id]:
+        resultado = await router.esperar_tarea(tarea_id, timeout=10)
+        print(f"   {tarea_id[:8]} -> fragmento {router.fragmento_de[tarea_id]}: "
+              f"{'✅' if resultado.get('success') else '❌'}")
+    estado = await router.obtener_estado_sistema()
+    print(f"📊 Reparto: {estado['router']['por_fragmento']}, "
+          f"notificaciones de dependencia: {estado['router']['notificaciones_dependencia']}")
+    await router.cerrar()
+
+def main():
+    parser = argparse.ArgumentParser(description="Orquestador multi-agente fragmentado en varios procesos")
+    parser.add_argument("--procesos", type=int, default=3, help="Procesos fragmento de la demo")
+    parser.add_argument("--benchmark-escalado", action="store_true", help="Mide el escalado de 1 a 8 procesos")
+    parser.add_argument("--tareas", type=int, default=4000)
+    parser.add_argument("--iteraciones-cpu", type=int, default=2000)
+    args = parser.parse_args()
+    
+    if args.benchmark_escalado:
+        print(json.dumps(benchmark_escalado(args.tareas, iteraciones=args.iteraciones_cpu), indent=2))
+    else:
+        asyncio.run(demo_fragmentado(args.procesos))
+
+if __name__ == "__main__":
+    main()
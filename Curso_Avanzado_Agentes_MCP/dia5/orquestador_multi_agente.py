@@ -8,9 +8,19 @@ import asyncio
 import uuid
 import json
 import logging
+import os
 import sys
-from typing import Dict, Any, List, Optional, Callable
-from dataclasses import dataclass, field, asdict
+import math
+import time
+import random
+import signal
+import tempfile
+import itertools
+import subprocess
+import tracemalloc
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple, Union
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, asdict, fields
 from enum import Enum
 from datetime import datetime, timedelta
 import hashlib
@@ -96,16 +106,44 @@ class NivelPrioridad(Enum):
     CRITICA = 4
     EMERGENCIA = 5
 
-@dataclass
+# Las colas y el historial llegan a millones de tareas: los modelos usan
+# __slots__ (sin __dict__ por instancia) cuando la versión de Python lo permite
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Identificadores compactos: contador del proceso + sufijo aleatorio, sin
+# generar un UUID (y su cadena de 36 caracteres) por cada tarea
+_secuencia_ids = itertools.count(1)
+_sufijo_proceso = uuid.uuid4().hex[:8]
+
+def _nuevo_id() -> str:
+    """Genera un identificador único de 16 caracteres para tareas y registros"""
+    return f"{next(_secuencia_ids):08x}{_sufijo_proceso}"
+
+def _renovar_sufijo_proceso():
+    """Tras un fork el hijo necesita su propio sufijo para no repetir ids"""
+    global _secuencia_ids, _sufijo_proceso
+    _secuencia_ids = itertools.count(1)
+    _sufijo_proceso = uuid.uuid4().hex[:8]
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_renovar_sufijo_proceso)
+
+@dataclass(**_SLOTS)
 class TareaOrquestada:
-    """Representa una tarea en el sistema de orquestación"""
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    """
+    Representa una tarea en el sistema de orquestación.
+    
+    datos_entrada y metadatos son None hasta que se necesitan (dato() y
+    anotar() los leen y crean bajo demanda) y dependencias es una tupla
+    compartida vacía, así que una tarea sin carga no reserva contenedores.
+    """
+    id: str = field(default_factory=_nuevo_id)
     tipo: str = ""
     descripcion: str = ""
     agente_requerido: TipoAgente = TipoAgente.ACADEMICO
     prioridad: NivelPrioridad = NivelPrioridad.NORMAL
     estado: EstadoTarea = EstadoTarea.PENDIENTE
-    datos_entrada: Dict[str, Any] = field(default_factory=dict)
+    datos_entrada: Optional[Dict[str, Any]] = None
     resultado: Optional[Dict[str, Any]] = None
     agente_asignado: Optional[str] = None
     tiempo_creacion: datetime = field(default_factory=datetime.now)
@@ -113,13 +151,74 @@ class TareaOrquestada:
     tiempo_completado: Optional[datetime] = None
     intentos: int = 0
     max_intentos: int = 3
-    dependencias: List[str] = field(default_factory=list)
-    metadatos: Dict[str, Any] = field(default_factory=dict)
+    dependencias: Sequence[str] = ()
+    metadatos: Optional[Dict[str, Any]] = None
+    timeout_segundos: Optional[float] = None  # None: configuracion["timeout_tarea_segundos"]
+    clave_idempotencia: Optional[str] = None  # None: sin deduplicar (o hash del contenido si está activado)
+    fecha_limite: Optional[datetime] = None  # Plazo duro: ordena en EDF y permite descartar la tarea
 
-@dataclass
+    def __post_init__(self):
+        # Hay pocos tipos distintos: internarlos hace que todas las tareas
+        # compartan la misma cadena aunque lleguen decodificadas de JSON
+        self.tipo = sys.intern(self.tipo)
+    
+    def dato(self, clave: str, defecto: Any = None) -> Any:
+        """Lee un dato de entrada sin crear el diccionario si no existe"""
+        if self.datos_entrada is None:
+            return defecto
+        return self.datos_entrada.get(clave, defecto)
+    
+    def anotar(self, clave: str, valor: Any):
+        """Guarda un metadato, creando el diccionario en el primer uso"""
+        if self.metadatos is None:
+            self.metadatos = {}
+        self.metadatos[clave] = valor
+    
+    def clave_efectos(self) -> str:
+        """
+        Clave con la que un agente aplica los efectos externos de la tarea una
+        sola vez: la de idempotencia o, sin ella, el id, que se conserva al
+        reproducir el diario. Una tarea reanudada tras una caída puede
+        ejecutarse otra vez; con esta clave el sistema externo no repite el efecto.
+        """
+        return self.clave_idempotencia or self.id
+    
+    def calcular_clave_idempotencia(self) -> str:
+        """Hash del contenido (tipo, agente y datos de entrada): dos envíos iguales dan la misma clave"""
+        contenido = json.dumps(
+            [self.tipo, self.agente_requerido.value, self.datos_entrada],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(contenido.encode()).hexdigest()[:32]
+    
+    def a_json(self) -> str:
+        """Serializa la tarea completa (enums por valor, fechas en ISO 8601)"""
+        datos = {f.name: getattr(self, f.name) for f in fields(self)}
+        for nombre in ("agente_requerido", "prioridad", "estado"):
+            datos[nombre] = datos[nombre].value
+        for nombre in ("tiempo_creacion", "tiempo_asignacion", "tiempo_completado", "fecha_limite"):
+            if datos[nombre] is not None:
+                datos[nombre] = datos[nombre].isoformat()
+        datos["dependencias"] = list(self.dependencias)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+    
+    @classmethod
+    def desde_json(cls, texto: str) -> "TareaOrquestada":
+        """Reconstruye una tarea serializada con a_json()"""
+        datos = json.loads(texto)
+        datos["agente_requerido"] = TipoAgente(datos["agente_requerido"])
+        datos["prioridad"] = NivelPrioridad(datos["prioridad"])
+        datos["estado"] = EstadoTarea(datos["estado"])
+        for nombre in ("tiempo_creacion", "tiempo_asignacion", "tiempo_completado", "fecha_limite"):
+            if datos.get(nombre) is not None:
+                datos[nombre] = datetime.fromisoformat(datos[nombre])
+        datos["dependencias"] = tuple(datos["dependencias"])
+        return cls(**datos)
+
+@dataclass(**_SLOTS)
 class RegistroAuditoria:
     """Registro de auditoría para compliance"""
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_nuevo_id)
     timestamp: datetime = field(default_factory=datetime.now)
     usuario: str = ""
     accion: str = ""
@@ -127,7 +226,15 @@ class RegistroAuditoria:
     resultado: str = ""
     ip_origen: str = ""
     agente_usuario: str = ""
-    datos_adicionales: Dict[str, Any] = field(default_factory=dict)
+    datos_adicionales: Optional[Dict[str, Any]] = None
+    
+    def __post_init__(self):
+        # Usuarios, acciones y orígenes se repiten en casi todos los registros
+        self.usuario = sys.intern(self.usuario)
+        self.accion = sys.intern(self.accion)
+        self.resultado = sys.intern(self.resultado)
+        self.ip_origen = sys.intern(self.ip_origen)
+        self.agente_usuario = sys.intern(self.agente_usuario)
 
 class GestorSeguridad:
     """Gestiona autenticación, autorización y auditoría"""
@@ -154,8 +261,8 @@ class GestorSeguridad:
         payload = {
             "usuario": usuario,
             "rol": rol,
-            "exp": datetime.utcnow() + timedelta(hours=duracion_horas),
-            "iat": datetime.utcnow()
+            "exp": int((datetime.utcnow() + timedelta(hours=duracion_horas)).timestamp()),
+            "iat": int(datetime.utcnow().timestamp())
         }
         return jwt.encode(payload, self.clave_secreta, algorithm="HS256")
     
@@ -164,11 +271,9 @@ class GestorSeguridad:
         try:
             payload = jwt.decode(token, self.clave_secreta, algorithms=["HS256"])
             return payload
-        except jwt.ExpiredSignatureError:
-            logger.warning("Token expirado")
-            return None
-        except (jwt.InvalidTokenError, ValueError):
-            logger.warning("Token inválido")
+        except ValueError as e:
+            # SimpleJWT señala tanto la firma inválida como la expiración con ValueError
+            logger.warning(f"Token rechazado: {e}")
             return None
     
     def autorizar_accion(self, usuario: str, rol: str, accion: str) -> bool:
@@ -199,7 +304,7 @@ class GestorSeguridad:
             resultado=resultado,
             ip_origen=kwargs.get("ip_origen", "desconocida"),
             agente_usuario=kwargs.get("agente_usuario", "sistema"),
-            datos_adicionales=kwargs.get("datos_adicionales", {})
+            datos_adicionales=kwargs.get("datos_adicionales")
         )
         
         self.registros_auditoria.append(registro)
@@ -213,7 +318,13 @@ class GestorSeguridad:
             if fecha_inicio <= r.timestamp <= fecha_fin
         ]
         
-        return [asdict(r) for r in registros_periodo]
+        reporte = []
+        for r in registros_periodo:
+            registro = asdict(r)
+            if registro["datos_adicionales"] is None:
+                registro["datos_adicionales"] = {}
+            reporte.append(registro)
+        return reporte
 
 class AgenteEspecializado:
     """Clase base para agentes especializados"""
@@ -245,19 +356,71 @@ class AgenteEspecializado:
             self.estadisticas["tareas_completadas"] += 1
             self._actualizar_tiempo_promedio(tiempo_procesamiento)
             
-            self.estado = "disponible"
             return resultado
             
         except Exception as e:
             self.estadisticas["tareas_fallidas"] += 1
+            raise e
+        finally:
+            # También al cancelarse (timeout o cancelar_tarea), que no es Exception
             self.estado = "disponible"
+    
+    @property
+    def admite_lotes(self) -> bool:
+        """El agente declara la capacidad "procesar_lote" (varias tareas por llamada)"""
+        return "procesar_lote" in self.capacidades
+    
+    async def procesar_lote(self, tareas: List[TareaOrquestada]) -> List[Any]:
+        """
+        Procesa varias tareas del mismo tipo en una sola llamada. Devuelve un
+        resultado por tarea, en el mismo orden; una tarea que falla aparece
+        como la excepción correspondiente sin hacer fallar al resto.
+        """
+        self.estado = "ocupado"
+        inicio = datetime.now()
+        
+        try:
+            resultados = await self._ejecutar_lote_especializado(tareas)
+            if len(resultados) != len(tareas):
+                raise ValueError(f"procesar_lote devolvió {len(resultados)} resultados para {len(tareas)} tareas")
+            
+            # El tiempo de la llamada se reparte entre las tareas del lote
+            tiempo_por_tarea = (datetime.now() - inicio).total_seconds() / len(tareas)
+            for resultado in resultados:
+                if isinstance(resultado, Exception):
+                    self.estadisticas["tareas_fallidas"] += 1
+                else:
+                    self.estadisticas["tareas_completadas"] += 1
+                    self._actualizar_tiempo_promedio(tiempo_por_tarea)
+            return resultados
+        
+        except Exception as e:
+            self.estadisticas["tareas_fallidas"] += len(tareas)
             raise e
+        finally:
+            self.estado = "disponible"
     
     async def _ejecutar_tarea_especializada(self, tarea: TareaOrquestada) -> Dict[str, Any]:
         """Implementación específica según el tipo de agente"""
         # Simular diferentes tiempos de procesamiento
         await asyncio.sleep(0.5)  # Simular trabajo
         
+        return await self._procesar_por_tipo(tarea)
+    
+    async def _ejecutar_lote_especializado(self, tareas: List[TareaOrquestada]) -> List[Any]:
+        """Como _ejecutar_tarea_especializada, pero la preparación se paga una vez por lote"""
+        await asyncio.sleep(0.5)  # Simular trabajo (conexión, sesión, contexto...)
+        
+        resultados = []
+        for tarea in tareas:
+            try:
+                resultados.append(await self._procesar_por_tipo(tarea))
+            except Exception as e:
+                resultados.append(e)
+        return resultados
+    
+    async def _procesar_por_tipo(self, tarea: TareaOrquestada) -> Dict[str, Any]:
+        """Despacha la tarea al procesador del tipo de agente"""
         if self.tipo == TipoAgente.ACADEMICO:
             return await self._procesar_tarea_academica(tarea)
         elif self.tipo == TipoAgente.SOPORTE_IT:
@@ -278,8 +441,8 @@ class AgenteEspecializado:
                 "success": True,
                 "data": {
                     "estudiante_matriculado": True,
-                    "cursos_asignados": tarea.datos_entrada.get("cursos", []),
-                    "creditos_totales": len(tarea.datos_entrada.get("cursos", [])) * 4
+                    "cursos_asignados": tarea.dato("cursos", []),
+                    "creditos_totales": len(tarea.dato("cursos", [])) * 4
                 }
             }
         elif tarea.tipo == "calificaciones":
@@ -300,7 +463,7 @@ class AgenteEspecializado:
                 "data": {
                     "usuario_creado": True,
                     "credenciales": {
-                        "usuario": tarea.datos_entrada.get("nombre_usuario", "user123"),
+                        "usuario": tarea.dato("nombre_usuario", "user123"),
                         "password_temporal": "temp_" + str(uuid.uuid4())[:8]
                     }
                 }
@@ -323,7 +486,7 @@ class AgenteEspecializado:
                 "success": True,
                 "data": {
                     "reserva_confirmada": True,
-                    "recurso": tarea.datos_entrada.get("recurso", "Sala de estudio"),
+                    "recurso": tarea.dato("recurso", "Sala de estudio"),
                     "fecha_reserva": datetime.now().strftime("%Y-%m-%d %H:%M")
                 }
             }
@@ -349,7 +512,7 @@ class AgenteEspecializado:
                 "data": {
                     "pago_procesado": True,
                     "numero_transaccion": f"TXN-{uuid.uuid4().hex[:12].upper()}",
-                    "monto": tarea.datos_entrada.get("monto", 0)
+                    "monto": tarea.dato("monto", 0)
                 }
             }
         return {"success": True, "data": {"procesado": True}}
@@ -365,10 +528,654 @@ class AgenteEspecializado:
                 (tiempo_actual * (total_tareas - 1) + nuevo_tiempo) / total_tareas
             )
 
+class ServicioExterno:
+    """
+    Sistema externo compartido por los agentes simulados. Atiende como mucho
+    capacidad llamadas por ventana: por encima, la fracción sobrante falla
+    además de la tasa de fallo base, de modo que los reintentos que aumentan
+    la carga empeoran el fallo. Durante la caída (inicio, fin), en segundos
+    desde su creación, todas las llamadas fallan.
+    """
+    
+    def __init__(self, capacidad: int, ventana: float = 0.1, tasa_fallo: float = 0.0,
+                 caida: Optional[Tuple[float, float]] = None):
+        self.capacidad = capacidad
+        self.ventana = ventana
+        self.tasa_fallo = tasa_fallo
+        self.caida = caida
+        self.origen = time.monotonic()
+        self._recientes: deque = deque()
+        self.estadisticas = {"llamadas": 0, "fallos": 0, "llamadas_en_caida": 0}
+    
+    def llamar(self, rng: random.Random) -> bool:
+        """Registra una llamada y devuelve si el sistema la atiende"""
+        ahora = time.monotonic()
+        self._recientes.append(ahora)
+        while self._recientes[0] <= ahora - self.ventana:
+            self._recientes.popleft()
+        self.estadisticas["llamadas"] += 1
+        transcurrido = ahora - self.origen
+        if self.caida and self.caida[0] <= transcurrido < self.caida[1]:
+            self.estadisticas["llamadas_en_caida"] += 1
+            atendida = False
+        else:
+            atendida = rng.random() < (1 - self.tasa_fallo) * min(1.0, self.capacidad / len(self._recientes))
+        if not atendida:
+            self.estadisticas["fallos"] += 1
+        return atendida
+
+class AgenteSimulado(AgenteEspecializado):
+    """
+    Agente para pruebas de carga: sin la espera fija de 0,5 s, con duración
+    por tarea (constante o muestreada), un coste de preparación por llamada
+    y probabilidades de fallo y de bloqueo configurables. Un agente
+    bloqueado no responde nunca; solo el timeout del orquestador lo libera.
+    Con lotes=True declara procesar_lote y paga la preparación una vez por lote.
+    Con efectos (ruta SQLite) cada tarea completada deja un efecto en ese
+    sistema externo, aplicado una sola vez por tarea.clave_efectos(). Con
+    servicio, el fallo lo decide ese ServicioExterno en lugar de tasa_fallo.
+    """
+    
+    def __init__(self, tipo: TipoAgente, nombre: str,
+                 duracion: Union[float, Callable[[random.Random], float]] = 0.01,
+                 tasa_fallo: float = 0.0, tasa_bloqueo: float = 0.0, semilla: Optional[int] = None,
+                 preparacion: float = 0.0, lotes: bool = False, efectos: Optional[str] = None,
+                 servicio: Optional[ServicioExterno] = None):
+        super().__init__(tipo, nombre, ["simulacion", "procesar_lote"] if lotes else ["simulacion"])
+        self.duracion = duracion
+        self.preparacion = preparacion
+        self.tasa_fallo = tasa_fallo
+        self.tasa_bloqueo = tasa_bloqueo
+        self.servicio = servicio
+        self.rng = random.Random(semilla)
+        self.efectos: Optional[sqlite3.Connection] = None
+        if efectos:
+            self.efectos = sqlite3.connect(efectos, isolation_level=None)
+            self.efectos.execute("PRAGMA journal_mode = WAL")
+            self.efectos.execute("PRAGMA busy_timeout = 5000")
+            self.efectos.execute('''
+                CREATE TABLE IF NOT EXISTS efectos (
+                    clave TEXT PRIMARY KEY,
+                    agente TEXT NOT NULL,
+                    repeticiones INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            self.estadisticas["efectos_repetidos"] = 0
+    
+    def _muestrear_duracion(self) -> float:
+        return self.duracion(self.rng) if callable(self.duracion) else self.duracion
+    
+    def _resultado(self, tarea: TareaOrquestada) -> Dict[str, Any]:
+        if (not self.servicio.llamar(self.rng)) if self.servicio else self.rng.random() < self.tasa_fallo:
+            raise RuntimeError(f"Fallo simulado en {self.nombre}")
+        resultado = {"success": True, "data": {"procesado": True, "agente": self.nombre}}
+        if self.efectos is not None:
+            resultado["data"]["efecto_repetido"] = self._aplicar_efecto(tarea)
+        return resultado
+    
+    def _aplicar_efecto(self, tarea: TareaOrquestada) -> bool:
+        """Aplica el efecto si su clave no consta ya en el sistema externo; devuelve si estaba aplicado"""
+        clave = tarea.clave_efectos()
+        if self.efectos.execute("INSERT OR IGNORE INTO efectos (clave, agente) VALUES (?, ?)",
+                                (clave, self.nombre)).rowcount:
+            return False
+        self.efectos.execute("UPDATE efectos SET repeticiones = repeticiones + 1 WHERE clave = ?", (clave,))
+        self.estadisticas["efectos_repetidos"] += 1
+        return True
+    
+    async def _ejecutar_tarea_especializada(self, tarea: TareaOrquestada) -> Dict[str, Any]:
+        if self.rng.random() < self.tasa_bloqueo:
+            await asyncio.Event().wait()
+        duracion = self.preparacion + self._muestrear_duracion()
+        # El efecto externo se aplica a mitad del trabajo, como una llamada a
+        # otro sistema seguida de más procesamiento
+        await asyncio.sleep(duracion / 2)
+        resultado = self._resultado(tarea)
+        await asyncio.sleep(duracion / 2)
+        return resultado
+    
+    async def _ejecutar_lote_especializado(self, tareas: List[TareaOrquestada]) -> List[Any]:
+        if self.rng.random() < self.tasa_bloqueo:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.preparacion + sum(self._muestrear_duracion() for _ in tareas))
+        resultados = []
+        for tarea in tareas:
+            try:
+                resultados.append(self._resultado(tarea))
+            except RuntimeError as e:
+                resultados.append(e)
+        return resultados
+
+class RuedaTemporizadores:
+    """
+    Rueda de temporizadores (hashed timing wheel) para los reintentos.
+    
+    Cada temporizador cae en la ranura de su tic de vencimiento módulo el
+    número de ranuras; programar y cancelar son O(1) y cada tic solo revisa
+    su ranura (las entradas de vueltas posteriores se quedan donde están).
+    """
+    
+    def __init__(self, resolucion: float = 0.01, ranuras: int = 512):
+        self.resolucion = resolucion
+        self.ranuras: List[Dict[int, tuple]] = [{} for _ in range(ranuras)]
+        self.origen = time.monotonic()
+        self.tic = 0
+        self.pendientes = 0
+        self._secuencia = itertools.count()
+    
+    def programar(self, retardo: float, callback: Callable, *args) -> Tuple[int, int]:
+        """Programa callback(*args) dentro de retardo segundos; devuelve el manejador para cancelar"""
+        objetivo = max(self.tic + 1, math.ceil((time.monotonic() - self.origen + retardo) / self.resolucion))
+        ranura = objetivo % len(self.ranuras)
+        entrada = next(self._secuencia)
+        self.ranuras[ranura][entrada] = (objetivo, callback, args)
+        self.pendientes += 1
+        return ranura, entrada
+    
+    def cancelar(self, manejador: Tuple[int, int]) -> bool:
+        ranura, entrada = manejador
+        if self.ranuras[ranura].pop(entrada, None) is None:
+            return False
+        self.pendientes -= 1
+        return True
+    
+    def avanzar(self) -> int:
+        """Dispara los temporizadores vencidos hasta el tic actual; devuelve cuántos"""
+        actual = int((time.monotonic() - self.origen) / self.resolucion)
+        vencidos = []
+        # Si se han saltado más tics que ranuras basta con recorrer cada ranura una vez
+        for tic in range(self.tic + 1, min(actual, self.tic + len(self.ranuras)) + 1):
+            ranura = self.ranuras[tic % len(self.ranuras)]
+            for entrada, (objetivo, callback, args) in list(ranura.items()):
+                if objetivo <= actual:
+                    del ranura[entrada]
+                    vencidos.append((objetivo, entrada, callback, args))
+        self.tic = max(self.tic, actual)
+        self.pendientes -= len(vencidos)
+        for _, _, callback, args in sorted(vencidos, key=lambda v: v[:2]):
+            callback(*args)
+        return len(vencidos)
+
+class DiarioTareas:
+    """
+    Diario de escritura anticipada (write-ahead) de las tareas del orquestador.
+    
+    Cada registro guarda la tarea completa tal como quedó tras una transición,
+    así que reproducir el diario consiste en quedarse con el último registro
+    de cada tarea. Las escrituras se agrupan: mientras un lote hace commit
+    (fsync) en un hilo aparte, los registros nuevos se acumulan para el
+    siguiente, y un solo fsync confirma muchas tareas. Cada compactar_cada
+    registros escritos, el mismo hilo de volcado compacta el diario para que
+    no crezca con todas las transiciones de un proceso de larga duración.
+    """
+    
+    def __init__(self, ruta: str, max_lote: int = 512, espera_lote_ms: float = 0.0,
+                 compactar_cada: int = 10000):
+        self.ruta = ruta
+        self.max_lote = max_lote
+        self.espera_lote = espera_lote_ms / 1000
+        self.compactar_cada = compactar_cada
+        self._desde_compactacion = 0
+        # Solo la escribe el hilo del volcado en curso, nunca dos a la vez
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = FULL")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS diario_tareas (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tarea_id TEXT NOT NULL,
+                evento TEXT NOT NULL,
+                tarea TEXT NOT NULL,
+                instante REAL NOT NULL
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_diario_tarea ON diario_tareas(tarea_id, seq)")
+        self.conn.commit()
+        self._pendientes: List[Tuple[tuple, Optional[asyncio.Future]]] = []
+        self._volcado: Optional[asyncio.Task] = None
+        self.estadisticas = {"registros": 0, "lotes": 0, "errores": 0, "compactaciones": 0, "compactados": 0}
+    
+    def registrar(self, evento: str, tarea: TareaOrquestada,
+                  confirmar: bool = False) -> Optional[asyncio.Future]:
+        """
+        Añade una transición al siguiente lote. Con confirmar=True devuelve un
+        future que se resuelve cuando el lote está en disco.
+        """
+        futuro = asyncio.get_running_loop().create_future() if confirmar else None
+        self._pendientes.append(((tarea.id, evento, tarea.a_json(), time.time()), futuro))
+        if self._volcado is None or self._volcado.done():
+            self._volcado = asyncio.create_task(self._volcar())
+        return futuro
+    
+    async def _volcar(self):
+        """Escribe los registros pendientes lote a lote hasta vaciar el búfer"""
+        while self._pendientes:
+            if self.espera_lote and len(self._pendientes) < self.max_lote:
+                await asyncio.sleep(self.espera_lote)
+            lote = self._pendientes[:self.max_lote]
+            del self._pendientes[:self.max_lote]
+            try:
+                await asyncio.to_thread(self._escribir, [fila for fila, _ in lote])
+            except Exception as e:
+                self.estadisticas["errores"] += 1
+                logger.error(f"Error escribiendo el diario de tareas: {e}")
+                for _, futuro in lote:
+                    if futuro is not None and not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            self.estadisticas["registros"] += len(lote)
+            self.estadisticas["lotes"] += 1
+            for _, futuro in lote:
+                if futuro is not None and not futuro.done():
+                    futuro.set_result(None)
+    
+            self._desde_compactacion += len(lote)
+            if self.compactar_cada and self._desde_compactacion >= self.compactar_cada:
+                # Entre lotes: nunca coincide con una escritura del diario
+                self._desde_compactacion = 0
+                try:
+                    await asyncio.to_thread(self.compactar)
+                except Exception as e:
+                    logger.error(f"Error compactando el diario de tareas: {e}")
+    
+    def _escribir(self, filas: List[tuple]):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO diario_tareas (tarea_id, evento, tarea, instante) VALUES (?, ?, ?, ?)",
+                filas
+            )
+    
+    def reproducir(self) -> List[TareaOrquestada]:
+        """Estado más reciente de cada tarea, en orden de creación"""
+        filas = self.conn.execute('''
+            SELECT tarea FROM diario_tareas
+            WHERE seq IN (SELECT MAX(seq) FROM diario_tareas GROUP BY tarea_id)
+        ''').fetchall()
+        tareas = [TareaOrquestada.desde_json(fila[0]) for fila in filas]
+        tareas.sort(key=lambda t: t.tiempo_creacion)
+        return tareas
+    
+    def compactar(self) -> int:
+        """Elimina los registros que ya no son el último de su tarea"""
+        with self.conn:
+            cursor = self.conn.execute('''
+                DELETE FROM diario_tareas
+                WHERE seq NOT IN (SELECT MAX(seq) FROM diario_tareas GROUP BY tarea_id)
+            ''')
+        self.estadisticas["compactaciones"] += 1
+        self.estadisticas["compactados"] += cursor.rowcount
+        return cursor.rowcount
+    
+    async def cerrar(self):
+        """Espera a que se vacíe el búfer y cierra la conexión"""
+        while self._volcado is not None and not self._volcado.done():
+            await self._volcado
+        self.conn.close()
+
+class AlmacenIdempotencia:
+    """
+    Claves de idempotencia -> tarea. Las tareas en curso no caducan (sus
+    duplicados se adjuntan a ellas); las completadas se conservan ttl
+    segundos. Las entradas se mantienen en orden de alta o de finalización,
+    así que las caducadas y, por encima de max_entradas, las más antiguas
+    se descartan por el principio en O(1).
+    """
+    
+    def __init__(self, ttl_segundos: float = 600.0, max_entradas: int = 100_000):
+        self.ttl = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, Tuple[TareaOrquestada, Optional[float]]]" = OrderedDict()
+        self.estadisticas = {"en_curso_adjuntadas": 0, "resultados_reutilizados": 0, "caducadas": 0, "descartadas": 0}
+    
+    def buscar(self, clave: str) -> Optional[TareaOrquestada]:
+        """Tarea registrada con esa clave (en curso o completada y vigente)"""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        tarea, caduca = entrada
+        if caduca is not None and caduca <= time.monotonic():
+            del self._entradas[clave]
+            self.estadisticas["caducadas"] += 1
+            return None
+        self.estadisticas["resultados_reutilizados" if caduca is not None else "en_curso_adjuntadas"] += 1
+        return tarea
+    
+    def registrar(self, clave: str, tarea: TareaOrquestada):
+        """Alta de una tarea en curso"""
+        self._entradas[clave] = (tarea, None)
+        self._entradas.move_to_end(clave)
+        self._recortar()
+    
+    def completar(self, clave: str, tarea: TareaOrquestada, ttl: Optional[float] = None):
+        """Memoriza el resultado de una tarea completada durante ttl segundos"""
+        self._entradas[clave] = (tarea, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entradas.move_to_end(clave)
+        self._recortar()
+    
+    def olvidar(self, clave: str, tarea: TareaOrquestada):
+        """Retira la clave (tarea fallida o cancelada: el cliente puede reenviarla)"""
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] is tarea:
+            del self._entradas[clave]
+    
+    def _recortar(self):
+        ahora = time.monotonic()
+        while self._entradas:
+            _, (_, caduca) = next(iter(self._entradas.items()))
+            if caduca is not None and caduca <= ahora:
+                self.estadisticas["caducadas"] += 1
+            elif len(self._entradas) > self.max_entradas:
+                self.estadisticas["descartadas"] += 1
+            else:
+                break
+            self._entradas.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+# Límites de envío por defecto: (tareas por segundo, ráfaga) por usuario según
+# su rol y para el conjunto de cada rol; "*" = resto de roles, None = sin límite
+LIMITES_ENVIO_USUARIO_POR_ROL = {"admin_sistema": None, "estudiante": (1, 10), "*": (5, 50)}
+LIMITES_ENVIO_ROL = {"admin_sistema": None, "estudiante": (200, 1000), "*": (50, 200)}
+
+class LimiteEnviosExcedido(PermissionError):
+    """Envío rechazado por el limitador; reintentar_en indica cuándo habrá token"""
+    
+    def __init__(self, mensaje: str, reintentar_en: float):
+        super().__init__(mensaje)
+        self.reintentar_en = reintentar_en
+
+class CuboTokens:
+    """Cubo de tokens con recarga perezosa (se calcula al consultarlo): O(1)"""
+    
+    __slots__ = ("tasa", "capacidad", "tokens", "instante")
+    
+    def __init__(self, tasa: float, capacidad: float):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = capacidad
+        self.instante = time.monotonic()
+    
+    def espera(self, ahora: float) -> float:
+        """Segundos hasta que haya un token (0 si ya lo hay)"""
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.instante) * self.tasa)
+        self.instante = ahora
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.tasa
+
+class LimitadorEnvios:
+    """
+    Límites de envío con cubos de tokens: uno por usuario (con la tasa y
+    la ráfaga de su rol) y uno compartido por cada rol. Un envío necesita
+    token en ambos y solo los consume si los hay en ambos. Los límites son
+    (tokens por segundo, ráfaga) por rol, "*" para los roles no listados y
+    None para no limitar. Los cubos de usuario se guardan en orden de uso
+    y, por encima de max_usuarios, se descartan los más antiguos (que a
+    esas alturas están llenos o casi).
+    """
+    
+    def __init__(self, limites_usuario: Dict[str, Optional[Tuple[float, float]]],
+                 limites_rol: Dict[str, Optional[Tuple[float, float]]], max_usuarios: int = 100_000):
+        self.limites_usuario = limites_usuario
+        self.limites_rol = limites_rol
+        self.max_usuarios = max_usuarios
+        self._cubos_usuario: "OrderedDict[str, CuboTokens]" = OrderedDict()
+        self._cubos_rol: Dict[str, CuboTokens] = {}
+        self.estadisticas = {"admitidos": 0, "rechazados_por_usuario": 0, "rechazados_por_rol": 0}
+        self.rechazos_por_rol: Dict[str, int] = {}
+        self.ultimos_rechazos: deque = deque(maxlen=20)
+    
+    @staticmethod
+    def _limite(limites: Dict[str, Optional[Tuple[float, float]]], rol: str) -> Optional[Tuple[float, float]]:
+        return limites[rol] if rol in limites else limites.get("*")
+    
+    def _cubo_usuario(self, usuario: str, rol: str) -> Optional[CuboTokens]:
+        cubo = self._cubos_usuario.get(usuario)
+        if cubo is not None:
+            self._cubos_usuario.move_to_end(usuario)
+            return cubo
+        limite = self._limite(self.limites_usuario, rol)
+        if limite is None:
+            return None
+        cubo = self._cubos_usuario[usuario] = CuboTokens(*limite)
+        if len(self._cubos_usuario) > self.max_usuarios:
+            self._cubos_usuario.popitem(last=False)
+        return cubo
+    
+    def _cubo_rol(self, rol: str) -> Optional[CuboTokens]:
+        cubo = self._cubos_rol.get(rol)
+        if cubo is None:
+            limite = self._limite(self.limites_rol, rol)
+            if limite is None:
+                return None
+            cubo = self._cubos_rol[rol] = CuboTokens(*limite)
+        return cubo
+    
+    def admitir(self, usuario: str, rol: str) -> float:
+        """Consume un token de usuario y de rol; si falta alguno, devuelve los segundos de espera"""
+        ahora = time.monotonic()
+        cubo_usuario = self._cubo_usuario(usuario, rol)
+        cubo_rol = self._cubo_rol(rol)
+        espera_usuario = cubo_usuario.espera(ahora) if cubo_usuario is not None else 0.0
+        espera_rol = cubo_rol.espera(ahora) if cubo_rol is not None else 0.0
+        if espera_usuario or espera_rol:
+            self.estadisticas["rechazados_por_usuario" if espera_usuario else "rechazados_por_rol"] += 1
+            self.rechazos_por_rol[rol] = self.rechazos_por_rol.get(rol, 0) + 1
+            self.ultimos_rechazos.append({"usuario": usuario, "rol": rol, "instante": datetime.now().isoformat()})
+            return max(espera_usuario, espera_rol)
+        if cubo_usuario is not None:
+            cubo_usuario.tokens -= 1
+        if cubo_rol is not None:
+            cubo_rol.tokens -= 1
+        self.estadisticas["admitidos"] += 1
+        return 0.0
+    
+    def resumen(self) -> Dict[str, Any]:
+        ahora = time.monotonic()
+        return {
+            **self.estadisticas,
+            "usuarios_con_cubo": len(self._cubos_usuario),
+            "tokens_por_rol": {rol: round(min(c.capacidad, c.tokens + (ahora - c.instante) * c.tasa), 1)
+                               for rol, c in self._cubos_rol.items()},
+            "rechazos_por_rol": dict(self.rechazos_por_rol),
+            "ultimos_rechazos": list(self.ultimos_rechazos)[-5:]
+        }
+
+class Disyuntor:
+    """
+    Circuit breaker sobre las últimas `ventana` llamadas de un agente o de
+    un tipo de agente.
+    
+    - cerrado: deja pasar todo; con al menos minimo_llamadas en la ventana
+      se abre si la fracción de errores llega a umbral_error o la de
+      llamadas lentas (más de latencia_lenta segundos) a umbral_lentas.
+    - abierto: no admite llamadas durante espera_apertura segundos.
+    - semiabierto: admite hasta `pruebas` llamadas; con sus resultados se
+      cierra si la fracción de errores queda por debajo de umbral_error y,
+      si no, vuelve a abrirse.
+    
+    Los contadores de la ventana se actualizan al entrar y salir cada
+    llamada, así que admitir y registrar son O(1).
+    """
+    
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+    
+    def __init__(self, nombre: str, ventana: int = 100, minimo_llamadas: int = 50,
+                 umbral_error: float = 0.5, latencia_lenta: float = 10.0, umbral_lentas: float = 0.8,
+                 espera_apertura: float = 5.0, pruebas: int = 10):
+        self.nombre = nombre
+        self.minimo_llamadas = minimo_llamadas
+        self.umbral_error = umbral_error
+        self.latencia_lenta = latencia_lenta
+        self.umbral_lentas = umbral_lentas
+        self.espera_apertura = espera_apertura
+        self.pruebas = pruebas
+        self._estado = self.CERRADO
+        self._ventana: deque = deque(maxlen=ventana)  # (error, lenta) por llamada
+        self._errores = 0
+        self._lentas = 0
+        self._abierto_hasta = 0.0
+        self._pruebas_en_curso = 0
+        self._pruebas_resueltas = 0
+        self._pruebas_fallidas = 0
+        self.estadisticas = {"aperturas": 0, "rechazos": 0}
+    
+    @property
+    def estado(self) -> str:
+        """Estado actual; un circuito abierto pasa a semiabierto al acabar la espera"""
+        if self._estado == self.ABIERTO and time.monotonic() >= self._abierto_hasta:
+            self._estado = self.SEMIABIERTO
+            self._pruebas_en_curso = 0
+            self._pruebas_resueltas = 0
+            self._pruebas_fallidas = 0
+        return self._estado
+    
+    def restante_abierto(self) -> float:
+        return max(0.0, self._abierto_hasta - time.monotonic())
+    
+    def admite_llamada(self) -> bool:
+        estado = self.estado
+        if estado == self.CERRADO:
+            return True
+        return estado == self.SEMIABIERTO and self._pruebas_en_curso + self._pruebas_resueltas < self.pruebas
+    
+    def iniciar_llamada(self):
+        """Una llamada admitida arranca (en semiabierto ocupa una prueba)"""
+        if self.estado == self.SEMIABIERTO:
+            self._pruebas_en_curso += 1
+    
+    def abandonar_llamada(self):
+        """Una llamada iniciada no llegó a terminar (cancelada o robada por otro agente)"""
+        if self._estado == self.SEMIABIERTO and self._pruebas_en_curso:
+            self._pruebas_en_curso -= 1
+    
+    def registrar(self, exito: bool, latencia: Optional[float] = None):
+        """Resultado de una llamada: mueve la ventana y, si procede, abre o cierra"""
+        lenta = latencia is not None and latencia > self.latencia_lenta
+        estado = self.estado
+        if estado == self.ABIERTO:
+            return  # Llamadas que empezaron antes de abrir: ya no cuentan
+        if estado == self.SEMIABIERTO:
+            self._pruebas_en_curso = max(0, self._pruebas_en_curso - 1)
+            self._pruebas_resueltas += 1
+            self._pruebas_fallidas += not exito or lenta
+            if self._pruebas_fallidas >= self.umbral_error * self.pruebas:
+                self._abrir()
+            elif self._pruebas_resueltas >= self.pruebas:
+                self._reiniciar(self.CERRADO)
+                logger.info(f"Circuito cerrado: {self.nombre}")
+            return
+        
+        if len(self._ventana) == self._ventana.maxlen:
+            error_saliente, lenta_saliente = self._ventana[0]
+            self._errores -= error_saliente
+            self._lentas -= lenta_saliente
+        self._ventana.append((not exito, lenta))
+        self._errores += not exito
+        self._lentas += lenta
+        llamadas = len(self._ventana)
+        if llamadas >= self.minimo_llamadas and (self._errores / llamadas >= self.umbral_error
+                                                  or self._lentas / llamadas >= self.umbral_lentas):
+            self._abrir()
+    
+    def _abrir(self):
+        self._reiniciar(self.ABIERTO)
+        self._abierto_hasta = time.monotonic() + self.espera_apertura
+        self.estadisticas["aperturas"] += 1
+        logger.warning(f"Circuito abierto: {self.nombre} durante {self.espera_apertura}s")
+    
+    def _reiniciar(self, estado: str):
+        self._estado = estado
+        self._ventana.clear()
+        self._errores = 0
+        self._lentas = 0
+    
+    def resumen(self) -> Dict[str, Any]:
+        llamadas = len(self._ventana)
+        return {
+            "estado": self.estado,
+            "llamadas_en_ventana": llamadas,
+            "tasa_error": round(self._errores / llamadas, 3) if llamadas else 0.0,
+            "tasa_lentas": round(self._lentas / llamadas, 3) if llamadas else 0.0,
+            "reabre_en_s": round(self.restante_abierto(), 2) if self._estado == self.ABIERTO else None,
+            **self.estadisticas
+        }
+
+class ControladorAutoescalado:
+    """
+    Política de autoescalado de un tipo de agente. En cada evaluación estima
+    los agentes necesarios por la ley de Little (llegadas por segundo por
+    tiempo de servicio, más lo necesario para drenar la cola dentro del
+    SLO, a la utilización objetivo). Sube en cuanto hace falta; baja solo
+    tras periodos_bajada evaluaciones seguidas con el p95 de espera por
+    debajo de margen_bajada * SLO y pasado el enfriamiento desde el último
+    cambio (histéresis: sin oscilar alrededor del umbral).
+    """
+    
+    def __init__(self, tipo: TipoAgente, fabrica: Callable[[str], AgenteEspecializado],
+                 minimo: int = 1, maximo: int = 10, slo_espera_p95: float = 0.5,
+                 utilizacion_objetivo: float = 0.7, margen_bajada: float = 0.5,
+                 periodos_bajada: int = 3, enfriamiento: float = 5.0):
+        if not 0 < minimo <= maximo:
+            raise ValueError(f"Límites de autoescalado no válidos: {minimo}-{maximo}")
+        self.tipo = tipo
+        self.fabrica = fabrica
+        self.minimo = minimo
+        self.maximo = maximo
+        self.slo_espera_p95 = slo_espera_p95
+        self.utilizacion_objetivo = utilizacion_objetivo
+        self.margen_bajada = margen_bajada
+        self.periodos_bajada = periodos_bajada
+        self.enfriamiento = enfriamiento
+        self.creados = 0
+        self._periodos_en_calma = 0
+        self._ultimo_cambio = -math.inf
+        self.ultima_senal: Dict[str, Any] = {}
+    
+    def decidir(self, actuales: int, profundidad: int, llegadas_por_segundo: float,
+                espera_p95: float, tiempo_servicio: Optional[float], ahora: float) -> Tuple[int, str]:
+        """Devuelve (agentes deseados, motivo) a partir de las señales del último periodo"""
+        if tiempo_servicio:
+            carga = (llegadas_por_segundo * tiempo_servicio
+                     + profundidad * tiempo_servicio / self.slo_espera_p95)
+            necesarios = math.ceil(carga / self.utilizacion_objetivo)
+        else:
+            # Sin tiempos medidos todavía: solo la cola indica que faltan agentes
+            necesarios = actuales + 1 if profundidad else actuales
+        self.ultima_senal = {
+            "profundidad_cola": profundidad,
+            "llegadas_por_segundo": round(llegadas_por_segundo, 1),
+            "espera_p95_ms": round(espera_p95 * 1000, 1),
+            "tiempo_servicio_ms": round(tiempo_servicio * 1000, 1) if tiempo_servicio else None,
+            "agentes_necesarios": necesarios
+        }
+        
+        objetivo, motivo = actuales, ""
+        if necesarios > actuales or (espera_p95 > self.slo_espera_p95 and profundidad):
+            self._periodos_en_calma = 0
+            objetivo = max(necesarios, actuales + 1)
+            motivo = "espera p95 por encima del SLO" if espera_p95 > self.slo_espera_p95 else "carga estimada"
+        elif espera_p95 < self.margen_bajada * self.slo_espera_p95 and necesarios < actuales:
+            self._periodos_en_calma += 1
+            if (self._periodos_en_calma >= self.periodos_bajada
+                    and ahora - self._ultimo_cambio >= self.enfriamiento):
+                # Bajada gradual: como mucho una cuarta parte por evaluación
+                objetivo = max(necesarios, actuales - max(1, actuales // 4))
+                motivo = "capacidad ociosa"
+        else:
+            self._periodos_en_calma = 0
+        
+        objetivo = min(self.maximo, max(self.minimo, objetivo))
+        if objetivo != actuales:
+            self._ultimo_cambio = ahora
+            self._periodos_en_calma = 0
+        return objetivo, motivo
+
 class OrquestadorCentral:
     """Orquestador central que coordina todos los agentes"""
     
-    def __init__(self, gestor_seguridad: GestorSeguridad):
+    def __init__(self, gestor_seguridad: GestorSeguridad, ruta_diario: Optional[str] = None):
         self.agentes: Dict[str, AgenteEspecializado] = {}
         self.cola_tareas: List[TareaOrquestada] = []
         self.tareas_activas: Dict[str, TareaOrquestada] = {}
@@ -379,8 +1186,88 @@ class OrquestadorCentral:
             "tareas_totales": 0,
             "tareas_exitosas": 0,
             "tareas_fallidas": 0,
+            "tareas_canceladas": 0,
+            "timeouts": 0,
+            "reintentos": 0,
+            "tareas_recuperadas": 0,
+            "duplicados_evitados": 0,
+            "lotes_ejecutados": 0,
+            "tareas_en_lotes": 0,
+            "robos_de_trabajo": 0,
+            "aparcadas_por_disyuntor": 0,
+            "rechazadas_por_disyuntor": 0,
+            "descartadas_por_fecha_limite": 0,
             "tiempo_promedio_cola": 0.0
         }
+        
+        # Tareas con fecha límite ya terminadas: a tiempo, tarde (con su
+        # retraso) o sin completar (fallidas, incluidas las descartadas)
+        self.estadisticas_fecha_limite = {"terminadas": 0, "a_tiempo": 0, "tarde": 0,
+                                          "no_completadas": 0, "descartadas": 0}
+        self._retrasos: deque = deque(maxlen=1000)
+        # Duración media de ejecución por tipo (media móvil) para prever si llega a tiempo
+        self._duracion_por_tipo: Dict[TipoAgente, float] = {}
+        
+        # Ejecuciones en curso (para poder cancelarlas) y reintentos en espera en la rueda
+        self._ejecuciones: Dict[str, asyncio.Task] = {}
+        self.rueda_reintentos = RuedaTemporizadores(self.configuracion["resolucion_rueda_segundos"])
+        self.reintentos_programados: Dict[str, Tuple[TareaOrquestada, Tuple[int, int]]] = {}
+        self._bucle_rueda: Optional[asyncio.Task] = None
+        
+        # Idempotencia: envíos repetidos devuelven la tarea original; quien
+        # quiera el resultado lo espera con esperar_tarea()
+        self.idempotencia = AlmacenIdempotencia(
+            self.configuracion["idempotencia_ttl_segundos"],
+            self.configuracion["idempotencia_max_entradas"]
+        )
+        self._esperas: Dict[str, List[asyncio.Future]] = {}
+        
+        # Revisión diferida de la cola cuando un lote incompleto espera a llenarse
+        self._revision_cola: Optional[asyncio.TimerHandle] = None
+        
+        # Deque local de cada agente (solo con configuracion["colas_por_agente"])
+        self.colas_agente: Dict[str, deque] = {}
+        
+        # Disyuntores por agente y por tipo, tareas aparcadas con el circuito de
+        # su tipo abierto y tareas activas por tipo (para los mamparos)
+        self.disyuntores_agente: Dict[str, Disyuntor] = {}
+        self.disyuntores_tipo: Dict[TipoAgente, Disyuntor] = {}
+        self.tareas_aparcadas: Dict[TipoAgente, List[TareaOrquestada]] = {}
+        self._desaparcado: Dict[TipoAgente, asyncio.TimerHandle] = {}
+        self.activas_por_tipo: Dict[TipoAgente, int] = {}
+        
+        # Límites de envío por usuario y por rol
+        self.limitador = LimitadorEnvios(
+            self.configuracion["limite_envios_usuario_por_rol"],
+            self.configuracion["limite_envios_rol"]
+        )
+        
+        # Cola justa (WFQ auto-sincronizado): etiqueta de finalización virtual
+        # de cada tarea en cola, última etiqueta por (prioridad, usuario) y
+        # tiempo virtual de cada nivel de prioridad
+        self._etiquetas_cola: Dict[str, float] = {}
+        self._ultima_etiqueta: Dict[Tuple[NivelPrioridad, str], float] = {}
+        self._tiempo_virtual: Dict[NivelPrioridad, float] = {}
+        self._poda_etiquetas = 10_000
+        
+        # Autoescalado por tipo: señales acumuladas entre evaluaciones y decisiones tomadas
+        self.autoescalado: Dict[TipoAgente, ControladorAutoescalado] = {}
+        self.decisiones_escalado: deque = deque(maxlen=100)
+        self._llegadas_por_tipo: Dict[TipoAgente, int] = {}
+        self._esperas_por_tipo: Dict[TipoAgente, List[float]] = {}
+        self._ultima_evaluacion_escalado = time.monotonic()
+        self._bucle_autoescalado: Optional[asyncio.Task] = None
+        
+        # Modo durable: el diario se reproduce al arrancar para reconstruir colas e historial
+        self.diario: Optional[DiarioTareas] = None
+        if ruta_diario:
+            self.diario = DiarioTareas(
+                ruta_diario,
+                max_lote=self.configuracion["diario_max_lote"],
+                espera_lote_ms=self.configuracion["diario_espera_lote_ms"],
+                compactar_cada=self.configuracion["diario_compactar_cada"]
+            )
+            self._recuperar_del_diario()
     
     def _cargar_configuracion(self) -> Dict[str, Any]:
         """Carga configuración del sistema"""
@@ -388,14 +1275,282 @@ class OrquestadorCentral:
             "max_tareas_por_agente": 5,
             "timeout_tarea_segundos": 300,
             "reintento_automatico": True,
+            # Espera antes del reintento n: min(maximo, base * 2^(n-1)) con jitter del 50-100%
+            "backoff_base_segundos": 0.5,
+            "backoff_maximo_segundos": 30.0,
+            "resolucion_rueda_segundos": 0.01,
+            "diario_max_lote": 512,
+            "diario_espera_lote_ms": 0.0,
+            # Registros escritos entre compactaciones del diario (0: solo al arrancar)
+            "diario_compactar_cada": 10000,
+            # Sin clave explícita la tarea no se deduplica salvo que se active esta
+            # opción (la clave pasa a ser el hash de tipo, agente y datos de entrada).
+            # En cualquier caso las claves son por usuario: nadie recibe la tarea de otro
+            "idempotencia_por_contenido": False,
+            "idempotencia_ttl_segundos": 600,
+            "idempotencia_max_entradas": 100_000,
+            # Agentes con procesar_lote: tareas del mismo tipo por llamada y
+            # espera máxima (desde la creación de la más antigua) para llenar el lote
+            "lote_max_tareas": 32,
+            "lote_espera_max_ms": 20,
+            # Colas por agente: cada agente consume su deque (hasta
+            # max_tareas_por_agente tareas) por la cabeza y, al vaciarla, roba por
+            # el final de la deque más larga de otro agente del mismo tipo
+            "colas_por_agente": False,
+            "robo_de_trabajo": True,
+            "autoescalado_intervalo_segundos": 1.0,
+            # Disyuntores por agente y por tipo (ver Disyuntor). Con el del tipo
+            # abierto sus tareas se aparcan hasta la fase semiabierta ("aparcar")
+            # o fallan al momento sin gastar intentos ("rechazar")
+            "disyuntores_activos": True,
+            "disyuntor_ventana": 100,
+            "disyuntor_minimo_llamadas": 50,
+            "disyuntor_umbral_error": 0.5,
+            "disyuntor_latencia_lenta_segundos": 10.0,
+            "disyuntor_umbral_lentas": 0.8,
+            "disyuntor_espera_apertura_segundos": 5.0,
+            "disyuntor_pruebas_semiabierto": 10,
+            "disyuntor_abierto": "aparcar",
+            # Mamparos: máximo de tareas activas por tipo, p. ej. {"financiero": 4} (sin entrada, sin límite)
+            "mamparos_por_tipo": {},
+            # Límites de envío con token: (tareas por segundo, ráfaga) por usuario
+            # según su rol y para el conjunto de cada rol; "*" = resto de roles, None = sin límite
+            "limites_envio_activos": True,
+            "limite_envios_usuario_por_rol": dict(LIMITES_ENVIO_USUARIO_POR_ROL),
+            "limite_envios_rol": dict(LIMITES_ENVIO_ROL),
+            # Cola ordenada por prioridad y, dentro de cada nivel, reparto justo
+            # entre usuarios (pesos por rol; 1 si no figura)
+            "cola_justa": True,
+            "pesos_cola_por_rol": {},
+            # Política por tipo: "edf" (fecha límite más temprana primero) o, sin
+            # entrada, "prioridad" (el orden de la cola)
+            "politica_por_tipo": {},
+            # Descartar las tareas que ya no pueden terminar antes de su fecha límite
+            "descartar_fechas_inalcanzables": True,
             "notificaciones_activas": True,
             "modo_debug": True
         }
     
+    def _recuperar_del_diario(self):
+        """
+        Reconstruye cola e historial a partir del diario. Las tareas que
+        estaban asignadas o en ejecución al caer el proceso vuelven a la cola
+        (ejecución al menos una vez); las terminadas no se repiten y siguen
+        satisfaciendo dependencias.
+        """
+        ahora = datetime.now()
+        for tarea in self.diario.reproducir():
+            if tarea.estado in (EstadoTarea.COMPLETADA, EstadoTarea.FALLIDA, EstadoTarea.CANCELADA):
+                self.historial_tareas.append(tarea)
+                if tarea.clave_idempotencia and tarea.estado == EstadoTarea.COMPLETADA:
+                    restante = self.idempotencia.ttl - (ahora - tarea.tiempo_completado).total_seconds()
+                    if restante > 0:
+                        self.idempotencia.completar(self._clave_almacen(tarea), tarea, restante)
+                continue
+            if tarea.clave_idempotencia:
+                self.idempotencia.registrar(self._clave_almacen(tarea), tarea)
+            if tarea.estado != EstadoTarea.PENDIENTE:
+                tarea.anotar("reanudada_tras_caida", True)
+            tarea.estado = EstadoTarea.PENDIENTE
+            tarea.agente_asignado = None
+            self._encolar(tarea)
+            self.metricas_sistema["tareas_recuperadas"] += 1
+        eliminados = self.diario.compactar()
+        logger.info(f"Diario reproducido: {len(self.cola_tareas)} tareas pendientes, "
+                    f"{len(self.historial_tareas)} terminadas ({eliminados} registros compactados)")
+    
+    def _clave_idempotencia(self, tarea: TareaOrquestada) -> Optional[str]:
+        if tarea.clave_idempotencia:
+            return tarea.clave_idempotencia
+        if self.configuracion.get("idempotencia_por_contenido", False):
+            return tarea.calcular_clave_idempotencia()
+        return None
+    
+    @staticmethod
+    def _clave_almacen(tarea: TareaOrquestada) -> str:
+        """Clave en el almacén: la del cliente dentro del ámbito del usuario que envió la tarea"""
+        ambito = tarea.metadatos.get("ambito_idempotencia", "") if tarea.metadatos else ""
+        return f"{ambito}\x1f{tarea.clave_idempotencia}"
+    
+    def _tarea_terminada(self, tarea: TareaOrquestada):
+        """Memoriza el resultado (si se completó) y despierta a quien lo espera"""
+        self._etiquetas_cola.pop(tarea.id, None)
+        if tarea.fecha_limite is not None and tarea.estado != EstadoTarea.CANCELADA:
+            self._contar_fecha_limite(tarea)
+        if tarea.clave_idempotencia:
+            if tarea.estado == EstadoTarea.COMPLETADA:
+                self.idempotencia.completar(self._clave_almacen(tarea), tarea)
+            else:
+                self.idempotencia.olvidar(self._clave_almacen(tarea), tarea)
+        for futuro in self._esperas.pop(tarea.id, ()):
+            if not futuro.done():
+                futuro.set_result(tarea.resultado)
+    
+    def _contar_fecha_limite(self, tarea: TareaOrquestada):
+        estadisticas = self.estadisticas_fecha_limite
+        estadisticas["terminadas"] += 1
+        if tarea.estado != EstadoTarea.COMPLETADA:
+            estadisticas["no_completadas"] += 1
+            return
+        retraso = (tarea.tiempo_completado - tarea.fecha_limite).total_seconds()
+        if retraso <= 0:
+            estadisticas["a_tiempo"] += 1
+        else:
+            estadisticas["tarde"] += 1
+            self._retrasos.append(retraso)
+    
+    def resumen_fechas_limite(self) -> Dict[str, Any]:
+        """Tasa de incumplimiento (tarde o sin completar) y retraso de las que acabaron tarde"""
+        estadisticas = self.estadisticas_fecha_limite
+        retrasos = sorted(self._retrasos)
+        incumplidas = estadisticas["tarde"] + estadisticas["no_completadas"]
+        return {
+            **estadisticas,
+            "tasa_incumplimiento": round(incumplidas / estadisticas["terminadas"], 4)
+                                   if estadisticas["terminadas"] else None,
+            "retraso_medio_ms": round(1000 * sum(retrasos) / len(retrasos), 1) if retrasos else None,
+            "retraso_p95_ms": round(1000 * _percentil(retrasos, 95), 1) if retrasos else None,
+            "retraso_maximo_ms": round(1000 * retrasos[-1], 1) if retrasos else None
+        }
+    
+    async def esperar_tarea(self, tarea_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Espera el resultado de una tarea. Sirve también para los duplicados:
+        enviar_tarea les devuelve el id de la original en curso.
+        """
+        terminada = next((t for t in reversed(self.historial_tareas) if t.id == tarea_id), None)
+        if terminada is not None:
+            return terminada.resultado
+        if not (tarea_id in self.tareas_activas or tarea_id in self.reintentos_programados
+                or any(t.id == tarea_id for t in itertools.chain(self.cola_tareas, *self.tareas_aparcadas.values()))):
+            return {"success": False, "error": f"Tarea desconocida: {tarea_id}"}
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperas.setdefault(tarea_id, []).append(futuro)
+        return await asyncio.wait_for(futuro, timeout)
+    
+    def _anotar_en_diario(self, evento: str, tarea: TareaOrquestada):
+        """Registra una transición en el diario (si el modo durable está activo)"""
+        if self.diario is not None:
+            self.diario.registrar(evento, tarea)
+    
+    async def cerrar(self):
+        """Detiene el autoescalado y vacía el diario pendiente antes de terminar"""
+        if self._bucle_autoescalado is not None:
+            self._bucle_autoescalado.cancel()
+        if self.diario is not None:
+            await self.diario.cerrar()
+    
     def registrar_agente(self, agente: AgenteEspecializado):
         """Registra un nuevo agente en el sistema"""
         self.agentes[agente.id] = agente
+        self.colas_agente[agente.id] = deque()
+        self.disyuntores_agente[agente.id] = self._nuevo_disyuntor(agente.nombre)
         logger.info(f"Agente registrado: {agente.nombre} ({agente.tipo.value})")
+        
+        # El agente nuevo puede atender lo que ya espera (p. ej. tareas recuperadas del diario)
+        if self.cola_tareas:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            asyncio.create_task(self._procesar_cola())
+    
+    def retirar_agente(self, agente_id: str) -> bool:
+        """Da de baja un agente libre y sin tareas en su deque; False si está trabajando"""
+        agente = self.agentes.get(agente_id)
+        if agente is None or agente.estado != "disponible" or self.colas_agente[agente_id]:
+            return False
+        del self.agentes[agente_id]
+        del self.colas_agente[agente_id]
+        del self.disyuntores_agente[agente_id]
+        logger.info(f"Agente retirado: {agente.nombre} ({agente.tipo.value})")
+        return True
+    
+    def configurar_autoescalado(self, tipo: TipoAgente, fabrica: Callable[[str], AgenteEspecializado],
+                                minimo: int = 1, maximo: int = 10, slo_espera_p95: float = 0.5,
+                                **parametros) -> ControladorAutoescalado:
+        """
+        Activa el autoescalado de un tipo: fabrica(nombre) crea cada agente
+        nuevo. Se crean al momento los que falten hasta el mínimo.
+        """
+        controlador = ControladorAutoescalado(tipo, fabrica, minimo, maximo, slo_espera_p95, **parametros)
+        self.autoescalado[tipo] = controlador
+        actuales = sum(1 for a in self.agentes.values() if a.tipo == tipo)
+        for _ in range(minimo - actuales):
+            self._crear_agente_autoescalado(controlador)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return controlador  # El bucle de control arrancará con la primera tarea
+        self._asegurar_autoescalado()
+        return controlador
+    
+    def _asegurar_autoescalado(self):
+        if self._bucle_autoescalado is None or self._bucle_autoescalado.done():
+            self._ultima_evaluacion_escalado = time.monotonic()
+            self._bucle_autoescalado = asyncio.create_task(self._ejecutar_autoescalado())
+    
+    async def _ejecutar_autoescalado(self):
+        """Bucle de control: evalúa cada autoescalado_intervalo_segundos"""
+        while self.autoescalado:
+            await asyncio.sleep(self.configuracion["autoescalado_intervalo_segundos"])
+            self.evaluar_autoescalado()
+    
+    def _crear_agente_autoescalado(self, controlador: ControladorAutoescalado):
+        controlador.creados += 1
+        self.registrar_agente(controlador.fabrica(f"{controlador.tipo.value}-auto-{controlador.creados}"))
+    
+    def evaluar_autoescalado(self):
+        """
+        Una iteración del bucle de control: para cada tipo con autoescalado
+        mide profundidad de cola, llegadas por segundo, p95 de espera (de
+        las tareas asignadas en el periodo o, si es mayor, la antigüedad de
+        la más vieja aún en cola) y tiempo medio de servicio, y crea o
+        retira agentes según la decisión del controlador.
+        """
+        ahora = time.monotonic()
+        periodo = max(1e-6, ahora - self._ultima_evaluacion_escalado)
+        self._ultima_evaluacion_escalado = ahora
+        
+        profundidad: Dict[TipoAgente, int] = {}
+        mas_antigua: Dict[TipoAgente, datetime] = {}
+        for tarea in itertools.chain(self.cola_tareas, *self.colas_agente.values()):
+            tipo = tarea.agente_requerido
+            profundidad[tipo] = profundidad.get(tipo, 0) + 1
+            if tipo not in mas_antigua or tarea.tiempo_creacion < mas_antigua[tipo]:
+                mas_antigua[tipo] = tarea.tiempo_creacion
+        instante = datetime.now()
+        
+        for tipo, controlador in self.autoescalado.items():
+            agentes_tipo = [a for a in self.agentes.values() if a.tipo == tipo]
+            esperas = sorted(self._esperas_por_tipo.pop(tipo, ()))
+            espera_p95 = _percentil(esperas, 95)
+            if tipo in mas_antigua:
+                espera_p95 = max(espera_p95, (instante - mas_antigua[tipo]).total_seconds())
+            medidos = [a.estadisticas["tiempo_promedio_respuesta"] for a in agentes_tipo
+                       if a.estadisticas["tareas_completadas"]]
+            objetivo, motivo = controlador.decidir(
+                len(agentes_tipo), profundidad.get(tipo, 0),
+                self._llegadas_por_tipo.pop(tipo, 0) / periodo, espera_p95,
+                sum(medidos) / len(medidos) if medidos else None, ahora
+            )
+            
+            if objetivo > len(agentes_tipo):
+                for _ in range(objetivo - len(agentes_tipo)):
+                    self._crear_agente_autoescalado(controlador)
+            elif objetivo < len(agentes_tipo):
+                # Solo se retiran agentes libres; el resto se reintenta en la siguiente evaluación
+                retirados = 0
+                for agente in agentes_tipo:
+                    if retirados == len(agentes_tipo) - objetivo:
+                        break
+                    retirados += self.retirar_agente(agente.id)
+                objetivo = len(agentes_tipo) - retirados
+            if objetivo != len(agentes_tipo):
+                decision = {"instante": instante.isoformat(timespec="milliseconds"), "tipo": tipo.value,
+                            "de": len(agentes_tipo), "a": objetivo, "motivo": motivo}
+                self.decisiones_escalado.append(dict(decision, senales=controlador.ultima_senal))
+                logger.info(f"Autoescalado {tipo.value}: {decision['de']} -> {objetivo} agentes ({motivo})")
     
     async def enviar_tarea(self, tarea: TareaOrquestada, token_usuario: str = None) -> str:
         """Envía una nueva tarea al sistema"""
@@ -414,14 +1569,57 @@ class OrquestadorCentral:
                 )
                 raise PermissionError("Sin permisos para esta acción")
             
+            # Límite de envíos del usuario y de su rol
+            if self.configuracion["limites_envio_activos"]:
+                espera = self.limitador.admitir(payload["usuario"], payload["rol"])
+                if espera:
+                    self.gestor_seguridad.registrar_auditoria(
+                        payload["usuario"], accion_requerida, tarea.id, "LIMITADO"
+                    )
+                    raise LimiteEnviosExcedido(
+                        f"Límite de envíos excedido para {payload['usuario']} ({payload['rol']})", espera
+                    )
+            
             # Registrar en auditoría
             self.gestor_seguridad.registrar_auditoria(
                 payload["usuario"], accion_requerida, tarea.id, "AUTORIZADO"
             )
         
+        # Un duplicado (misma clave del mismo usuario) no se ejecuta otra vez:
+        # se devuelve la tarea original, en curso o completada dentro del TTL
+        clave = self._clave_idempotencia(tarea)
+        if clave is not None:
+            tarea.clave_idempotencia = clave
+            if token_usuario:
+                tarea.anotar("ambito_idempotencia", payload["usuario"])
+            clave = self._clave_almacen(tarea)
+            existente = self.idempotencia.buscar(clave)
+            if existente is not None:
+                tarea.anotar("duplicado_de", existente.id)
+                self.metricas_sistema["duplicados_evitados"] += 1
+                logger.info(f"Tarea duplicada: {tarea.id} -> {existente.id} ({existente.estado.value})")
+                return existente.id
+            self.idempotencia.registrar(clave, tarea)
+        
+        # En modo durable la tarea solo se acepta cuando su registro está en disco
+        if self.diario is not None:
+            try:
+                await self.diario.registrar("encolada", tarea, confirmar=True)
+            except Exception:
+                if clave is not None:
+                    self.idempotencia.olvidar(clave, tarea)
+                raise
+        
         # Añadir a la cola
-        self.cola_tareas.append(tarea)
+        if token_usuario:
+            self._encolar(tarea, payload["usuario"], payload["rol"])
+        else:
+            self._encolar(tarea)
         self.metricas_sistema["tareas_totales"] += 1
+        if self.autoescalado:
+            tipo = tarea.agente_requerido
+            self._llegadas_por_tipo[tipo] = self._llegadas_por_tipo.get(tipo, 0) + 1
+            self._asegurar_autoescalado()
         
         logger.info(f"Tarea enviada: {tarea.id} - {tarea.tipo}")
         
@@ -430,34 +1628,397 @@ class OrquestadorCentral:
         
         return tarea.id
     
+    def _encolar(self, tarea: TareaOrquestada, usuario: str = "sistema", rol: Optional[str] = None):
+        """
+        Añade la tarea a la cola. Con cola_justa la inserta en orden de
+        prioridad y, dentro del nivel, de su etiqueta de finalización
+        virtual, que conserva en los reintentos.
+        """
+        if not self.configuracion["cola_justa"]:
+            self.cola_tareas.append(tarea)
+            return
+        if tarea.id not in self._etiquetas_cola:
+            self._etiquetar(tarea, usuario, rol)
+        # Búsqueda binaria a mano: bisect solo acepta key= desde Python 3.10
+        clave = self._clave_cola(tarea)
+        inferior, superior = 0, len(self.cola_tareas)
+        while inferior < superior:
+            medio = (inferior + superior) // 2
+            if clave < self._clave_cola(self.cola_tareas[medio]):
+                superior = medio
+            else:
+                inferior = medio + 1
+        self.cola_tareas.insert(inferior, tarea)
+    
+    def _clave_cola(self, tarea: TareaOrquestada) -> Tuple[int, float]:
+        return -tarea.prioridad.value, self._etiquetas_cola.get(tarea.id, 0.0)
+    
+    def _etiquetar(self, tarea: TareaOrquestada, usuario: str, rol: Optional[str]):
+        """
+        Etiqueta WFQ: la tarea "termina" 1/peso después de la anterior del
+        mismo usuario en su nivel, o del tiempo virtual del nivel si el
+        usuario no tenía nada pendiente. Quien envía mucho acumula etiquetas
+        lejanas y los demás se intercalan por delante.
+        """
+        nivel = tarea.prioridad
+        peso = self.configuracion["pesos_cola_por_rol"].get(rol, 1.0)
+        virtual = self._tiempo_virtual.get(nivel, 0.0)
+        etiqueta = max(virtual, self._ultima_etiqueta.get((nivel, usuario), 0.0)) + 1.0 / peso
+        self._ultima_etiqueta[(nivel, usuario)] = etiqueta
+        self._etiquetas_cola[tarea.id] = etiqueta
+        
+        # Las etiquetas ya alcanzadas por el tiempo virtual equivalen a no tener
+        # ninguna: se podan cuando se acumulan (coste amortizado O(1))
+        if len(self._ultima_etiqueta) > self._poda_etiquetas:
+            self._ultima_etiqueta = {
+                clave: valor for clave, valor in self._ultima_etiqueta.items()
+                if valor > self._tiempo_virtual.get(clave[0], 0.0)
+            }
+            self._poda_etiquetas = max(10_000, 2 * len(self._ultima_etiqueta))
+    
     async def _procesar_cola(self):
         """Procesa la cola de tareas asignando a agentes disponibles"""
-        while self.cola_tareas:
-            tarea = self.cola_tareas.pop(0)
+        # Cada tarea se examina como mucho una vez por pasada: si todas esperan
+        # dependencias, la pasada termina en lugar de girar sin fin
+        # Las que no se asignan conservan su orden: vuelven a la cabeza, por delante
+        # de las no examinadas
+        pendientes, self.cola_tareas = self.cola_tareas, []
+        devueltas: List[TareaOrquestada] = []
+        siguiente = len(pendientes)
+        # Las tareas listas para agentes que procesan por lotes se agrupan por
+        # (agente, tipo); lo que no entra en un lote va después a los agentes
+        # del tipo sin procesar_lote (ver _despachar_lotes)
+        tipos_con_lotes = {a.tipo for a in self.agentes.values() if a.admite_lotes}
+        candidatas_lote: Dict[Tuple[TipoAgente, str], List[TareaOrquestada]] = {}
+        # Un tipo sin agente libre (o con el mamparo lleno) no detiene la pasada
+        # para los demás tipos: solo se deja de mirar la cola cuando no queda
+        # ningún tipo con capacidad
+        tipos_con_agentes = {a.tipo for a in self.agentes.values()}
+        tipos_saturados = set()
+        # Los tipos con política EDF reúnen sus tareas listas y se reparten al final
+        politicas = self.configuracion["politica_por_tipo"]
+        tipos_edf = {tipo for tipo in tipos_con_agentes if politicas.get(tipo.value) == "edf"}
+        candidatas_edf: Dict[TipoAgente, List[TareaOrquestada]] = {}
+        descartar = self.configuracion["descartar_fechas_inalcanzables"]
+        ahora = datetime.now()
+        for indice, tarea in enumerate(pendientes):
+            tipo = tarea.agente_requerido
+            
+            # Fecha límite ya vencida: no tiene sentido ejecutarla
+            if descartar and tarea.fecha_limite is not None and tarea.fecha_limite <= ahora:
+                self._descartar_por_fecha_limite(tarea)
+                continue
             
             # Verificar dependencias
-            if not self._dependencias_completadas(tarea):
-                # Reencolar al final
-                self.cola_tareas.append(tarea)
+            if not self._dependencias_completadas(tarea) or tipo in tipos_saturados:
+                devueltas.append(tarea)
+                continue
+            
+            # Circuito del tipo abierto: se aparca o se rechaza sin llegar a ningún agente
+            if not self._disyuntor_tipo(tipo).admite_llamada():
+                self._retener_por_disyuntor(tarea)
+                continue
+            
+            if tipo in tipos_edf:
+                candidatas_edf.setdefault(tipo, []).append(tarea)
                 continue
             
-            # Buscar agente disponible
-            agente_disponible = self._encontrar_agente_disponible(tarea.agente_requerido)
+            if tipo in tipos_con_lotes:
+                candidatas_lote.setdefault((tipo, tarea.tipo), []).append(tarea)
+                continue
+            
+            if self._hueco_mamparo(tipo) == 0:
+                agente_disponible = None
+            elif self.configuracion["colas_por_agente"]:
+                agente_disponible = self._elegir_cola_local(tipo)
+                if agente_disponible is not None:
+                    self._asignar(agente_disponible, tarea, reservar=False)
+                    self.colas_agente[agente_disponible.id].append(tarea)
+                    self._iniciar_siguiente(agente_disponible)
+                    continue
+            else:
+                # Buscar agente disponible
+                agente_disponible = self._encontrar_agente_disponible(tipo)
             
             if agente_disponible:
                 # Asignar tarea
-                tarea.estado = EstadoTarea.ASIGNADA
-                tarea.agente_asignado = agente_disponible.id
-                tarea.tiempo_asignacion = datetime.now()
-                
-                self.tareas_activas[tarea.id] = tarea
+                self._asignar(agente_disponible, tarea)
                 
                 # Procesar de forma asíncrona
-                asyncio.create_task(self._ejecutar_tarea(agente_disponible, tarea))
+                self._ejecuciones[tarea.id] = asyncio.create_task(
+                    self._ejecutar_tarea(agente_disponible, tarea)
+                )
             else:
-                # No hay agentes disponibles, reencolar
-                self.cola_tareas.append(tarea)
+                # No hay agentes disponibles para este tipo, reencolar
+                devueltas.append(tarea)
+                tipos_saturados.add(tipo)
+                if tipos_saturados >= tipos_con_agentes:
+                    siguiente = indice + 1
+                    break
+        # Lo encolado durante la pasada (reintentos inmediatos, p. ej.) entra en su sitio
+        encoladas_durante, self.cola_tareas = self.cola_tareas, devueltas + pendientes[siguiente:]
+        for tarea in encoladas_durante:
+            self._encolar(tarea)
+        
+        for tipo, tareas in candidatas_edf.items():
+            self._despachar_edf(tipo, tareas)
+        for tareas in candidatas_lote.values():
+            self._despachar_lotes(tareas)
+    
+    def _despachar_edf(self, tipo: TipoAgente, tareas: List[TareaOrquestada]):
+        """
+        Política EDF: las tareas listas del tipo se asignan por fecha límite
+        más temprana (las que no tienen, al final y en su orden). Antes de
+        asignarlas se estima cuándo terminaría cada una con la duración media
+        del tipo y el trabajo que tiene por delante (activas y las de plazo
+        anterior); si no llega, se descarta ya en lugar de ocupar un agente
+        para acabar tarde y retrasar a las siguientes. Estas tareas no pasan
+        por las colas por agente ni por los lotes, que las reordenarían.
+        """
+        tareas.sort(key=lambda t: t.fecha_limite or datetime.max)
+        descartar = self.configuracion["descartar_fechas_inalcanzables"]
+        agentes = sum(1 for a in self.agentes.values() if a.tipo == tipo)
+        duracion = self._duracion_por_tipo.get(tipo, 0.0)
+        por_delante = self.activas_por_tipo.get(tipo, 0)
+        ahora = datetime.now()
+        for tarea in tareas:
+            if descartar and tarea.fecha_limite is not None:
+                fin_estimado = ahora + timedelta(seconds=(por_delante // agentes + 1) * duracion)
+                if fin_estimado > tarea.fecha_limite:
+                    self._descartar_por_fecha_limite(tarea)
+                    continue
+            por_delante += 1
+            agente = self._encontrar_agente_disponible(tipo) if self._hueco_mamparo(tipo) != 0 else None
+            if agente is None:
+                self._encolar(tarea)
+                continue
+            self._asignar(agente, tarea)
+            self._ejecuciones[tarea.id] = asyncio.create_task(self._ejecutar_tarea(agente, tarea))
+    
+    def _descartar_por_fecha_limite(self, tarea: TareaOrquestada):
+        """Da por fallida, sin ejecutarla, una tarea que no puede cumplir su fecha límite"""
+        tarea.estado = EstadoTarea.FALLIDA
+        tarea.resultado = {"success": False, "error": "Fecha límite inalcanzable"}
+        tarea.tiempo_completado = datetime.now()
+        self.historial_tareas.append(tarea)
+        self._anotar_en_diario("fallida", tarea)
+        self.estadisticas_fecha_limite["descartadas"] += 1
+        self._tarea_terminada(tarea)
+        self.metricas_sistema["tareas_fallidas"] += 1
+        self.metricas_sistema["descartadas_por_fecha_limite"] += 1
+        logger.warning(f"Tarea descartada por fecha límite: {tarea.id}")
+    
+    def _asignar(self, agente: AgenteEspecializado, tarea: TareaOrquestada, reservar: bool = True):
+        """Marca la tarea como asignada al agente y (salvo reservar=False) reserva el agente"""
+        tarea.estado = EstadoTarea.ASIGNADA
+        tarea.agente_asignado = agente.id
+        tarea.tiempo_asignacion = datetime.now()
+        etiqueta = self._etiquetas_cola.get(tarea.id)
+        if etiqueta is not None and etiqueta > self._tiempo_virtual.get(tarea.prioridad, 0.0):
+            self._tiempo_virtual[tarea.prioridad] = etiqueta
+        if tarea.agente_requerido in self.autoescalado:
+            self._esperas_por_tipo.setdefault(tarea.agente_requerido, []).append(
+                (tarea.tiempo_asignacion - tarea.tiempo_creacion).total_seconds()
+            )
+        # Reservado desde la asignación: si esperase a que la corrutina
+        # arranque, una sola pasada repartiría toda la cola al mismo agente
+        if reservar:
+            agente.estado = "ocupado"
+        
+        self.tareas_activas[tarea.id] = tarea
+        self.activas_por_tipo[tarea.agente_requerido] = self.activas_por_tipo.get(tarea.agente_requerido, 0) + 1
+        self.disyuntores_agente[agente.id].iniciar_llamada()
+        self._disyuntor_tipo(tarea.agente_requerido).iniciar_llamada()
+        self._anotar_en_diario("asignada", tarea)
+    
+    def _liberar_activa(self, tarea: TareaOrquestada):
+        """Saca la tarea de las activas y libera su plaza en el mamparo del tipo"""
+        del self.tareas_activas[tarea.id]
+        self.activas_por_tipo[tarea.agente_requerido] -= 1
+    
+    def _hueco_mamparo(self, tipo: TipoAgente) -> Optional[int]:
+        """Plazas libres en el mamparo del tipo (None si no tiene límite)"""
+        limite = self.configuracion["mamparos_por_tipo"].get(tipo.value)
+        if limite is None:
+            return None
+        return max(0, limite - self.activas_por_tipo.get(tipo, 0))
+    
+    def _nuevo_disyuntor(self, nombre: str) -> Disyuntor:
+        return Disyuntor(
+            nombre,
+            ventana=self.configuracion["disyuntor_ventana"],
+            minimo_llamadas=self.configuracion["disyuntor_minimo_llamadas"],
+            umbral_error=self.configuracion["disyuntor_umbral_error"],
+            latencia_lenta=self.configuracion["disyuntor_latencia_lenta_segundos"],
+            umbral_lentas=self.configuracion["disyuntor_umbral_lentas"],
+            espera_apertura=self.configuracion["disyuntor_espera_apertura_segundos"],
+            pruebas=self.configuracion["disyuntor_pruebas_semiabierto"]
+        )
+    
+    def _disyuntor_tipo(self, tipo: TipoAgente) -> Disyuntor:
+        disyuntor = self.disyuntores_tipo.get(tipo)
+        if disyuntor is None:
+            disyuntor = self.disyuntores_tipo[tipo] = self._nuevo_disyuntor(f"tipo {tipo.value}")
+        return disyuntor
+    
+    def _registrar_en_disyuntores(self, agente: AgenteEspecializado, tarea: TareaOrquestada,
+                                  exito: bool, latencia: Optional[float]):
+        """Anota el resultado en el disyuntor del agente y en el de su tipo"""
+        if not self.configuracion["disyuntores_activos"]:
+            return
+        disyuntor = self.disyuntores_agente.get(agente.id)
+        if disyuntor is not None:
+            disyuntor.registrar(exito, latencia)
+        self._disyuntor_tipo(tarea.agente_requerido).registrar(exito, latencia)
+        self._programar_desaparcado(tarea.agente_requerido)
+    
+    def _abandonar_en_disyuntores(self, tarea: TareaOrquestada):
+        disyuntor = self.disyuntores_agente.get(tarea.agente_asignado)
+        if disyuntor is not None:
+            disyuntor.abandonar_llamada()
+        self._disyuntor_tipo(tarea.agente_requerido).abandonar_llamada()
+    
+    def _retener_por_disyuntor(self, tarea: TareaOrquestada):
+        """Tarea de un tipo con el circuito abierto: falla al momento o queda aparcada"""
+        tipo = tarea.agente_requerido
+        self._disyuntor_tipo(tipo).estadisticas["rechazos"] += 1
+        if self.configuracion["disyuntor_abierto"] == "rechazar":
+            tarea.estado = EstadoTarea.FALLIDA
+            tarea.resultado = {"success": False, "error": f"Circuito abierto para {tipo.value}"}
+            tarea.tiempo_completado = datetime.now()
+            self.historial_tareas.append(tarea)
+            self._anotar_en_diario("fallida", tarea)
+            self._tarea_terminada(tarea)
+            self.metricas_sistema["tareas_fallidas"] += 1
+            self.metricas_sistema["rechazadas_por_disyuntor"] += 1
+            return
+        self.tareas_aparcadas.setdefault(tipo, []).append(tarea)
+        self.metricas_sistema["aparcadas_por_disyuntor"] += 1
+        self._programar_desaparcado(tipo)
+    
+    def _programar_desaparcado(self, tipo: TipoAgente):
+        """
+        Las aparcadas vuelven a la cola en cuanto el circuito admite llamadas;
+        si está abierto, cuando acabe la espera (pasa a semiabierto)
+        """
+        if not self.tareas_aparcadas.get(tipo):
+            return
+        disyuntor = self._disyuntor_tipo(tipo)
+        if disyuntor.admite_llamada():
+            self._desaparcar(tipo)
+        elif disyuntor.estado == Disyuntor.ABIERTO and tipo not in self._desaparcado:
+            self._desaparcado[tipo] = asyncio.get_running_loop().call_later(
+                disyuntor.restante_abierto(), self._desaparcar, tipo
+            )
+    
+    def _desaparcar(self, tipo: TipoAgente):
+        manejador = self._desaparcado.pop(tipo, None)
+        if manejador is not None:
+            manejador.cancel()
+        aparcadas = self.tareas_aparcadas.pop(tipo, None)
+        if aparcadas:
+            # Vuelven por delante y en su orden (o a su sitio en la cola justa): llevan más tiempo esperando
+            if self.configuracion["cola_justa"]:
+                for tarea in aparcadas:
+                    self._encolar(tarea)
+            else:
+                self.cola_tareas[:0] = aparcadas
+            asyncio.create_task(self._procesar_cola())
+    
+    def _despachar_lotes(self, tareas: List[TareaOrquestada]):
+        """
+        Reparte tareas listas del mismo tipo en lotes de hasta lote_max_tareas.
+        Un lote incompleto espera a llenarse mientras su tarea más antigua no
+        supere lote_espera_max_ms. Las tareas que no entran en un lote (no
+        hay agente de lotes libre o el lote está esperando) van una a una a
+        los agentes libres del tipo sin procesar_lote, que de otro modo se
+        quedarían ociosos; lo que tampoco cabe ahí vuelve a la cola.
+        """
+        espera = self.configuracion["lote_espera_max_ms"] / 1000
+        while tareas:
+            maximo = self.configuracion["lote_max_tareas"]
+            hueco = self._hueco_mamparo(tareas[0].agente_requerido)
+            if hueco is not None:
+                if hueco == 0:
+                    break
+                maximo = min(maximo, hueco)
+            lote = tareas[:maximo]
+            if len(lote) < maximo:
+                restante = espera - (datetime.now() - lote[0].tiempo_creacion).total_seconds()
+                if restante > 0:
+                    self._revisar_cola_en(restante)
+                    break
+            agente = self._encontrar_agente_disponible(lote[0].agente_requerido, lotes=True)
+            if agente is None:
                 break
+            del tareas[:maximo]
+            for tarea in lote:
+                self._asignar(agente, tarea)
+            ejecucion = asyncio.create_task(self._ejecutar_lote(agente, lote))
+            for tarea in lote:
+                self._ejecuciones[tarea.id] = ejecucion
+        for tarea in tareas:
+            tipo = tarea.agente_requerido
+            agente = self._encontrar_agente_disponible(tipo, lotes=False) if self._hueco_mamparo(tipo) != 0 else None
+            if agente is None:
+                self._encolar(tarea)
+                continue
+            self._asignar(agente, tarea)
+            self._ejecuciones[tarea.id] = asyncio.create_task(self._ejecutar_tarea(agente, tarea))
+    
+    def _elegir_cola_local(self, tipo_requerido: TipoAgente) -> Optional[AgenteEspecializado]:
+        """Agente del tipo con menos trabajo (en curso más encolado) y hueco en su deque"""
+        maximo = self.configuracion["max_tareas_por_agente"]
+        candidatos = [
+            a for a in self.agentes.values()
+            if a.tipo == tipo_requerido and len(self.colas_agente[a.id]) < maximo
+            and self.disyuntores_agente[a.id].admite_llamada()
+        ]
+        if not candidatos:
+            return None
+        return min(candidatos, key=lambda a: len(self.colas_agente[a.id]) + (a.estado == "ocupado"))
+    
+    def _iniciar_siguiente(self, agente: AgenteEspecializado):
+        """
+        Si el agente está libre, arranca la cabeza de su deque; si está vacía
+        roba la última tarea de la deque más larga de su tipo (la que más
+        tardaría en empezar allí).
+        """
+        if agente.estado != "disponible":
+            return
+        cola = self.colas_agente[agente.id]
+        if cola:
+            tarea = cola.popleft()
+        elif self.configuracion["robo_de_trabajo"]:
+            victima = max(
+                (a for a in self.agentes.values() if a.tipo == agente.tipo and a is not agente),
+                key=lambda a: len(self.colas_agente[a.id]),
+                default=None
+            )
+            if victima is None or not self.colas_agente[victima.id]:
+                return
+            tarea = self.colas_agente[victima.id].pop()
+            self.disyuntores_agente[victima.id].abandonar_llamada()
+            self.disyuntores_agente[agente.id].iniciar_llamada()
+            tarea.agente_asignado = agente.id
+            self.metricas_sistema["robos_de_trabajo"] += 1
+        else:
+            return
+        agente.estado = "ocupado"
+        self._ejecuciones[tarea.id] = asyncio.create_task(self._ejecutar_tarea(agente, tarea))
+    
+    def _revisar_cola_en(self, retardo: float):
+        """Programa una pasada de la cola (una sola pendiente, la más próxima)"""
+        bucle = asyncio.get_running_loop()
+        if self._revision_cola is not None and self._revision_cola.when() <= bucle.time() + retardo:
+            return
+        if self._revision_cola is not None:
+            self._revision_cola.cancel()
+        self._revision_cola = bucle.call_later(retardo, self._revisar_cola)
+    
+    def _revisar_cola(self):
+        self._revision_cola = None
+        asyncio.create_task(self._procesar_cola())
     
     def _dependencias_completadas(self, tarea: TareaOrquestada) -> bool:
         """Verifica si las dependencias de una tarea están completadas"""
@@ -471,11 +2032,16 @@ class OrquestadorCentral:
                 return False
         return True
     
-    def _encontrar_agente_disponible(self, tipo_requerido: TipoAgente) -> Optional[AgenteEspecializado]:
-        """Encuentra un agente disponible del tipo requerido"""
+    def _encontrar_agente_disponible(self, tipo_requerido: TipoAgente,
+                                     lotes: Optional[bool] = None) -> Optional[AgenteEspecializado]:
+        """
+        Encuentra un agente disponible del tipo requerido cuyo disyuntor admita
+        llamadas: con procesar_lote si lotes=True, sin él si lotes=False
+        """
         agentes_tipo = [
             a for a in self.agentes.values()
-            if a.tipo == tipo_requerido and a.estado == "disponible"
+            if a.tipo == tipo_requerido and a.estado == "disponible" and (lotes is None or a.admite_lotes == lotes)
+            and self.disyuntores_agente[a.id].admite_llamada()
         ]
         
         if not agentes_tipo:
@@ -485,53 +2051,207 @@ class OrquestadorCentral:
         return min(agentes_tipo, key=lambda a: len(a.tareas_en_proceso))
     
     async def _ejecutar_tarea(self, agente: AgenteEspecializado, tarea: TareaOrquestada):
-        """Ejecuta una tarea en un agente específico"""
+        """Ejecuta una tarea en un agente específico, con plazo máximo (asyncio.wait_for)"""
+        timeout = tarea.timeout_segundos or self.configuracion["timeout_tarea_segundos"]
+        inicio = time.monotonic()
         try:
             tarea.estado = EstadoTarea.EN_PROCESO
             agente.tareas_en_proceso.append(tarea.id)
             
             # Ejecutar tarea
-            resultado = await agente.procesar_tarea(tarea)
-            
-            # Completar tarea
-            tarea.resultado = resultado
-            tarea.estado = EstadoTarea.COMPLETADA
-            tarea.tiempo_completado = datetime.now()
+            resultado = await asyncio.wait_for(agente.procesar_tarea(tarea), timeout)
+            self._registrar_exito(agente, tarea, resultado, time.monotonic() - inicio)
             
-            # Limpiar referencias
+        except asyncio.CancelledError:
             agente.tareas_en_proceso.remove(tarea.id)
-            del self.tareas_activas[tarea.id]
-            self.historial_tareas.append(tarea)
-            
-            # Actualizar métricas
-            self.metricas_sistema["tareas_exitosas"] += 1
-            
-            logger.info(f"Tarea completada: {tarea.id}")
-            
+            if tarea.estado != EstadoTarea.CANCELADA:
+                raise  # Cancelación ajena (cierre del bucle): se propaga
+            # cancelar_tarea() ya la ha marcado y movido al historial
+        
         except Exception as e:
-            # Manejar fallo
-            tarea.estado = EstadoTarea.FALLIDA
-            tarea.resultado = {"success": False, "error": str(e)}
-            tarea.intentos += 1
-            
-            agente.tareas_en_proceso.remove(tarea.id)
-            
-            # Reintentar si es posible
-            if (tarea.intentos < tarea.max_intentos and 
-                self.configuracion.get("reintento_automatico", True)):
-                
-                tarea.estado = EstadoTarea.PENDIENTE
-                self.cola_tareas.append(tarea)
-                logger.warning(f"Reintentando tarea: {tarea.id} (intento {tarea.intentos})")
-            else:
-                del self.tareas_activas[tarea.id]
-                self.historial_tareas.append(tarea)
-                self.metricas_sistema["tareas_fallidas"] += 1
-                logger.error(f"Tarea fallida definitivamente: {tarea.id}")
+            # Un timeout cuenta como fallo reintentable
+            if isinstance(e, asyncio.TimeoutError):
+                self.metricas_sistema["timeouts"] += 1
+                e = TimeoutError(f"Sin respuesta del agente en {timeout}s")
+            self._registrar_fallo(agente, tarea, e, time.monotonic() - inicio)
             
+        finally:
+            self._ejecuciones.pop(tarea.id, None)
+        
+        # Con colas por agente, el agente sigue con su deque (o roba) antes de repartir más
+        if self.configuracion["colas_por_agente"]:
+            self._iniciar_siguiente(agente)
+        
         # Continuar procesando la cola
         await self._procesar_cola()
     
+    async def _ejecutar_lote(self, agente: AgenteEspecializado, lote: List[TareaOrquestada]):
+        """Entrega un lote de tareas del mismo tipo al agente en una sola llamada a procesar_lote"""
+        timeout = max(t.timeout_segundos or self.configuracion["timeout_tarea_segundos"] for t in lote)
+        for tarea in lote:
+            tarea.estado = EstadoTarea.EN_PROCESO
+            agente.tareas_en_proceso.append(tarea.id)
+        self.metricas_sistema["lotes_ejecutados"] += 1
+        self.metricas_sistema["tareas_en_lotes"] += len(lote)
+        inicio = time.monotonic()
+        try:
+            resultados = await asyncio.wait_for(agente.procesar_lote(lote), timeout)
+        
+        except asyncio.CancelledError:
+            for tarea in lote:
+                agente.tareas_en_proceso.remove(tarea.id)
+            if not any(t.estado == EstadoTarea.CANCELADA for t in lote):
+                raise
+            # Se canceló una tarea del lote: las demás vuelven a la cola sin gastar intento
+            for tarea in lote:
+                if tarea.estado != EstadoTarea.CANCELADA:
+                    self._liberar_activa(tarea)
+                    self._abandonar_en_disyuntores(tarea)
+                    tarea.estado = EstadoTarea.PENDIENTE
+                    tarea.agente_asignado = None
+                    self._encolar(tarea)
+        
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.metricas_sistema["timeouts"] += 1
+                e = TimeoutError(f"Sin respuesta del agente en {timeout}s")
+            for tarea in lote:
+                self._registrar_fallo(agente, tarea, e, time.monotonic() - inicio)
+        
+        else:
+            latencia = time.monotonic() - inicio
+            for tarea, resultado in zip(lote, resultados):
+                if isinstance(resultado, Exception):
+                    self._registrar_fallo(agente, tarea, resultado, latencia)
+                else:
+                    self._registrar_exito(agente, tarea, resultado, latencia)
+        
+        finally:
+            for tarea in lote:
+                self._ejecuciones.pop(tarea.id, None)
+        
+        await self._procesar_cola()
+    
+    def _registrar_exito(self, agente: AgenteEspecializado, tarea: TareaOrquestada, resultado: Dict[str, Any],
+                         latencia: Optional[float] = None):
+        """Completa la tarea y la pasa al historial"""
+        tarea.resultado = resultado
+        tarea.estado = EstadoTarea.COMPLETADA
+        tarea.tiempo_completado = datetime.now()
+        
+        # Limpiar referencias
+        agente.tareas_en_proceso.remove(tarea.id)
+        self._liberar_activa(tarea)
+        self._registrar_en_disyuntores(agente, tarea, True, latencia)
+        if latencia is not None:
+            previa = self._duracion_por_tipo.get(tarea.agente_requerido, latencia)
+            self._duracion_por_tipo[tarea.agente_requerido] = 0.8 * previa + 0.2 * latencia
+        self.historial_tareas.append(tarea)
+        self._anotar_en_diario("completada", tarea)
+        self._tarea_terminada(tarea)
+        
+        # Actualizar métricas
+        self.metricas_sistema["tareas_exitosas"] += 1
+        
+        logger.info(f"Tarea completada: {tarea.id}")
+    
+    def _registrar_fallo(self, agente: AgenteEspecializado, tarea: TareaOrquestada, error: Exception,
+                         latencia: Optional[float] = None):
+        """Programa el reintento o, agotados los intentos, da la tarea por fallida"""
+        tarea.estado = EstadoTarea.FALLIDA
+        tarea.resultado = {"success": False, "error": str(error)}
+        tarea.intentos += 1
+        
+        agente.tareas_en_proceso.remove(tarea.id)
+        self._liberar_activa(tarea)
+        self._registrar_en_disyuntores(agente, tarea, False, latencia)
+        
+        # Reintentar si es posible, tras una espera y no de inmediato
+        if (tarea.intentos < tarea.max_intentos and
+            self.configuracion.get("reintento_automatico", True)):
+            self._programar_reintento(tarea)
+        else:
+            tarea.tiempo_completado = datetime.now()
+            self.historial_tareas.append(tarea)
+            self._anotar_en_diario("fallida", tarea)
+            self._tarea_terminada(tarea)
+            self.metricas_sistema["tareas_fallidas"] += 1
+            logger.error(f"Tarea fallida definitivamente: {tarea.id}")
+    
+    def _programar_reintento(self, tarea: TareaOrquestada):
+        """Programa el reintento en la rueda con backoff exponencial y jitter"""
+        espera = min(self.configuracion["backoff_maximo_segundos"],
+                     self.configuracion["backoff_base_segundos"] * 2 ** (tarea.intentos - 1))
+        espera *= random.uniform(0.5, 1.0)
+        tarea.estado = EstadoTarea.PENDIENTE
+        manejador = self.rueda_reintentos.programar(espera, self._reencolar_reintento, tarea.id)
+        self.reintentos_programados[tarea.id] = (tarea, manejador)
+        self._anotar_en_diario("reintento", tarea)
+        self.metricas_sistema["reintentos"] += 1
+        logger.warning(f"Reintentando tarea: {tarea.id} (intento {tarea.intentos}) en {espera:.2f}s")
+        
+        if self._bucle_rueda is None or self._bucle_rueda.done():
+            self._bucle_rueda = asyncio.create_task(self._girar_rueda())
+    
+    async def _girar_rueda(self):
+        """Hace avanzar la rueda de reintentos mientras le queden temporizadores"""
+        while self.rueda_reintentos.pendientes:
+            await asyncio.sleep(self.rueda_reintentos.resolucion)
+            self.rueda_reintentos.avanzar()
+    
+    def _reencolar_reintento(self, tarea_id: str):
+        tarea, _ = self.reintentos_programados.pop(tarea_id)
+        self._encolar(tarea)
+        asyncio.create_task(self._procesar_cola())
+    
+    def cancelar_tarea(self, tarea_id: str, motivo: str = "Cancelada por el usuario") -> bool:
+        """
+        Cancela una tarea en cola, en espera de reintento o en ejecución (en
+        ese caso interrumpe al agente). Devuelve False si no existe o ya terminó.
+        """
+        tarea = next((t for t in self.cola_tareas if t.id == tarea_id), None)
+        aparcadas = next((lista for lista in self.tareas_aparcadas.values()
+                          if any(t.id == tarea_id for t in lista)), None)
+        if tarea is not None:
+            self.cola_tareas.remove(tarea)
+        elif aparcadas is not None:
+            tarea = next(t for t in aparcadas if t.id == tarea_id)
+            aparcadas.remove(tarea)
+        elif tarea_id in self.reintentos_programados:
+            tarea, manejador = self.reintentos_programados.pop(tarea_id)
+            self.rueda_reintentos.cancelar(manejador)
+        elif tarea_id in self.tareas_activas and tarea_id not in self._ejecuciones \
+                and self.tareas_activas[tarea_id] in self.colas_agente.get(self.tareas_activas[tarea_id].agente_asignado, ()):
+            # Aún en la deque de su agente: basta con sacarla, el agente sigue con lo suyo
+            tarea = self.tareas_activas[tarea_id]
+            self._liberar_activa(tarea)
+            self._abandonar_en_disyuntores(tarea)
+            self.colas_agente[tarea.agente_asignado].remove(tarea)
+        elif tarea_id in self.tareas_activas:
+            tarea = self.tareas_activas[tarea_id]
+            self._liberar_activa(tarea)
+            self._abandonar_en_disyuntores(tarea)
+            ejecucion = self._ejecuciones.get(tarea_id)
+            if ejecucion is not None:
+                ejecucion.cancel()
+            # Liberar al agente aunque la ejecución no hubiera llegado a arrancar
+            agente = self.agentes.get(tarea.agente_asignado)
+            if agente is not None:
+                agente.estado = "disponible"
+            asyncio.create_task(self._procesar_cola())
+        else:
+            return False
+        
+        tarea.estado = EstadoTarea.CANCELADA
+        tarea.resultado = {"success": False, "error": motivo}
+        tarea.tiempo_completado = datetime.now()
+        self.historial_tareas.append(tarea)
+        self._anotar_en_diario("cancelada", tarea)
+        self._tarea_terminada(tarea)
+        self.metricas_sistema["tareas_canceladas"] += 1
+        logger.info(f"Tarea cancelada: {tarea_id} ({motivo})")
+        return True
+    
     def obtener_estado_sistema(self) -> Dict[str, Any]:
         """Obtiene el estado completo del sistema"""
         return {
@@ -542,6 +2262,33 @@ class OrquestadorCentral:
             },
             "tareas_en_cola": len(self.cola_tareas),
             "tareas_activas": len(self.tareas_activas),
+            "tareas_esperando_reintento": len(self.reintentos_programados),
+            "tareas_aparcadas": sum(len(aparcadas) for aparcadas in self.tareas_aparcadas.values()),
+            "limitador_envios": dict(self.limitador.resumen(), activo=self.configuracion["limites_envio_activos"]),
+            "activas_por_tipo": {tipo.value: n for tipo, n in self.activas_por_tipo.items() if n},
+            "politica_por_tipo": dict(self.configuracion["politica_por_tipo"]),
+            "fechas_limite": self.resumen_fechas_limite(),
+            "disyuntores": {
+                "tipos": {tipo.value: d.resumen() for tipo, d in self.disyuntores_tipo.items()},
+                # Solo los agentes con el circuito abierto o semiabierto
+                "agentes": {self.agentes[agente_id].nombre: d.resumen()
+                            for agente_id, d in self.disyuntores_agente.items() if d.estado != Disyuntor.CERRADO}
+            },
+            "idempotencia": dict(self.idempotencia.estadisticas, claves=len(self.idempotencia)),
+            "colas_por_agente": {a.nombre: len(self.colas_agente[a.id]) for a in self.agentes.values()}
+                                if self.configuracion["colas_por_agente"] else None,
+            "tamano_medio_lote": round(self.metricas_sistema["tareas_en_lotes"]
+                                       / max(1, self.metricas_sistema["lotes_ejecutados"]), 2),
+            "diario": dict(self.diario.estadisticas, pendientes=len(self.diario._pendientes))
+                      if self.diario is not None else None,
+            "autoescalado": {
+                "tipos": {
+                    tipo.value: dict(controlador.ultima_senal, minimo=controlador.minimo, maximo=controlador.maximo,
+                                     agentes=sum(1 for a in self.agentes.values() if a.tipo == tipo))
+                    for tipo, controlador in self.autoescalado.items()
+                },
+                "decisiones_recientes": list(self.decisiones_escalado)[-10:]
+            } if self.autoescalado else None,
             "tareas_completadas": len(self.historial_tareas),
             "metricas": self.metricas_sistema,
             "timestamp": datetime.now().isoformat()
@@ -600,9 +2347,15 @@ class OrquestadorCentral:
         recomendaciones = []
         
         # Analizar cola
-        if len(self.cola_tareas) > 10:
+        if len(self.cola_tareas) > 10 and not self.autoescalado:
             recomendaciones.append("Considerar añadir más agentes - cola excesiva")
         
+        # Tipos autoescalados que ya están en su máximo
+        for tipo, controlador in self.autoescalado.items():
+            actuales = sum(1 for a in self.agentes.values() if a.tipo == tipo)
+            if actuales >= controlador.maximo and controlador.ultima_senal.get("agentes_necesarios", 0) > actuales:
+                recomendaciones.append(f"Autoescalado de {tipo.value} en su máximo - ampliar el límite")
+        
         # Analizar distribución de agentes
         tipos_agentes = {}
         for agente in self.agentes.values():
@@ -620,6 +2373,846 @@ class OrquestadorCentral:
         
         return recomendaciones
 
+def _bytes_por_objeto(fabrica: Callable[[int], Any], n: int) -> float:
+    """Memoria reservada por objeto (con sus campos) al crear n instancias"""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    objetos = [fabrica(i) for i in range(n)]
+    # La lista que los contiene no forma parte del coste de cada objeto
+    usados = tracemalloc.get_traced_memory()[0] - base - sys.getsizeof(objetos)
+    tracemalloc.stop()
+    del objetos
+    return usados / n
+
+def benchmark_memoria(instancias: int = 1_000_000) -> Dict[str, Any]:
+    """
+    Compara bytes por objeto de los modelos actuales frente a la versión
+    anterior (dataclass con __dict__, UUID en texto y contenedores vacíos
+    creados por instancia). Los campos de texto se decodifican de JSON en
+    cada instancia, como llegarían desde la API.
+    """
+    @dataclass
+    class TareaAnterior:
+        id: str = field(default_factory=lambda: str(uuid.uuid4()))
+        tipo: str = ""
+        descripcion: str = ""
+        agente_requerido: TipoAgente = TipoAgente.ACADEMICO
+        prioridad: NivelPrioridad = NivelPrioridad.NORMAL
+        estado: EstadoTarea = EstadoTarea.PENDIENTE
+        datos_entrada: Dict[str, Any] = field(default_factory=dict)
+        resultado: Optional[Dict[str, Any]] = None
+        agente_asignado: Optional[str] = None
+        tiempo_creacion: datetime = field(default_factory=datetime.now)
+        tiempo_asignacion: Optional[datetime] = None
+        tiempo_completado: Optional[datetime] = None
+        intentos: int = 0
+        max_intentos: int = 3
+        dependencias: List[str] = field(default_factory=list)
+        metadatos: Dict[str, Any] = field(default_factory=dict)
+    
+    @dataclass
+    class RegistroAnterior:
+        id: str = field(default_factory=lambda: str(uuid.uuid4()))
+        timestamp: datetime = field(default_factory=datetime.now)
+        usuario: str = ""
+        accion: str = ""
+        recurso: str = ""
+        resultado: str = ""
+        ip_origen: str = ""
+        agente_usuario: str = ""
+        datos_adicionales: Dict[str, Any] = field(default_factory=dict)
+    
+    tipos = ["matricula", "crear_usuario", "reservar_recurso", "generar_certificado"]
+    agentes = list(TipoAgente)
+    
+    def tarea(clase):
+        return lambda i: clase(
+            tipo=json.loads(f'"{tipos[i % len(tipos)]}"'),
+            descripcion="Tarea de benchmark",
+            agente_requerido=agentes[i % len(agentes)],
+            prioridad=NivelPrioridad.NORMAL
+        )
+    
+    def registro(clase):
+        return lambda i: clase(
+            usuario=json.loads('"admin"'),
+            accion=json.loads(f'"academico.{tipos[i % len(tipos)]}"'),
+            recurso="tarea",
+            resultado=json.loads('"AUTORIZADO"'),
+            ip_origen=json.loads('"desconocida"'),
+            agente_usuario=json.loads('"sistema"'),
+            datos_adicionales=None if clase is RegistroAuditoria else {}
+        )
+    
+    resultados = {"instancias": instancias, "slots": bool(_SLOTS), "modelos": {}}
+    for nombre, anterior, actual in (
+        ("TareaOrquestada", tarea(TareaAnterior), tarea(TareaOrquestada)),
+        ("RegistroAuditoria", registro(RegistroAnterior), registro(RegistroAuditoria)),
+    ):
+        antes = _bytes_por_objeto(anterior, instancias)
+        despues = _bytes_por_objeto(actual, instancias)
+        resultados["modelos"][nombre] = {
+            "antes_bytes_por_objeto": round(antes, 1),
+            "despues_bytes_por_objeto": round(despues, 1),
+            "reduccion_pct": round(100 * (1 - despues / antes), 1)
+        }
+    return resultados
+
+def _percentil(valores: List[float], p: float) -> float:
+    """Percentil por interpolación lineal sobre una lista ordenada"""
+    if not valores:
+        return 0.0
+    k = (len(valores) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (k - inferior)
+
+async def _medir_reintentos(tareas: int, agentes: int, tasa_fallo: float, tasa_bloqueo: float,
+                            duracion: float, timeout: float, backoff_base: float,
+                            tasa_llegada: float, capacidad: float, caida: Tuple[float, float],
+                            semilla: int) -> Dict[str, Any]:
+    """
+    Envía tareas a tasa_llegada por segundo contra agentes que dependen de un
+    ServicioExterno de capacidad llamadas por segundo (caído durante caida) y
+    resume throughput, intentos, latencias y llamadas al servicio.
+    """
+    random.seed(semilla)
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    orquestador.configuracion["backoff_base_segundos"] = backoff_base
+    # Sin disyuntores: abrirían el circuito en la caída y la medida sería la suya, no la del reintento
+    orquestador.configuracion["disyuntores_activos"] = False
+    servicio = ServicioExterno(max(1, int(capacidad * 0.1)), 0.1, tasa_fallo, caida)
+    for i in range(agentes):
+        orquestador.registrar_agente(AgenteSimulado(
+            TipoAgente.ACADEMICO, f"Simulado {i}", duracion=duracion,
+            tasa_bloqueo=tasa_bloqueo, semilla=semilla + i, servicio=servicio
+        ))
+    
+    inicio = time.perf_counter()
+    enviadas = []
+    for i in range(tareas):
+        # Llegadas a ritmo constante (carga abierta): los reintentos se suman a ellas
+        retraso = inicio + i / tasa_llegada - time.perf_counter()
+        if retraso > 0:
+            await asyncio.sleep(retraso)
+        tarea = TareaOrquestada(tipo="matricula", agente_requerido=TipoAgente.ACADEMICO,
+                                timeout_segundos=timeout, datos_entrada={"estudiante_id": f"2024{i:05d}"})
+        enviadas.append(tarea)
+        await orquestador.enviar_tarea(tarea)
+    while len(orquestador.historial_tareas) < tareas:
+        await asyncio.sleep(0.01)
+    duracion_total = time.perf_counter() - inicio
+    
+    completadas = [t for t in enviadas if t.estado == EstadoTarea.COMPLETADA]
+    latencias = sorted((t.tiempo_completado - t.tiempo_creacion).total_seconds() * 1000 for t in completadas)
+    metricas = orquestador.metricas_sistema
+    return {
+        "segundos": round(duracion_total, 2),
+        "completadas_por_segundo": round(len(completadas) / duracion_total, 1),
+        "completadas": len(completadas),
+        "fallidas_definitivamente": metricas["tareas_fallidas"],
+        "ejecuciones_por_tarea": round((len(completadas) + metricas["reintentos"]
+                                        + metricas["tareas_fallidas"]) / tareas, 3),
+        "reintentos": metricas["reintentos"],
+        "timeouts": metricas["timeouts"],
+        "p50_ms": round(_percentil(latencias, 50), 1),
+        "p95_ms": round(_percentil(latencias, 95), 1),
+        "p99_ms": round(_percentil(latencias, 99), 1),
+        "servicio": servicio.estadisticas
+    }
+
+def benchmark_reintentos(tareas: int = 2000, agentes: int = 8, tasa_fallo: float = 0.1,
+                         tasa_bloqueo: float = 0.01, duracion: float = 0.01,
+                         timeout: float = 0.2, backoff_base: float = 0.2,
+                         tasa_llegada: float = 300.0, capacidad: float = 400.0,
+                         caida: Tuple[float, float] = (2.0, 2.3),
+                         semilla: int = 42) -> Dict[str, Any]:
+    """
+    Compara el reintento con backoff exponencial en la rueda frente al
+    reintento en el siguiente tic (backoff_base = 0, equivalente a reencolar
+    de inmediato) con llegadas a ritmo constante contra un servicio externo
+    que falla un 10% en reposo, falla más cuanto más se supera su capacidad
+    y se cae 0,3 s; un 1% de agentes no responde y lo libera el timeout.
+    Las llamadas durante la caída y las tareas fallidas definitivamente
+    muestran lo que aporta esperar antes de reintentar.
+    """
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        parametros = dict(tareas=tareas, agentes=agentes, tasa_fallo=tasa_fallo, tasa_bloqueo=tasa_bloqueo,
+                          duracion=duracion, timeout=timeout, tasa_llegada=tasa_llegada,
+                          capacidad=capacidad, caida=caida, semilla=semilla)
+        return {
+            "parametros": dict(parametros, backoff_base=backoff_base),
+            "backoff_exponencial": asyncio.run(_medir_reintentos(backoff_base=backoff_base, **parametros)),
+            "reintento_inmediato": asyncio.run(_medir_reintentos(backoff_base=0.0, **parametros))
+        }
+    finally:
+        logger.setLevel(nivel_anterior)
+
+async def _trabajador_diario(ruta: str, tareas: int, agentes: int):
+    """
+    Proceso hijo de prueba_recuperacion: encola tareas en modo durable
+    (cada diez, una depende de la anterior) e imprime ACK por cada tarea
+    confirmada, mientras los agentes las van procesando y dejando su efecto
+    en el sistema externo simulado. El diario se compacta cada pocas tareas
+    para que la caída pueda coincidir también con una compactación.
+    """
+    orquestador = OrquestadorCentral(GestorSeguridad("prueba"), ruta_diario=ruta)
+    orquestador.diario.compactar_cada = 200
+    for i in range(agentes):
+        orquestador.registrar_agente(AgenteSimulado(TipoAgente.ACADEMICO, f"Simulado {i}", duracion=0.02,
+                                                    efectos=ruta + ".efectos"))
+    anterior = None
+    for i in range(tareas):
+        tarea = TareaOrquestada(
+            tipo="matricula", agente_requerido=TipoAgente.ACADEMICO,
+            datos_entrada={"estudiante_id": f"2024{i:05d}"},
+            dependencias=(anterior,) if anterior and i % 10 == 0 else ()
+        )
+        await orquestador.enviar_tarea(tarea)
+        print(f"ACK {tarea.id}", flush=True)
+        anterior = tarea.id
+    while len(orquestador.historial_tareas) < tareas:
+        await asyncio.sleep(0.05)
+    await orquestador.cerrar()
+
+def _estado_diario(ruta: str) -> Dict[str, Any]:
+    """
+    Lee el diario en bruto (tareas registradas y las que constan como
+    completadas) y el sistema externo de los agentes (efectos aplicados y
+    veces que una reejecución encontró su efecto ya aplicado).
+    """
+    conn = sqlite3.connect(ruta)
+    registradas = {fila[0] for fila in conn.execute("SELECT DISTINCT tarea_id FROM diario_tareas")}
+    completadas = {fila[0] for fila in conn.execute(
+        "SELECT DISTINCT tarea_id FROM diario_tareas WHERE evento = 'completada'"
+    )}
+    conn.close()
+    efectos: Dict[str, int] = {}
+    if os.path.exists(ruta + ".efectos"):
+        conn = sqlite3.connect(ruta + ".efectos")
+        efectos = dict(conn.execute("SELECT clave, repeticiones FROM efectos").fetchall())
+        conn.close()
+    return {"registradas": registradas, "completadas": completadas, "efectos": efectos}
+
+def prueba_recuperacion(tareas: int = 1000, agentes: int = 4, fraccion_muerte: float = 0.75,
+                        semilla: int = 7) -> Dict[str, Any]:
+    """
+    Mata con SIGKILL un proceso orquestador durable a mitad de ejecución
+    (con encolados y tareas en curso), lo reanuda desde el diario y
+    comprueba que ninguna tarea confirmada se pierde y que todas terminan.
+    
+    La ejecución es al menos una vez: una tarea que estaba en curso al caer
+    pudo dejar ya su efecto sin que el diario registrase que se completó, y
+    tras reanudar se ejecuta de nuevo. Lo que se comprueba es que el efecto
+    externo queda aplicado exactamente una vez por tarea, porque los agentes
+    lo aplican con tarea.clave_efectos(); "ejecuciones_repetidas" cuenta las
+    reejecuciones que encontraron su efecto ya aplicado y no lo repitieron.
+    """
+    random.seed(semilla)
+    directorio = tempfile.mkdtemp(prefix="diario_tareas_")
+    ruta = os.path.join(directorio, "diario.db")
+    hijo = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--trabajador-diario", ruta, str(tareas), str(agentes)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    confirmadas = set()
+    objetivo = int(tareas * fraccion_muerte) + random.randint(0, tareas // 20)
+    for linea in hijo.stdout:
+        if linea.startswith("ACK "):
+            confirmadas.add(linea.split()[1])
+        if len(confirmadas) >= objetivo:
+            break
+    hijo.send_signal(signal.SIGKILL)
+    hijo.wait()
+    
+    antes = _estado_diario(ruta)
+    ya_completadas = set(antes["completadas"])
+    
+    async def reanudar() -> OrquestadorCentral:
+        orquestador = OrquestadorCentral(GestorSeguridad("prueba"), ruta_diario=ruta)
+        simulados = [AgenteSimulado(TipoAgente.ACADEMICO, f"Simulado {i}", duracion=0.002, efectos=ruta + ".efectos")
+                     for i in range(agentes)]
+        for agente in simulados:
+            orquestador.registrar_agente(agente)
+        reanudadas = {t.id for t in orquestador.cola_tareas}
+        inicio = time.perf_counter()
+        while orquestador.cola_tareas or orquestador.tareas_activas:
+            if time.perf_counter() - inicio > 60:
+                raise RuntimeError("La reanudación no termina: dependencias sin resolver")
+            await asyncio.sleep(0.01)
+        await orquestador.cerrar()
+        return orquestador, simulados, reanudadas
+    
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        orquestador, simulados, reanudadas = asyncio.run(reanudar())
+    finally:
+        logger.setLevel(nivel_anterior)
+    for agente in simulados:
+        agente.efectos.close()
+    despues = _estado_diario(ruta)
+    ejecutadas_tras_reanudar = sum(a.estadisticas["tareas_completadas"] for a in simulados)
+    estados = {t.id: t.estado for t in orquestador.historial_tareas}
+    
+    perdidas = confirmadas - despues["registradas"]
+    sin_terminar = [i for i in confirmadas if estados.get(i) != EstadoTarea.COMPLETADA]
+    # Cada tarea confirmada deja su efecto (clave_efectos() es su id) y no hay
+    # efectos de tareas que el diario no conozca (la última puede no tener ACK leído)
+    sin_efecto = confirmadas - despues["efectos"].keys()
+    efectos_ajenos = despues["efectos"].keys() - despues["registradas"]
+    repetidas = ya_completadas & reanudadas
+    resultado = {
+        "confirmadas_antes_de_la_caida": len(confirmadas),
+        "registradas_en_diario": len(antes["registradas"]),
+        "completadas_antes_de_la_caida": len(ya_completadas),
+        "reanudadas": len(reanudadas),
+        "en_curso_al_caer": sum(1 for t in orquestador.historial_tareas
+                                if (t.metadatos or {}).get("reanudada_tras_caida")),
+        "ejecutadas_tras_reanudar": ejecutadas_tras_reanudar,
+        "efectos_aplicados_antes_de_la_caida": len(antes["efectos"]),
+        "ejecuciones_repetidas": sum(despues["efectos"].values()),
+        "perdidas": len(perdidas),
+        "sin_terminar": len(sin_terminar),
+        "terminadas_reencoladas": len(repetidas),
+        "sin_efecto": len(sin_efecto),
+        "efectos_sin_tarea": len(efectos_ajenos),
+        "ok": not perdidas and not sin_terminar and not repetidas and not sin_efecto and not efectos_ajenos
+              and ejecutadas_tras_reanudar == len(reanudadas)
+    }
+    for nombre in os.listdir(directorio):
+        os.remove(os.path.join(directorio, nombre))
+    os.rmdir(directorio)
+    return resultado
+
+async def _medir_encolado(tareas: int, productores: int, ruta: Optional[str], max_lote: int) -> Dict[str, Any]:
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    if ruta:
+        orquestador.diario = DiarioTareas(ruta, max_lote=max_lote)
+    
+    secuencia = itertools.count()
+    
+    async def productor(n: int):
+        for _ in range(n):
+            await orquestador.enviar_tarea(TareaOrquestada(
+                tipo="matricula", agente_requerido=TipoAgente.ACADEMICO,
+                datos_entrada={"estudiante_id": f"2024{next(secuencia):05d}"}
+            ))
+    
+    inicio = time.perf_counter()
+    await asyncio.gather(*(productor(tareas // productores + (i < tareas % productores))
+                           for i in range(productores)))
+    duracion = time.perf_counter() - inicio
+    await orquestador.cerrar()
+    resultado = {"tareas_por_segundo": round(tareas / duracion, 1), "segundos": round(duracion, 3)}
+    if orquestador.diario is not None:
+        resultado["lotes"] = orquestador.diario.estadisticas["lotes"]
+        resultado["registros_por_lote"] = round(
+            orquestador.diario.estadisticas["registros"] / max(1, orquestador.diario.estadisticas["lotes"]), 1
+        )
+    return resultado
+
+def benchmark_diario(tareas: int = 5000, productores: int = 64) -> Dict[str, Any]:
+    """
+    Throughput de encolado: en memoria, durable con un fsync por tarea
+    (lote de 1) y durable con commits agrupados. Cada enviar_tarea durable
+    espera a que su registro esté en disco.
+    """
+    directorio = tempfile.mkdtemp(prefix="diario_tareas_")
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        resultados = {"tareas": tareas, "productores": productores}
+        resultados["memoria"] = asyncio.run(_medir_encolado(tareas, productores, None, 0))
+        for nombre, max_lote in (("durable_sin_agrupar", 1), ("durable_agrupado", 512)):
+            ruta = os.path.join(directorio, f"{nombre}.db")
+            resultados[nombre] = asyncio.run(_medir_encolado(tareas, productores, ruta, max_lote))
+        return resultados
+    finally:
+        logger.setLevel(nivel_anterior)
+        for nombre in os.listdir(directorio):
+            os.remove(os.path.join(directorio, nombre))
+        os.rmdir(directorio)
+
+async def _medir_idempotencia(envios: int, duplicados: float, agentes: int, por_contenido: bool,
+                              semilla: int) -> Dict[str, Any]:
+    rng = random.Random(semilla)
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    orquestador.configuracion["idempotencia_por_contenido"] = por_contenido
+    simulados = [AgenteSimulado(TipoAgente.FINANCIERO, f"Simulado {i}", duracion=0.01, semilla=semilla + i)
+                 for i in range(agentes)]
+    for agente in simulados:
+        orquestador.registrar_agente(agente)
+    
+    # Carga en ráfagas: parte de los duplicados llegan con la original aún en
+    # cola o en ejecución y parte cuando ya terminó
+    cargas: List[Dict[str, Any]] = []
+    ids = []
+    inicio = time.perf_counter()
+    for i in range(envios):
+        if cargas and rng.random() < duplicados:
+            datos = rng.choice(cargas[-200:])
+        else:
+            datos = {"estudiante_id": f"2024{i:05d}", "importe": rng.choice((150, 300, 600)), "concepto": "matricula"}
+            cargas.append(datos)
+        ids.append(await orquestador.enviar_tarea(TareaOrquestada(
+            tipo="procesar_pago", agente_requerido=TipoAgente.FINANCIERO, datos_entrada=dict(datos)
+        )))
+        if i % 50 == 49:
+            await asyncio.sleep(0.02)
+    resultados = await asyncio.gather(*(orquestador.esperar_tarea(i) for i in ids))
+    duracion = time.perf_counter() - inicio
+    
+    ejecuciones = sum(a.estadisticas["tareas_completadas"] for a in simulados)
+    return {
+        "segundos": round(duracion, 2),
+        "ejecuciones": ejecuciones,
+        "cargas_distintas": len(cargas),
+        "envios_con_resultado": sum(1 for r in resultados if r and r.get("success")),
+        "duplicados_evitados": orquestador.metricas_sistema["duplicados_evitados"],
+        "idempotencia": orquestador.idempotencia.estadisticas
+    }
+
+def benchmark_idempotencia(envios: int = 5000, duplicados: float = 0.2, agentes: int = 8,
+                           semilla: int = 42) -> Dict[str, Any]:
+    """
+    Reproduce una carga de pagos con un 20% de reenvíos (clientes que
+    reintentan) con y sin idempotencia por contenido, y mide el trabajo
+    ahorrado: ejecuciones en los agentes y tiempo total.
+    """
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        sin = asyncio.run(_medir_idempotencia(envios, duplicados, agentes, False, semilla))
+        con = asyncio.run(_medir_idempotencia(envios, duplicados, agentes, True, semilla))
+    finally:
+        logger.setLevel(nivel_anterior)
+    return {
+        "envios": envios,
+        "fraccion_duplicados": duplicados,
+        "sin_idempotencia": sin,
+        "con_idempotencia": con,
+        "ejecuciones_ahorradas_pct": round(100 * (1 - con["ejecuciones"] / sin["ejecuciones"]), 1),
+        "tiempo_ahorrado_pct": round(100 * (1 - con["segundos"] / sin["segundos"]), 1)
+    }
+
+async def _medir_lotes(tareas: int, tasa: float, tamano: int, espera_ms: float, agentes: int,
+                       preparacion: float, duracion: float) -> Dict[str, Any]:
+    """Llegadas a ritmo constante; devuelve throughput, latencias y tamaño medio de lote"""
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    orquestador.configuracion["lote_max_tareas"] = tamano
+    orquestador.configuracion["lote_espera_max_ms"] = espera_ms
+    for i in range(agentes):
+        orquestador.registrar_agente(AgenteSimulado(
+            TipoAgente.ACADEMICO, f"Simulado {i}", duracion=duracion, preparacion=preparacion, lotes=True
+        ))
+    
+    enviadas = []
+    inicio = time.perf_counter()
+    for i in range(tareas):
+        retraso = inicio + i / tasa - time.perf_counter()
+        if retraso > 0:
+            await asyncio.sleep(retraso)
+        tarea = TareaOrquestada(tipo="calificaciones", agente_requerido=TipoAgente.ACADEMICO,
+                                datos_entrada={"matricula_id": i})
+        await orquestador.enviar_tarea(tarea)
+        enviadas.append(tarea)
+    await asyncio.gather(*(orquestador.esperar_tarea(t.id) for t in enviadas))
+    duracion_total = time.perf_counter() - inicio
+    
+    latencias = sorted((t.tiempo_completado - t.tiempo_creacion).total_seconds() * 1000 for t in enviadas)
+    return {
+        "completadas_por_segundo": round(tareas / duracion_total, 1),
+        "p50_ms": round(_percentil(latencias, 50), 1),
+        "p95_ms": round(_percentil(latencias, 95), 1),
+        "tamano_medio_lote": orquestador.obtener_estado_sistema()["tamano_medio_lote"]
+    }
+
+def benchmark_lotes(tareas: int = 1000, tamanos: Sequence[int] = (1, 4, 16, 64),
+                    tasas: Sequence[float] = (150, 1500), espera_ms: float = 20, agentes: int = 4,
+                    preparacion: float = 0.02, duracion: float = 0.0005) -> Dict[str, Any]:
+    """
+    Throughput frente a latencia según el tamaño máximo de lote, con agentes
+    cuyo coste por llamada es preparacion + n * duracion. Con tamaño 1 la
+    capacidad es agentes / (preparacion + duracion) tareas por segundo; la
+    carga baja muestra la latencia que añade esperar a llenar el lote y la
+    alta, la capacidad que se gana.
+    """
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        resultados = {
+            "parametros": {"tareas": tareas, "espera_ms": espera_ms, "agentes": agentes,
+                           "preparacion_s": preparacion, "duracion_por_tarea_s": duracion},
+        }
+        for tasa in tasas:
+            resultados[f"llegadas_{tasa:g}_por_segundo"] = {
+                f"lote_{tamano}": asyncio.run(
+                    _medir_lotes(tareas, tasa, tamano, espera_ms, agentes, preparacion, duracion)
+                )
+                for tamano in tamanos
+            }
+        return resultados
+    finally:
+        logger.setLevel(nivel_anterior)
+
+async def _medir_robo(modo: str, tareas: int, tasa: float, agentes: int,
+                      duracion: Callable[[random.Random], float], semilla: int) -> Dict[str, Any]:
+    """Llegadas a ritmo constante con duraciones de cola pesada; resume latencias"""
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    orquestador.configuracion["colas_por_agente"] = modo != "cola_global"
+    orquestador.configuracion["robo_de_trabajo"] = modo == "colas_por_agente_con_robo"
+    for i in range(agentes):
+        orquestador.registrar_agente(AgenteSimulado(
+            TipoAgente.ACADEMICO, f"Simulado {i}", duracion=duracion, semilla=semilla + i
+        ))
+    
+    enviadas = []
+    inicio = time.perf_counter()
+    for i in range(tareas):
+        retraso = inicio + i / tasa - time.perf_counter()
+        if retraso > 0:
+            await asyncio.sleep(retraso)
+        tarea = TareaOrquestada(tipo="calificaciones", agente_requerido=TipoAgente.ACADEMICO,
+                                datos_entrada={"matricula_id": i})
+        await orquestador.enviar_tarea(tarea)
+        enviadas.append(tarea)
+    await asyncio.gather(*(orquestador.esperar_tarea(t.id) for t in enviadas))
+    duracion_total = time.perf_counter() - inicio
+    
+    latencias = sorted((t.tiempo_completado - t.tiempo_creacion).total_seconds() * 1000 for t in enviadas)
+    return {
+        "segundos": round(duracion_total, 2),
+        "p50_ms": round(_percentil(latencias, 50), 1),
+        "p95_ms": round(_percentil(latencias, 95), 1),
+        "p99_ms": round(_percentil(latencias, 99), 1),
+        "max_ms": round(latencias[-1], 1),
+        "robos": orquestador.metricas_sistema["robos_de_trabajo"]
+    }
+
+def benchmark_robo_trabajo(tareas: int = 2000, agentes: int = 8, tasa: float = 400,
+                           duracion_minima: float = 0.005, alfa: float = 1.5,
+                           duracion_maxima: float = 1.0, semilla: int = 7) -> Dict[str, Any]:
+    """
+    Latencia de cola con duraciones Pareto (alfa 1,5: la mayoría cortas y
+    unas pocas cientos de veces más largas) y ~75% de utilización.
+    Compara colas por agente sin robo (lo encolado tras una tarea larga
+    espera aunque haya compañeros libres), con robo, y la cola global
+    (asignación solo a agentes libres) como referencia.
+    """
+    def duracion(rng: random.Random) -> float:
+        return min(duracion_maxima, duracion_minima * rng.paretovariate(alfa))
+    
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        resultados = {
+            "parametros": {"tareas": tareas, "agentes": agentes, "llegadas_por_segundo": tasa,
+                           "duracion_minima_s": duracion_minima, "alfa_pareto": alfa}
+        }
+        for modo in ("colas_por_agente_sin_robo", "colas_por_agente_con_robo", "cola_global"):
+            resultados[modo] = asyncio.run(_medir_robo(modo, tareas, tasa, agentes, duracion, semilla))
+        return resultados
+    finally:
+        logger.setLevel(nivel_anterior)
+
+async def _medir_autoescalado(estrategia: str, fases: Sequence[Tuple[float, float]], duracion: float,
+                              minimo: int, maximo: int, slo: float, intervalo: float,
+                              enfriamiento: float) -> Dict[str, Any]:
+    """Reproduce las fases (segundos, llegadas por segundo) con una estrategia de dimensionado"""
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    orquestador.configuracion["autoescalado_intervalo_segundos"] = intervalo
+    
+    def fabrica(nombre: str) -> AgenteEspecializado:
+        return AgenteSimulado(TipoAgente.ACADEMICO, nombre, duracion=duracion)
+    
+    if estrategia == "autoescalado":
+        orquestador.configurar_autoescalado(TipoAgente.ACADEMICO, fabrica, minimo, maximo, slo,
+                                            enfriamiento=enfriamiento)
+    else:
+        for i in range(minimo if estrategia == "fijo_minimo" else maximo):
+            orquestador.registrar_agente(fabrica(f"fijo-{i}"))
+    
+    # Agentes en servicio cada 50 ms: coste en agentes-segundo y trayectoria
+    muestras: List[int] = []
+    
+    async def muestrear():
+        while True:
+            muestras.append(len(orquestador.agentes))
+            await asyncio.sleep(0.05)
+    
+    muestreo = asyncio.create_task(muestrear())
+    tasa_base = min(tasa for _, tasa in fases)
+    enviadas: List[Tuple[TareaOrquestada, bool]] = []
+    inicio = time.perf_counter()
+    siguiente = inicio
+    for segundos, tasa in fases:
+        fin_fase = siguiente + segundos
+        while siguiente < fin_fase:
+            retraso = siguiente - time.perf_counter()
+            if retraso > 0:
+                await asyncio.sleep(retraso)
+            tarea = TareaOrquestada(tipo="matricula", agente_requerido=TipoAgente.ACADEMICO,
+                                    datos_entrada={"solicitud": len(enviadas)})
+            await orquestador.enviar_tarea(tarea)
+            enviadas.append((tarea, tasa > tasa_base))
+            siguiente += 1 / tasa
+    await asyncio.gather(*(orquestador.esperar_tarea(t.id) for t, _ in enviadas))
+    muestreo.cancel()
+    await orquestador.cerrar()
+    
+    esperas = sorted((t.tiempo_asignacion - t.tiempo_creacion).total_seconds() for t, _ in enviadas)
+    esperas_pico = sorted((t.tiempo_asignacion - t.tiempo_creacion).total_seconds() for t, pico in enviadas if pico)
+    return {
+        "cumplimiento_slo_pct": round(100 * sum(1 for e in esperas if e <= slo) / len(esperas), 1),
+        "espera_p95_ms": round(_percentil(esperas, 95) * 1000, 1),
+        "espera_p95_picos_ms": round(_percentil(esperas_pico, 95) * 1000, 1),
+        "agentes_segundo": round(sum(muestras) * 0.05, 1),
+        "agentes_max": max(muestras),
+        "decisiones": len(orquestador.decisiones_escalado),
+        "agentes_cada_500ms": muestras[::10]
+    }
+
+def simulacion_autoescalado(fases: Sequence[Tuple[float, float]] = ((3, 20), (4, 160), (3, 20), (3, 120), (3, 20)),
+                            duracion: float = 0.05, minimo: int = 2, maximo: int = 16,
+                            slo: float = 0.25, intervalo: float = 0.2, enfriamiento: float = 1.0) -> Dict[str, Any]:
+    """
+    Día de matrícula: tráfico base con dos avalanchas de solicitudes
+    (fases de segundos y llegadas por segundo; cada agente atiende 1/duracion
+    por segundo). Compara la plantilla fija en el mínimo, en el máximo y el
+    autoescalado entre ambos por cumplimiento del SLO de espera p95 y coste
+    en agentes-segundo.
+    """
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        resultados = {
+            "parametros": {"fases_segundos_y_llegadas": [list(f) for f in fases], "duracion_s": duracion,
+                           "minimo": minimo, "maximo": maximo, "slo_espera_p95_ms": slo * 1000,
+                           "intervalo_control_s": intervalo, "enfriamiento_s": enfriamiento}
+        }
+        for estrategia in ("fijo_minimo", "autoescalado", "fijo_maximo"):
+            resultados[estrategia] = asyncio.run(
+                _medir_autoescalado(estrategia, fases, duracion, minimo, maximo, slo, intervalo, enfriamiento)
+            )
+        return resultados
+    finally:
+        logger.setLevel(nivel_anterior)
+
+async def _medir_disyuntores(modo: str, segundos: float, tasa: float, averia: Tuple[float, float]) -> Dict[str, Any]:
+    """Tráfico mixto académico/financiero; los agentes financieros fallan siempre durante la avería"""
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    orquestador.configuracion.update({
+        "disyuntores_activos": modo != "sin_disyuntores",
+        "disyuntor_abierto": "rechazar" if modo == "disyuntores_rechazar" else "aparcar",
+        "disyuntor_ventana": 10,
+        "disyuntor_minimo_llamadas": 6,
+        "disyuntor_espera_apertura_segundos": 0.3,
+        "backoff_base_segundos": 0.05,
+        "mamparos_por_tipo": {TipoAgente.FINANCIERO.value: 2}
+    })
+    financieros = []
+    for i in range(2):
+        orquestador.registrar_agente(AgenteSimulado(TipoAgente.ACADEMICO, f"Académico {i}", duracion=0.01))
+        financieros.append(AgenteSimulado(TipoAgente.FINANCIERO, f"Financiero {i}", duracion=0.01, semilla=i))
+        orquestador.registrar_agente(financieros[-1])
+    
+    def fijar_fallos(tasa_fallo: float):
+        for agente in financieros:
+            agente.tasa_fallo = tasa_fallo
+    
+    bucle = asyncio.get_running_loop()
+    bucle.call_later(averia[0], fijar_fallos, 1.0)
+    bucle.call_later(averia[1], fijar_fallos, 0.0)
+    
+    enviadas = []
+    inicio = time.perf_counter()
+    for i in range(int(segundos * tasa)):
+        retraso = inicio + i / tasa - time.perf_counter()
+        if retraso > 0:
+            await asyncio.sleep(retraso)
+        tipo = TipoAgente.FINANCIERO if i % 2 else TipoAgente.ACADEMICO
+        tarea = TareaOrquestada(tipo="procesar_pago" if i % 2 else "calificaciones", agente_requerido=tipo,
+                                datos_entrada={"solicitud": i})
+        await orquestador.enviar_tarea(tarea)
+        enviadas.append(tarea)
+    await asyncio.gather(*(orquestador.esperar_tarea(t.id) for t in enviadas))
+    
+    def milisegundos(tareas: List[TareaOrquestada], p: float) -> float:
+        return round(_percentil(sorted((t.tiempo_completado - t.tiempo_creacion).total_seconds() * 1000
+                                       for t in tareas), p), 1)
+    
+    academicas = [t for t in enviadas if t.agente_requerido == TipoAgente.ACADEMICO]
+    financieras = [t for t in enviadas if t.agente_requerido == TipoAgente.FINANCIERO]
+    fallidas = [t for t in financieras if t.estado != EstadoTarea.COMPLETADA]
+    return {
+        "academicas_p95_ms": milisegundos(academicas, 95),
+        "financieras_completadas_pct": round(100 * (len(financieras) - len(fallidas)) / len(financieras), 1),
+        "financieras_p95_ms": milisegundos(financieras, 95),
+        "fallidas_p50_hasta_respuesta_ms": milisegundos(fallidas, 50) if fallidas else None,
+        "llamadas_fallidas_al_subsistema": sum(a.estadisticas["tareas_fallidas"] for a in financieros),
+        "aperturas_tipo_financiero": orquestador._disyuntor_tipo(TipoAgente.FINANCIERO).estadisticas["aperturas"],
+        "aparcadas": orquestador.metricas_sistema["aparcadas_por_disyuntor"],
+        "rechazadas": orquestador.metricas_sistema["rechazadas_por_disyuntor"]
+    }
+
+def benchmark_disyuntores(segundos: float = 4.0, tasa: float = 100,
+                          averia: Tuple[float, float] = (0.5, 2.5)) -> Dict[str, Any]:
+    """
+    El subsistema financiero falla en todas las llamadas entre averia[0] y
+    averia[1] segundos y después se recupera, con la mitad del tráfico
+    dirigido a él. Sin disyuntores cada tarea financiera gasta sus intentos
+    contra el agente averiado; con ellos el circuito se abre y las tareas se
+    aparcan hasta que las pruebas en semiabierto pasan, o se rechazan al
+    momento. Las académicas no deberían notarlo en ningún caso.
+    """
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        resultados = {
+            "parametros": {"segundos": segundos, "llegadas_por_segundo": tasa, "averia_s": list(averia)}
+        }
+        for modo in ("sin_disyuntores", "disyuntores_aparcar", "disyuntores_rechazar"):
+            resultados[modo] = asyncio.run(_medir_disyuntores(modo, segundos, tasa, averia))
+        return resultados
+    finally:
+        logger.setLevel(nivel_anterior)
+
+async def _medir_limites(modo: str, rafaga: int, estudiantes: int, segundos: float) -> Dict[str, Any]:
+    """Un profesor lanza una ráfaga de consultas y, mientras, los estudiantes envían una cada uno"""
+    seguridad = GestorSeguridad("benchmark")
+    orquestador = OrquestadorCentral(seguridad)
+    orquestador.configuracion.update({
+        "cola_justa": modo != "fifo_sin_limites",
+        "limites_envio_activos": modo == "cola_justa_con_limites"
+    })
+    for i in range(4):
+        orquestador.registrar_agente(AgenteSimulado(TipoAgente.ACADEMICO, f"Académico {i}", duracion=0.01))
+    token_profesor = seguridad.generar_token("profesor_intensivo", "profesor")
+    tokens_estudiantes = [seguridad.generar_token(f"estudiante_{i}", "estudiante") for i in range(estudiantes)]
+    
+    masivas, rechazadas = [], 0
+    for i in range(rafaga):
+        tarea = TareaOrquestada(tipo="consultas", agente_requerido=TipoAgente.ACADEMICO, datos_entrada={"consulta": i})
+        try:
+            await orquestador.enviar_tarea(tarea, token_profesor)
+            masivas.append(tarea)
+        except LimiteEnviosExcedido:
+            rechazadas += 1
+    
+    de_estudiantes = []
+    inicio = time.perf_counter()
+    for i, token in enumerate(tokens_estudiantes):
+        retraso = inicio + i * segundos / estudiantes - time.perf_counter()
+        if retraso > 0:
+            await asyncio.sleep(retraso)
+        tarea = TareaOrquestada(tipo="consultas_propias", agente_requerido=TipoAgente.ACADEMICO,
+                                datos_entrada={"estudiante": i})
+        await orquestador.enviar_tarea(tarea, token)
+        de_estudiantes.append(tarea)
+    await asyncio.gather(*(orquestador.esperar_tarea(t.id) for t in de_estudiantes + masivas))
+    
+    esperas = sorted((t.tiempo_asignacion - t.tiempo_creacion).total_seconds() * 1000 for t in de_estudiantes)
+    return {
+        "estudiantes_espera_p50_ms": round(_percentil(esperas, 50), 1),
+        "estudiantes_espera_p95_ms": round(_percentil(esperas, 95), 1),
+        "profesor_admitidas": len(masivas),
+        "profesor_rechazadas": rechazadas,
+        "limitador": {clave: valor for clave, valor in orquestador.limitador.resumen().items()
+                      if clave != "ultimos_rechazos"}
+    }
+
+def benchmark_limites(rafaga: int = 3000, estudiantes: int = 100, segundos: float = 3.0,
+                      usuarios_coste: int = 100_000) -> Dict[str, Any]:
+    """
+    Un único usuario envía una ráfaga de consultas que ocupa a los agentes
+    varios segundos; a la vez, cada estudiante envía una consulta propia.
+    En FIFO los estudiantes esperan detrás de toda la ráfaga; con la cola
+    justa se intercalan con ella y, con los límites, la ráfaga ni siquiera
+    entra entera. También mide el coste por envío del limitador con muchos
+    usuarios distintos.
+    """
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        resultados = {
+            "parametros": {"rafaga": rafaga, "estudiantes": estudiantes, "segundos": segundos}
+        }
+        for modo in ("fifo_sin_limites", "cola_justa_sin_limites", "cola_justa_con_limites"):
+            resultados[modo] = asyncio.run(_medir_limites(modo, rafaga, estudiantes, segundos))
+        
+        limitador = LimitadorEnvios({"*": (1, 10)}, {"*": (1e9, 1e9)}, max_usuarios=usuarios_coste // 2)
+        inicio = time.perf_counter()
+        for i in range(usuarios_coste):
+            limitador.admitir(f"usuario_{i}", "estudiante")
+        resultados["coste_admitir_us"] = {
+            "usuarios_distintos": usuarios_coste,
+            "por_envio": round((time.perf_counter() - inicio) / usuarios_coste * 1e6, 2)
+        }
+        return resultados
+    finally:
+        logger.setLevel(nivel_anterior)
+
+async def _medir_fechas_limite(modo: str, segundos: float, tasa: float,
+                               plazo: Tuple[float, float], duracion: float) -> Dict[str, Any]:
+    """Pagos con plazo aleatorio y prioridad sin relación con él, a más ritmo del que se atiende"""
+    orquestador = OrquestadorCentral(GestorSeguridad("benchmark"))
+    orquestador.configuracion.update({
+        "politica_por_tipo": {TipoAgente.FINANCIERO.value: "edf"} if modo.startswith("edf") else {},
+        "descartar_fechas_inalcanzables": modo.endswith("con_descarte")
+    })
+    for i in range(2):
+        orquestador.registrar_agente(AgenteSimulado(TipoAgente.FINANCIERO, f"Financiero {i}", duracion=duracion))
+    
+    rng = random.Random(7)
+    prioridades = [NivelPrioridad.BAJA, NivelPrioridad.NORMAL, NivelPrioridad.ALTA]
+    enviadas = []
+    inicio = time.perf_counter()
+    for i in range(int(segundos * tasa)):
+        retraso = inicio + i / tasa - time.perf_counter()
+        if retraso > 0:
+            await asyncio.sleep(retraso)
+        tarea = TareaOrquestada(tipo="confirmar_pago", agente_requerido=TipoAgente.FINANCIERO,
+                                prioridad=rng.choice(prioridades), datos_entrada={"pago": i},
+                                fecha_limite=datetime.now() + timedelta(seconds=rng.uniform(*plazo)))
+        await orquestador.enviar_tarea(tarea)
+        enviadas.append(tarea)
+    await asyncio.gather(*(orquestador.esperar_tarea(t.id) for t in enviadas))
+    
+    resumen = orquestador.resumen_fechas_limite()
+    return {
+        "a_tiempo": resumen["a_tiempo"],
+        "tarde": resumen["tarde"],
+        "descartadas": resumen["descartadas"],
+        "tasa_incumplimiento": resumen["tasa_incumplimiento"],
+        "retraso_medio_ms": resumen["retraso_medio_ms"],
+        "retraso_p95_ms": resumen["retraso_p95_ms"]
+    }
+
+def simulacion_fechas_limite(segundos: float = 4.0, tasa: float = 140, plazo: Tuple[float, float] = (0.05, 0.6),
+                             duracion: float = 0.02) -> Dict[str, Any]:
+    """
+    Sobrecarga sostenida (dos agentes de duracion segundos atienden menos de
+    lo que llega) con fechas límite duras. Prioridad-FIFO ignora los plazos;
+    EDF atiende antes lo más urgente pero, sin descarte, en sobrecarga
+    encadena retrasos (cada tarea tardía empuja a las siguientes); con
+    descarte temprano las inalcanzables no llegan a ocupar agente.
+    """
+    nivel_anterior = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        resultados = {
+            "parametros": {"segundos": segundos, "llegadas_por_segundo": tasa,
+                           "capacidad_por_segundo": round(2 / duracion, 1), "plazo_s": list(plazo)}
+        }
+        for modo in ("prioridad_fifo", "prioridad_fifo_con_descarte", "edf", "edf_con_descarte"):
+            resultados[modo] = asyncio.run(_medir_fechas_limite(modo, segundos, tasa, plazo, duracion))
+        return resultados
+    finally:
+        logger.setLevel(nivel_anterior)
+
 async def demo_sistema_completo():
     """Demo completa del sistema de orquestación"""
     print("🚀 Sistema de Orquestación Multi-Agente Universitario")
@@ -632,7 +3225,7 @@ async def demo_sistema_completo():
     # Crear y registrar agentes
     agentes = [
         AgenteEspecializado(TipoAgente.ACADEMICO, "Agente Académico Principal", 
-                          ["matriculas", "calificaciones", "certificados"]),
+                          ["matriculas", "calificaciones", "certificados", "procesar_lote"]),
         AgenteEspecializado(TipoAgente.SOPORTE_IT, "Agente IT Support", 
                           ["usuarios", "incidencias", "infraestructura"]),
         AgenteEspecializado(TipoAgente.BIBLIOTECA, "Agente Biblioteca Digital", 
@@ -670,7 +3263,7 @@ async def demo_sistema_completo():
         ),
         TareaOrquestada(
             tipo="reservar_recurso",
-            descripción="Reservar sala de estudio",
+            descripcion="Reservar sala de estudio",
             agente_requerido=TipoAgente.BIBLIOTECA,
             prioridad=NivelPrioridad.BAJA,
             datos_entrada={"recurso": "Sala Estudio Grupal 1", "fecha": "2024-12-01"}
@@ -701,6 +3294,18 @@ async def demo_sistema_completo():
     print(f"   Tareas completadas: {estado['tareas_completadas']}")
     print(f"   Tareas en cola: {estado['tareas_en_cola']}")
     
+    # Cancelación por id de una tarea que aún no ha terminado
+    tarea_lenta = TareaOrquestada(
+        tipo="consulta_catalogo",
+        descripcion="Consulta que el usuario abandona",
+        agente_requerido=TipoAgente.BIBLIOTECA,
+        timeout_segundos=10
+    )
+    await orquestador.enviar_tarea(tarea_lenta, token_admin)
+    await asyncio.sleep(0.1)
+    if orquestador.cancelar_tarea(tarea_lenta.id):
+        print(f"\n🛑 Tarea {tarea_lenta.id[:8]} cancelada ({tarea_lenta.estado.value})")
+    
     # Generar reporte de rendimiento
     reporte = await orquestador.generar_reporte_rendimiento()
     print("\n📈 Reporte de rendimiento generado")
@@ -721,6 +3326,41 @@ async def demo_sistema_completo():
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--demo":
         asyncio.run(demo_sistema_completo())
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-memoria":
+        instancias = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+        print(json.dumps(benchmark_memoria(instancias), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--prueba-recuperacion":
+        tareas = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        resultado = prueba_recuperacion(tareas)
+        print(json.dumps(resultado, indent=2))
+        sys.exit(0 if resultado["ok"] else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--trabajador-diario":
+        asyncio.run(_trabajador_diario(sys.argv[2], int(sys.argv[3]), int(sys.argv[4])))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-diario":
+        tareas = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+        print(json.dumps(benchmark_diario(tareas), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-idempotencia":
+        envios = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+        print(json.dumps(benchmark_idempotencia(envios), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-lotes":
+        tareas = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        print(json.dumps(benchmark_lotes(tareas), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-robo":
+        tareas = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        print(json.dumps(benchmark_robo_trabajo(tareas), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--simulacion-autoescalado":
+        print(json.dumps(simulacion_autoescalado(), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-disyuntores":
+        print(json.dumps(benchmark_disyuntores(), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-limites":
+        rafaga = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+        print(json.dumps(benchmark_limites(rafaga), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--simulacion-fechas-limite":
+        tasa = float(sys.argv[2]) if len(sys.argv) > 2 else 140
+        print(json.dumps(simulacion_fechas_limite(tasa=tasa), indent=2))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--benchmark-reintentos":
+        tareas = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        print(json.dumps(benchmark_reintentos(tareas), indent=2))
     else:
         print("🏗️ Sistema de Orquestación Multi-Agente - Día 5")
         print("=" * 50)